@@ -0,0 +1,112 @@
+"""
+Streaming CSV/XLSX exports, for reports too large to render in memory.
+
+`rows` are iterables of flat dicts (see `flatten`), usually built lazily from
+a `QuerySet.iterator()` so that nothing holds the whole report.
+"""
+import os
+import tempfile
+
+import unicodecsv as csv
+import xlsxwriter
+from django.http import StreamingHttpResponse
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _Echo(object):
+    """
+    File-like object that returns what is written, for csv.writer
+    """
+
+    def write(self, value):
+        return value
+
+
+def flatten(data, prefix=''):
+    """
+    Flatten nested serializer data: {'size': {'cpu': 1}} -> {'size.cpu': 1}
+    """
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + '.'))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+
+def _attachment(response, filename):
+    response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+    return response
+
+
+def stream_csv(rows, headers, filename):
+    """
+    Return a response that writes each row as soon as it is produced
+    """
+    writer = csv.writer(_Echo(), encoding='utf-8')
+
+    def lines():
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow([row.get(header) for header in headers])
+
+    return _attachment(
+        StreamingHttpResponse(lines(), content_type='text/csv'), filename
+    )
+
+
+def stream_xlsx(rows, headers, filename, sheet_name='Raw Data'):
+    """
+    Return a response streaming an XLSX workbook of `rows`.
+
+    The workbook is written with xlsxwriter's constant_memory mode (one row
+    in memory at a time) to a temporary file, which is streamed and then
+    removed.
+    """
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(
+            path, {
+                'constant_memory': True,
+                'default_date_format': 'mmm d yyyy hh:mm:ss'
+            }
+        )
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, headers)
+        for row_idx, row in enumerate(rows, 1):
+            worksheet.write_row(
+                row_idx, 0, [row.get(header) for header in headers]
+            )
+        workbook.close()
+    except Exception:
+        os.remove(path)
+        raise
+    return _attachment(
+        StreamingHttpResponse(
+            _TemporaryFileStream(path), content_type='application/vnd.ms-excel'
+        ), filename
+    )
+
+
+class _TemporaryFileStream(object):
+    """
+    Iterate over a file in chunks, removing it once the response is closed
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        with open(self.path, 'rb') as stream:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def close(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -7,7 +7,7 @@ from rest_framework import permissions
 
 from threepio import logger
 
-from core.models.cloud_admin import CloudAdministrator, cloud_admin_list, get_cloud_admin_for_provider
+from core.models.cloud_admin import CloudAdministrator, cloud_admin_list, get_cloud_admin_for_provider, is_cloud_admin
 from core.models import (
     Group, MaintenanceRecord, AtmosphereUser, ExternalLink, Volume, Instance,
     Project, Identity
@@ -230,7 +230,7 @@ class CloudAdminRequired(permissions.BasePermission):
         if admin_uuid:
             admin = _get_administrator_account(request.user, admin_uuid)
         else:
-            admin = cloud_admin_list(request.user).exists()
+            admin = is_cloud_admin(request.user)
         return admin or request.user.is_staff
 
 
@@ -257,7 +257,7 @@ class CloudAdminUpdatingRequired(permissions.BasePermission):
         # holds 'CloudAdmin' privileges on at least one provider
         # in order to make the action.
         else:
-            admin = cloud_admin_list(request.user).exists()
+            admin = is_cloud_admin(request.user)
 
         return True if admin else False
 
@@ -330,8 +330,7 @@ class InMaintenance(permissions.BasePermission):
     """
 
     def has_permission(self, request, view):
-        records = MaintenanceRecord.active()\
-                                   .filter(provider__isnull=True)
+        records = MaintenanceRecord.active_global()
         if records:
             request_username = request.user.username
             #TODO: Optional logic related to session_username -- the one who is 'Authenticated'..
@@ -2,10 +2,22 @@
 tests for custom permission classes
 """
 import unittest
+from datetime import timedelta
+
 import mock
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from api.permissions import CanEditOrReadOnly
-from api.tests.factories import UserFactory, AnonymousUserFactory
+from api.exceptions import ServiceUnavailable
+from api.permissions import CanEditOrReadOnly, InMaintenance
+from api.tests.factories import (
+    AnonymousUserFactory, ProviderFactory, UserFactory
+)
+from core.models import CloudAdministrator, MaintenanceRecord
+from core.models.cloud_admin import is_cloud_admin
+from core.models.maintenance import global_maintenance
 
 
 class TestCanEditOrReadOnly(unittest.TestCase):
@@ -75,3 +87,67 @@ class TestCanEditOrReadOnly(unittest.TestCase):
         assert self.permissions.has_object_permission(
             self.request, self.view, self.obj
         )
+
+
+@override_settings(MAINTENANCE_CACHE_TTL=60, MAINTENANCE_CACHE_MAX_AGE=600)
+class TestInMaintenance(TestCase):
+    def setUp(self):
+        global_maintenance.clear()
+        self.addCleanup(global_maintenance.clear)
+        self.permission = InMaintenance()
+        self.request = mock.Mock()
+        self.request.user = UserFactory.create()
+        self.view = mock.Mock()
+
+    def has_permission(self):
+        return self.permission.has_permission(self.request, self.view)
+
+    def test_steady_state_makes_no_queries(self):
+        self.assertTrue(self.has_permission())
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(5):
+                self.assertTrue(self.has_permission())
+        self.assertEqual(len(queries.captured_queries), 0)
+
+    def test_saving_a_record_invalidates_the_cache(self):
+        self.assertTrue(self.has_permission())
+        record = MaintenanceRecord.objects.create(
+            start_date=timezone.now() - timedelta(minutes=1),
+            title='Upgrade',
+            message='Back soon'
+        )
+        with self.assertRaises(ServiceUnavailable):
+            self.has_permission()
+        record.end_date = timezone.now()
+        record.save()
+        self.assertTrue(self.has_permission())
+
+    def test_upcoming_records_start_without_a_reload(self):
+        MaintenanceRecord.objects.create(
+            start_date=timezone.now() + timedelta(seconds=30),
+            title='Upgrade',
+            message='Back soon'
+        )
+        self.assertTrue(self.has_permission())
+        with mock.patch('core.models.maintenance.timezone.now') as now:
+            now.return_value = timezone.now() + timedelta(minutes=1)
+            with self.assertRaises(ServiceUnavailable):
+                self.has_permission()
+
+
+@override_settings(CLOUD_ADMIN_CACHE_TTL=60)
+class TestIsCloudAdmin(TestCase):
+    def setUp(self):
+        self.user = UserFactory.create()
+
+    def test_cached_until_an_admin_account_changes(self):
+        self.assertFalse(is_cloud_admin(self.user))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(is_cloud_admin(self.user))
+        self.assertEqual(len(queries.captured_queries), 0)
+        admin = CloudAdministrator.objects.create(
+            user=self.user, provider=ProviderFactory.create()
+        )
+        self.assertTrue(is_cloud_admin(self.user))
+        admin.delete()
+        self.assertFalse(is_cloud_admin(self.user))
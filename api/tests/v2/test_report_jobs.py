@@ -0,0 +1,85 @@
+from django.core.urlresolvers import reverse
+from rest_framework.test import APITestCase, APIRequestFactory, force_authenticate
+
+from api.tests.factories import UserFactory, InstanceFactory
+from api.v2.views import ReportJobViewSet
+from core.models import ReportJob
+from service.tasks.reporting import build_report
+
+INSTANCE_REPORT = {
+    'report_type': 'instance',
+    'start_date': '2000-01-01T00:00:00Z',
+}
+
+
+class ReportJobTests(APITestCase):
+    def setUp(self):
+        self.staff_user = UserFactory.create(is_staff=True)
+        self.user = UserFactory.create()
+        self.create_view = ReportJobViewSet.as_view({'post': 'create'})
+        self.download_view = ReportJobViewSet.as_view({'get': 'download'})
+
+    def submit(self, user, data):
+        request = APIRequestFactory().post(
+            reverse('api:v2:reportjob-list'), data, format='json'
+        )
+        force_authenticate(request, user=user)
+        return self.create_view(request)
+
+    def download(self, user, job, export_format):
+        request = APIRequestFactory().get(
+            reverse('api:v2:reportjob-download', args=[job.uuid]),
+            {'format': export_format}
+        )
+        force_authenticate(request, user=user)
+        return self.download_view(request, pk=str(job.uuid))
+
+    def test_identical_specs_share_a_job(self):
+        first = self.submit(self.staff_user, INSTANCE_REPORT)
+        self.assertEquals(first.status_code, 201)
+        same_time_elsewhere = dict(
+            INSTANCE_REPORT, start_date='2000-01-01T01:00:00+01:00'
+        )
+        second = self.submit(self.staff_user, same_time_elsewhere)
+        self.assertEquals(second.status_code, 200)
+        self.assertEqual(second.data['uuid'], first.data['uuid'])
+        # Reports of non-staff users are scoped to what they can see
+        scoped = self.submit(self.user, INSTANCE_REPORT)
+        self.assertEquals(scoped.status_code, 201)
+        self.assertNotEqual(scoped.data['uuid'], first.data['uuid'])
+
+    def test_failed_jobs_are_not_reused(self):
+        first = self.submit(self.staff_user, INSTANCE_REPORT)
+        ReportJob.objects.get(uuid=first.data['uuid']).fail('Broken')
+        second = self.submit(self.staff_user, INSTANCE_REPORT)
+        self.assertEquals(second.status_code, 201)
+
+    def test_allocation_reports_are_staff_only(self):
+        allocation_report = {
+            'report_type': 'allocation',
+            'start_date': '2000-01-01T00:00:00Z',
+            'end_date': '2000-02-01T00:00:00Z',
+        }
+        response = self.submit(self.user, allocation_report)
+        self.assertEquals(response.status_code, 403)
+        response = self.submit(self.staff_user, allocation_report)
+        self.assertEquals(response.status_code, 201)
+
+    def test_download_built_report(self):
+        for _ in range(2):
+            InstanceFactory.create()
+        response = self.submit(self.staff_user, INSTANCE_REPORT)
+        job = ReportJob.objects.get(uuid=response.data['uuid'])
+        self.assertEquals(
+            self.download(self.staff_user, job, 'json').status_code, 409
+        )
+
+        build_report(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.COMPLETE)
+        self.assertEqual(len(job.result), 2)
+        response = self.download(self.staff_user, job, 'csv')
+        self.assertEquals(response.status_code, 200)
+        lines = response.content.splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith(b'id,instance_id,username'))
@@ -1,9 +1,14 @@
 from unittest import skip
 
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase, APIRequestFactory, force_authenticate
 
-from api.tests.factories import UserFactory, AnonymousUserFactory
+from api.tests.factories import (
+    UserFactory, AnonymousUserFactory, InstanceFactory, InstanceHistoryFactory,
+    InstanceStatusFactory
+)
 from api.v2.views import ReportingViewSet
 
 
@@ -51,6 +56,71 @@ class ReportingTests(APITestCase):
                 'Invalid filter parameters'
             )
 
+    def test_query_count_does_not_grow_with_instances(self):
+        staff_user = UserFactory.create(is_staff=True)
+        statuses = [
+            InstanceStatusFactory.create(name=name)
+            for name in ['active', 'deploy_error', 'error']
+        ]
+
+        def report():
+            request = APIRequestFactory().get(
+                reverse('api:v2:reporting-list'), {'start_date': '2000-01-01'}
+            )
+            force_authenticate(request, user=staff_user)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.view(request)
+            self.assertEquals(response.status_code, 200)
+            return response, len(queries)
+
+        def launch(count):
+            for _ in range(count):
+                instance = InstanceFactory.create()
+                for status in statuses:
+                    InstanceHistoryFactory.create(
+                        instance=instance, status=status
+                    )
+
+        launch(1)
+        response, few_queries = report()
+        self.assertEqual(len(response.data), 1)
+        self.assertTrue(response.data[0]['hit_active'])
+        launch(5)
+        response, many_queries = report()
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(many_queries, few_queries)
+
+    def test_stream_csv(self):
+        staff_user = UserFactory.create(is_staff=True)
+        for _ in range(3):
+            InstanceFactory.create()
+        request = APIRequestFactory().get(
+            reverse('api:v2:reporting-list'), {
+                'start_date': '2000-01-01',
+                'stream': 'true',
+                'format': 'csv'
+            }
+        )
+        force_authenticate(request, user=staff_user)
+        response = self.view(request)
+        self.assertEquals(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith(b'id,instance_id,username'))
+
+    def test_stream_requires_file_format(self):
+        staff_user = UserFactory.create(is_staff=True)
+        request = APIRequestFactory().get(
+            reverse('api:v2:reporting-list'), {
+                'start_date': '2000-01-01',
+                'stream': 'true'
+            }
+        )
+        force_authenticate(request, user=staff_user)
+        response = self.view(request)
+        self.assertEquals(response.status_code, 400)
+
     @skip('skip for now')
     def test_access_invalid_provider(self):
         raise NotImplementedError
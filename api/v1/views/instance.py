@@ -12,7 +12,7 @@ from core.exceptions import ProviderNotActive
 from core.models import AtmosphereUser as User
 from core.models.allocation_source import AllocationSource
 from core.models.identity import Identity
-from core.models.instance import convert_esh_instance
+from core.models.instance import convert_esh_instance, convert_esh_instances
 from core.models.instance import Instance as CoreInstance
 from core.models.boot_script import _save_scripts_to_instance
 from core.models.tag import Tag as CoreTag
@@ -132,11 +132,9 @@ class InstanceList(AuthAPIView):
             return connection_failure(provider_uuid, identity_uuid)
         except LibcloudInvalidCredsError:
             return invalid_creds(provider_uuid, identity_uuid)
-        core_instance_list = [
-            convert_esh_instance(
-                esh_driver, inst, provider_uuid, identity_uuid, user
-            ) for inst in esh_instance_list
-        ]
+        core_instance_list = convert_esh_instances(
+            esh_driver, esh_instance_list, provider_uuid, identity_uuid, user
+        )
         # TODO: Core/Auth checks for shared instances
         serialized_data = InstanceSerializer(
             core_instance_list, context={
@@ -41,6 +41,7 @@ from .provider_machine import ProviderMachineSerializer
 from .quota import QuotaSerializer
 from .renewal_strategy import RenewalStrategySerializer
 from .resource_request import ResourceRequestSerializer, AdminResourceRequestSerializer
+from .report_job import ReportJobSerializer, ReportSpecSerializer
 from .reporting import InstanceReportingSerializer
 from .size import SizeSerializer
 from .ssh_key import SSHKeySerializer
@@ -1,7 +1,6 @@
-from core.models import (
-    Project, BootScript, Instance, Application as Image,
-    InstanceAllocationSourceSnapshot
-)
+from django.utils import timezone
+
+from core.models import (Project, BootScript, Instance, Application as Image)
 from rest_framework import serializers
 from core.serializers.fields import ModelRelatedField
 from api.v2.serializers.details import AllocationSourceSerializer
@@ -47,13 +46,11 @@ class InstanceSerializer(serializers.HyperlinkedModelSerializer):
     )
 
     def get_allocation_source(self, instance):
-        snapshot = InstanceAllocationSourceSnapshot.objects.filter(
-            instance=instance
-        ).first()
-        if not snapshot:
+        allocation_source = instance.allocation_source_at(timezone.now())
+        if not allocation_source:
             return None
         serializer = AllocationSourceSerializer(
-            snapshot.allocation_source, context=self.context
+            allocation_source, context=self.context
         )
         return serializer.data
 
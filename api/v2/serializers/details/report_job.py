@@ -0,0 +1,71 @@
+import pytz
+from rest_framework import serializers
+
+from api.v2.serializers.fields.base import UUIDHyperlinkedIdentityField
+from core.models import ReportJob
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    uuid = serializers.CharField(read_only=True)
+    url = UUIDHyperlinkedIdentityField(view_name='api:v2:reportjob-detail')
+    download_url = UUIDHyperlinkedIdentityField(
+        view_name='api:v2:reportjob-download'
+    )
+    created_by = serializers.SlugRelatedField(
+        slug_field='username', read_only=True
+    )
+
+    class Meta:
+        model = ReportJob
+        fields = (
+            'id', 'uuid', 'url', 'download_url', 'report_type', 'spec',
+            'status', 'error_message', 'created_by', 'start_date', 'end_date'
+        )
+        read_only_fields = fields
+
+
+class ReportSpecSerializer(serializers.Serializer):
+    """
+    Validate a report request and normalize it into a ReportJob spec
+    """
+    report_type = serializers.ChoiceField(choices=ReportJob.REPORT_TYPES)
+    start_date = serializers.DateTimeField()
+    end_date = serializers.DateTimeField(required=False)
+    frequency = serializers.ChoiceField(
+        choices=['yearly', 'quarterly', 'monthly', 'weekly', 'daily', 'hourly'],
+        default='monthly'
+    )
+    username = serializers.CharField(required=False)
+    allocation_source_name = serializers.CharField(required=False)
+    provider_id = serializers.ListField(
+        child=serializers.IntegerField(), required=False
+    )
+    name = serializers.CharField(required=False)
+    source_alias = serializers.CharField(required=False)
+    status = serializers.CharField(required=False)
+
+    def validate(self, data):
+        if data['report_type'] == ReportJob.ALLOCATION_REPORT\
+                and 'end_date' not in data:
+            raise serializers.ValidationError(
+                "Allocation reports require an 'end_date'"
+            )
+        if 'end_date' in data and data['end_date'] < data['start_date']:
+            raise serializers.ValidationError(
+                "'end_date' must come after 'start_date'"
+            )
+        return data
+
+    def get_spec(self):
+        """
+        Return the validated report parameters as a JSON-friendly dict, with
+        dates in UTC, so that equal requests produce equal specs
+        """
+        spec = dict(self.validated_data)
+        spec.pop('report_type')
+        for key in ['start_date', 'end_date']:
+            if key in spec:
+                spec[key] = spec[key].astimezone(pytz.utc).isoformat()
+        if 'provider_id' in spec:
+            spec['provider_id'] = sorted(set(spec['provider_id']))
+        return spec
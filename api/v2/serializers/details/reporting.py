@@ -36,6 +36,8 @@ class InstanceReportingSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def get_is_featured_image(self, instance):
+        if hasattr(instance, 'has_featured_tag'):
+            return instance.has_featured_tag
         try:
             application = self.get_application(instance)
             return application.tags.filter(name__icontains='featured'
@@ -97,21 +99,29 @@ class InstanceReportingSerializer(serializers.ModelSerializer):
         )
 
     def get_hit_active(self, instance):
-        return instance.instancestatushistory_set.filter(status__name='active'
-                                                        ).count() > 0
+        return self._has_history(instance, 'active')
 
     def get_hit_deploy_error(self, instance):
         if self.get_hit_active(instance):
             return False
-        return instance.instancestatushistory_set.filter(
-            status__name='deploy_error'
-        ).count() > 0
+        return self._has_history(instance, 'deploy_error')
 
     def get_hit_error(self, instance):
         if self.get_hit_active(instance):
             return False
-        return instance.instancestatushistory_set.filter(status__name='error'
-                                                        ).count() > 0
+        return self._has_history(instance, 'error')
+
+    def _has_history(self, instance, status_name):
+        """
+        Read the `has_<status>_history` annotation added by
+        `ReportingViewSet.annotate_reporting_fields`, or query for it.
+        """
+        annotation = 'has_%s_history' % status_name
+        if hasattr(instance, annotation):
+            return getattr(instance, annotation)
+        return instance.instancestatushistory_set.filter(
+            status__name=status_name
+        ).count() > 0
 
     class Meta:
         model = Instance
@@ -134,6 +134,7 @@ router.register(
     base_name='renewalstrategy'
 )
 router.register(r'resource_requests', views.ResourceRequestViewSet)
+router.register(r'report_jobs', views.ReportJobViewSet, base_name='reportjob')
 router.register(r'reporting', views.ReportingViewSet, base_name='reporting')
 router.register(r'sizes', views.SizeViewSet)
 router.register(r'status_types', views.StatusTypeViewSet)
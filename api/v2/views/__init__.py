@@ -40,6 +40,7 @@ from .provider_type import ProviderTypeViewSet
 from .quota import QuotaViewSet
 from .renewal_strategy import RenewalStrategyViewSet
 from .resource_request import ResourceRequestViewSet, AdminResourceRequestViewSet
+from .report_job import ReportJobViewSet
 from .reporting import ReportingViewSet
 from .size import SizeViewSet
 from .status_type import StatusTypeViewSet
@@ -86,7 +86,9 @@ class InstanceViewSet(MultipleFieldLookup, AuthModelViewSet):
         qs = qs.select_related("created_by")\
             .select_related('created_by_identity')\
             .select_related('source')\
-            .select_related('project')
+            .select_related('project')\
+            .select_related('last_history__status')\
+            .select_related('last_history__size')
         return qs
 
     @detail_route(methods=['post'])
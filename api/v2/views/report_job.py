@@ -0,0 +1,113 @@
+"""
+ Asynchronous reports: submit a report spec, poll its job, download the result
+"""
+from functools import partial
+
+from django.db import transaction
+from rest_framework import exceptions, status
+from rest_framework.decorators import detail_route
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from api.renderers import PandasExcelRenderer, CSVRenderer
+from api.v2.exceptions import failure_response
+from api.v2.serializers.details import (
+    ReportJobSerializer, ReportSpecSerializer
+)
+from api.v2.views.base import AuthModelViewSet
+from api.v2.views.mixins import MultipleFieldLookup
+from api.v2.views.reporting import ReportingViewSet, parse_frequency
+from core.models import ReportJob
+from service.tasks.reporting import build_report
+
+
+def _write_raw_data(raw_dataframe, writer):
+    raw_dataframe.to_excel(writer, sheet_name='Raw Data', index=False)
+    writer.save()
+    return writer
+
+
+class ReportJobViewSet(MultipleFieldLookup, AuthModelViewSet):
+    """
+    API endpoint to build reports asynchronously.
+
+    POST a report spec to queue a job (or reuse the job of an identical
+    spec), poll the job until its status is 'complete', then GET its
+    `download` route, as json, csv (`?format=csv`) or xlsx (`?format=xlsx`).
+    """
+    lookup_fields = ("id", "uuid")
+    queryset = ReportJob.objects.none()
+    serializer_class = ReportJobSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [
+        PandasExcelRenderer, CSVRenderer
+    ]
+    http_method_names = ['get', 'post', 'head', 'options', 'trace']
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_staff or user.is_superuser:
+            return ReportJob.objects.order_by('-start_date')
+        return ReportJob.objects.filter(created_by=user).order_by('-start_date')
+
+    def create(self, request, *args, **kwargs):
+        user = request.user
+        is_staff = user.is_staff or user.is_superuser
+        serializer = ReportSpecSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report_type = serializer.validated_data['report_type']
+        if report_type == ReportJob.ALLOCATION_REPORT and not is_staff:
+            raise exceptions.PermissionDenied(
+                "Only staff can request allocation reports"
+            )
+        spec = serializer.get_spec()
+        if not is_staff:
+            # Instance reports only show what is shared with the user
+            spec['requested_by'] = user.username
+
+        job = ReportJob.find_cached(report_type, spec)
+        created = job is None
+        if created:
+            job = ReportJob.create_job(report_type, spec, user)
+            job_id = job.id
+            transaction.on_commit(
+                lambda: build_report.apply_async(args=(job_id, ))
+            )
+        return Response(
+            ReportJobSerializer(job, context={
+                'request': request
+            }).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    @detail_route(methods=['GET'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != ReportJob.COMPLETE:
+            message = "Report job %s is %s, not %s" % (
+                job.uuid, job.status, ReportJob.COMPLETE
+            )
+            return failure_response(status.HTTP_409_CONFLICT, message)
+        self.report_job = job
+        return Response(job.result, status=status.HTTP_200_OK)
+
+    def get_renderer_context(self):
+        context = super(ReportJobViewSet, self).get_renderer_context()
+        job = getattr(self, 'report_job', None)
+        if not job:
+            return context
+        request = context['request']
+        default_filename = '%s_report.%s' % (
+            job.report_type, request.accepted_renderer.format
+        )
+        context['filename'] = request.query_params.get(
+            'filename', default_filename
+        )
+        if job.report_type == ReportJob.INSTANCE_REPORT:
+            frequency = parse_frequency(job.spec.get('frequency'))
+            context['headers_ordering'] = ReportingViewSet.headers_ordering
+            context['excel_writer_hook'] = partial(
+                ReportingViewSet.write_excel_file, frequency=frequency
+            )
+        else:
+            context['excel_writer_hook'] = _write_raw_data
+        return context
@@ -1,20 +1,94 @@
 """
  RESTful Reporting API
 """
+from urlparse import urljoin
+
 import numpy as np
 import pandas as pd
 import pytz
 from dateutil.parser import parse
-from django.db.models import Q
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.http import QueryDict
 from rest_framework import exceptions
 from rest_framework import status
 from rest_framework.settings import api_settings
 
+from api.export import flatten, stream_csv, stream_xlsx
 from api.renderers import PandasExcelRenderer, CSVRenderer
 from api.v2.exceptions import failure_response
 from api.v2.serializers.details import InstanceReportingSerializer
 from api.v2.views.base import AuthModelViewSet
-from core.models import Instance
+from core.models import (
+    Application, AtmosphereUser, Instance, InstanceStatusHistory
+)
+
+
+def _has_history_with_status(status_name):
+    return Exists(
+        InstanceStatusHistory.objects.filter(
+            instance=OuterRef('pk'), status__name=status_name
+        )
+    )
+
+
+def parse_frequency(frequency):
+    """
+    Return the pandas offset alias for a report `frequency`
+    """
+    freq = (frequency or 'MS').lower()
+    if freq in ['as', 'yearly']:
+        return 'AS'
+    elif freq in ['qs', 'quarterly']:
+        return 'QS'
+    elif freq in ['ms', 'monthly']:
+        return 'MS'
+    elif freq in ['w', 'weekly']:
+        return 'W'
+    elif freq in ['d', 'daily']:
+        return 'D'
+    elif freq in ['h', 'hourly']:
+        return 'H'
+    else:    # Invalid defaults: Monthly
+        return 'MS'
+
+
+class _ServerRequest(object):
+    """
+    Stands in for the request when hyperlinked fields are serialized outside
+    of a request/response cycle: links are made absolute against SERVER_URL
+    """
+    GET = {}
+
+    def build_absolute_uri(self, location):
+        return urljoin(settings.SERVER_URL, location)
+
+
+def build_instance_report(spec):
+    """
+    Return the rows of the instance report described by a ReportJob spec,
+    which holds the query parameters of ReportingViewSet.
+    """
+    if spec.get('requested_by'):
+        user = AtmosphereUser.objects.get(username=spec['requested_by'])
+        instances_qs = Instance.shared_with_user(user)
+    else:
+        instances_qs = Instance.objects.all()
+    query_params = QueryDict(mutable=True)
+    for key, value in spec.items():
+        if isinstance(value, list):
+            query_params.setlist(key, value)
+        else:
+            query_params[key] = value
+    query = ReportingViewSet.get_filter_query(query_params)
+    queryset = ReportingViewSet.annotate_reporting_fields(
+        instances_qs.filter(query)
+    ).order_by('id')
+    context = {'request': _ServerRequest()}
+    return [
+        InstanceReportingSerializer(instance, context=context).data
+        for instance in queryset.iterator()
+    ]
 
 
 class ReportingViewSet(AuthModelViewSet):
@@ -26,6 +100,14 @@ class ReportingViewSet(AuthModelViewSet):
     queryset = Instance.objects.none()
     ordering_fields = ('id', 'start_date')
     http_method_names = ['get', 'head', 'options', 'trace']
+    headers_ordering = [
+        "id", "instance_id", "username", "staff_user", "provider", "start_date",
+        "end_date", "image_name", "version_name", "size.active",
+        "size.start_date", "size.end_date", "size.name", "size.id", "size.uuid",
+        "size.url", "size.alias", "size.cpu", "size.mem", "size.disk",
+        "is_featured_image", "hit_active", "hit_deploy_error", "hit_error",
+        "hit_aborted", "hit_active_or_aborted", "hit_active_or_aborted_or_error"
+    ]
 
     class Meta:
         model = Instance
@@ -43,57 +125,30 @@ class ReportingViewSet(AuthModelViewSet):
         else:
             filename = 'instance_reporting.xlsx'
         return {
-            'view':
-                self,
-            'args':
-                getattr(self, 'args', ()),
-            'kwargs':
-                getattr(self, 'kwargs', {}),
-            'request':
-                request,
-            'filename':
-                filename,
-            'excel_writer_hook':
-                self.create_excel_file,
-            'headers_ordering':
-                [
-                    "id", "instance_id", "username", "staff_user", "provider",
-                    "start_date", "end_date", "image_name", "version_name",
-                    "size.active", "size.start_date", "size.end_date",
-                    "size.name", "size.id", "size.uuid", "size.url",
-                    "size.alias", "size.cpu", "size.mem", "size.disk",
-                    "is_featured_image", "hit_active", "hit_deploy_error",
-                    "hit_error", "hit_aborted", "hit_active_or_aborted",
-                    "hit_active_or_aborted_or_error"
-                ],
+            'view': self,
+            'args': getattr(self, 'args', ()),
+            'kwargs': getattr(self, 'kwargs', {}),
+            'request': request,
+            'filename': filename,
+            'excel_writer_hook': self.create_excel_file,
+            'headers_ordering': self.headers_ordering,
         }
 
     def set_frequency(self):
-        freq = self.request.query_params.get('frequency', 'MS').lower()
-        if freq in ['as', 'yearly']:
-            return 'AS'
-        elif freq in ['qs', 'quarterly']:
-            return 'QS'
-        elif freq in ['ms', 'monthly']:
-            return 'MS'
-        elif freq in ['w', 'weekly']:
-            return 'W'
-        elif freq in ['d', 'daily']:
-            return 'D'
-        elif freq in ['h', 'hourly']:
-            return 'H'
-        else:    # Invalid defaults: Monthly
-            return 'MS'
+        return parse_frequency(self.request.query_params.get('frequency'))
 
     def create_excel_file(self, raw_dataframe, writer):
+        return self.write_excel_file(
+            raw_dataframe, writer, self.set_frequency()
+        )
+
+    @classmethod
+    def write_excel_file(cls, raw_dataframe, writer, frequency):
         # Return if dataframe is empty
         if len(raw_dataframe.index) <= 1:
             return None
-        frequency = self.set_frequency()
-        new_datasets = self._create_datasets(raw_dataframe, frequency)
-        writer = self._format_and_print_workbook(
-            writer, new_datasets, frequency
-        )
+        new_datasets = cls._create_datasets(raw_dataframe, frequency)
+        writer = cls._format_and_print_workbook(writer, new_datasets, frequency)
         return writer
 
     @staticmethod
@@ -281,11 +336,32 @@ class ReportingViewSet(AuthModelViewSet):
         query_params = self.request.query_params
         query = self.get_filter_query(query_params)
 
-        queryset = instances_qs.select_related('source').prefetch_related(
-            'source__providermachine__application_version__application',
-        ).filter(query)
+        queryset = self.annotate_reporting_fields(instances_qs.filter(query))
         return queryset
 
+    @staticmethod
+    def annotate_reporting_fields(queryset):
+        """
+        Join or annotate everything InstanceReportingSerializer reads, so that
+        serializing the report takes a constant number of queries.
+        """
+        application_field = \
+            'source__providermachine__application_version__application'
+        return queryset.select_related(
+            'created_by', 'created_by_identity__provider', application_field,
+            'last_history__size'
+        ).annotate(
+            has_active_history=_has_history_with_status('active'),
+            has_deploy_error_history=_has_history_with_status('deploy_error'),
+            has_error_history=_has_history_with_status('error'),
+            has_featured_tag=Exists(
+                Application.objects.filter(
+                    id=OuterRef(application_field),
+                    tags__name__icontains='featured'
+                )
+            )
+        )
+
     @staticmethod
     def get_filter_query(query_params):
         query = Q()
@@ -337,6 +413,8 @@ class ReportingViewSet(AuthModelViewSet):
                 " ['start_date', 'end_date', 'provider_id']"
             )
         try:
+            if 'stream' in query_params:
+                return self.stream(request)
             results = super(ReportingViewSet,
                             self).list(request, *args, **kwargs)
         except ValueError:
@@ -344,3 +422,32 @@ class ReportingViewSet(AuthModelViewSet):
                 status.HTTP_400_BAD_REQUEST, 'Invalid filter parameters'
             )
         return results
+
+    def stream(self, request):
+        """
+        Stream the report (`?stream=true&format=csv|xlsx`), serializing one
+        instance at a time from a server-side cursor. Streamed XLSX reports
+        only include the raw data sheet: the summary sheets need the whole
+        report in memory.
+        """
+        export_format = request.accepted_renderer.format
+        if export_format not in ['csv', 'xlsx']:
+            return failure_response(
+                status.HTTP_400_BAD_REQUEST,
+                "Streaming is only available for the 'csv' and 'xlsx' formats"
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer_class = self.get_serializer_class()
+        serializer_context = self.get_serializer_context()
+        rows = (
+            flatten(
+                serializer_class(instance, context=serializer_context).data
+            ) for instance in queryset.iterator()
+        )
+        headers = self.get_renderer_context()['headers_ordering']
+        filename = request.query_params.get(
+            'filename', 'instance_reporting.%s' % export_format
+        )
+        if export_format == 'csv':
+            return stream_csv(rows, headers, filename)
+        return stream_xlsx(rows, headers, filename)
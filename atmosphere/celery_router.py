@@ -78,6 +78,10 @@ PERIODIC_TASKS = [
     "update_snapshot_cyverse_for",
     "allocation_threshold_check",
 ]
+REPORT_TASKS = [
+    "build_report",
+    "service.tasks.reporting.build_report",
+]
 SHORT_TASKS = [
     "wait_for_instance",
 ]
@@ -121,6 +125,8 @@ class CloudRouter(PredeclareRouter):
             return {"queue": "email", "routing_key": "email.sending"}
         elif task_name in PERIODIC_TASKS:
             return {"queue": "periodic", "routing_key": "periodic"}
+        elif task_name in REPORT_TASKS:
+            return {"queue": "reports", "routing_key": "reports"}
         elif task_name in DEPLOY_TASKS:
             return {"queue": "ssh_deploy", "routing_key": "long.deployment"}
         else:
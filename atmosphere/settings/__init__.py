@@ -21,6 +21,13 @@ ENFORCING = False
 
 CHECK_THRESHOLD = False
 
+# Extend allocation snapshots from the previous run instead of recomputing
+# usage since the last renewal on every run.
+ALLOCATION_SNAPSHOT_INCREMENTAL = True
+# Backend used to sum allocation usage: 'python' (report rows) or 'numpy'
+# (arrays read straight from histories and allocation source intervals)
+ALLOCATION_USAGE_BACKEND = 'python'
+
 BLACKLIST_TAGS = [
     "Featured",
 ]
@@ -420,6 +427,92 @@ CELERY_EVENT_SERIALIZER = "pickle"
 
 # Related to Broker and ResultBackend
 REDIS_CONNECT_RETRY = True
+
+# Django cache shared by every process (django-redis-cache). Entries are
+# prefixed with KEY_PREFIX, and each process keeps a pool of at most
+# 'max_connections', waiting up to 'timeout' seconds for a free one.
+# The test settings switch to a local-memory backend.
+CACHES = {
+    'default':
+        {
+            'BACKEND': 'redis_cache.RedisCache',
+            'LOCATION': 'redis://localhost:6379/1',
+            'KEY_PREFIX': 'atmosphere',
+            'OPTIONS':
+                {
+                    'CONNECTION_POOL_CLASS': 'redis.BlockingConnectionPool',
+                    'CONNECTION_POOL_CLASS_KWARGS':
+                        {
+                            'max_connections': 50,
+                            'timeout': 5,
+                        },
+                    'SOCKET_TIMEOUT': 5,
+                    'SOCKET_CONNECT_TIMEOUT': 5,
+                },
+        },
+}
+
+# Seconds the Django cache remembers whether a user is a cloud administrator
+# (forgotten as soon as one of their CloudAdministrator accounts changes)
+CLOUD_ADMIN_CACHE_TTL = 5 * 60
+
+# Cloud (rtwo) resource cache, see service/cache.py
+# Cache (of CACHES) holding the listings
+CLOUD_CACHE_ALIAS = 'default'
+# Bump to ignore everything cached by a previous deploy
+CLOUD_CACHE_VERSION = 1
+# Seconds a cached listing is considered fresh, per resource type
+CLOUD_CACHE_TTL = {
+    'instances': 30,
+    'volumes': 30,
+    'machines': 300,
+    'sizes': 300,
+}
+# Seconds an expired listing is still served while another worker refreshes it
+CLOUD_CACHE_STALE_TTL = 300
+# Seconds a caller waits for another caller to fill an empty entry
+CLOUD_CACHE_LOCK_WAIT = 5
+
+# Drivers kept by service/driver_pool.py
+# Seconds a driver is reused when its auth token expiry is unknown
+DRIVER_POOL_MAX_AGE = 1800
+# Most drivers kept per provider, least recently used are dropped first
+DRIVER_POOL_MAX_PER_PROVIDER = 200
+
+# monitor_instances_for: threads converting tenants' instances in parallel,
+# set MONITOR_INSTANCES_SERIAL to go back to one tenant at a time
+MONITOR_INSTANCES_CONCURRENCY = 8
+MONITOR_INSTANCES_SERIAL = False
+
+# Report jobs (core.models.ReportJob), built on the 'reports' celery queue
+# Seconds a completed report is served again for an identical spec
+REPORT_JOB_RESULT_TTL = 6 * 60 * 60
+# Seconds a report may take to build before the task is stopped
+REPORT_JOB_TIME_LIMIT = 60 * 60
+
+# Opt-in: seconds each process memoizes the answers of plugins that only
+# depend on their arguments (see core.plugins.PluginRegistry). Memoized answers
+# are not invalidated, so only set these (in local.py) when the plugins read
+# data that may be that stale. 0 (the default) always asks the plugins.
+ENFORCEMENT_OVERRIDE_PLUGIN_TTL = 0
+EXPIRATION_PLUGIN_TTL = 0
+
+# Seconds each process reuses its copy of the global maintenance records
+# before checking for changes, 0 to query them on every API request
+MAINTENANCE_CACHE_TTL = 10
+# Seconds after which that copy is reloaded even if no record was saved
+MAINTENANCE_CACHE_MAX_AGE = 5 * 60
+
+# Jetstream TAS API (jetstream.allocation.TASAPIDriver)
+# Seconds username mappings, projects and allocations stay in the Django cache
+TAS_API_CACHE_TTL = 15 * 60
+# Most TAS API requests (and reports sent) at once, also the size of the
+# keep-alive connection pool
+TAS_API_CONCURRENCY = 8
+# Times a report is re-sent to TAS after failing, waiting
+# TAS_REPORT_RETRY_BACKOFF seconds before the first retry, doubled after each
+TAS_REPORT_RETRIES = 3
+TAS_REPORT_RETRY_BACKOFF = 2
 # General Celery Settings
 #
 CELERY_ROUTES = ('atmosphere.celery_router.CloudRouter', )
@@ -5,7 +5,8 @@ from threepio import logger
 
 from core.models import (
     AllocationSource, Instance, AtmosphereUser, UserAllocationSnapshot,
-    InstanceAllocationSourceSnapshot, AllocationSourceSnapshot
+    InstanceAllocationSourceSnapshot, InstanceAllocationSourceInterval,
+    AllocationSourceSnapshot
 )
 from core.models import UserAllocationSource
 from core.models.allocation_source import get_allocation_source_object
@@ -79,7 +80,7 @@ def listen_before_allocation_snapshot_changes(sender, instance, raw, **kwargs):
     prev_email_event = EventTable.objects \
         .filter(name="allocation_source_threshold_met") \
         .filter(entity_id=allocation_source_name,
-                payload__threshold=percent_event_triggered)
+                threshold=percent_event_triggered)
     if prev_email_event:
         return
     new_payload = {
@@ -236,6 +237,7 @@ def listen_for_user_snapshot_changes(sender, instance, created, **kwargs):
         )
         snapshot.burn_rate = burn_rate
         snapshot.compute_used = compute_used
+        snapshot.reset_usage_watermark()
         snapshot.save()
     except UserAllocationSnapshot.DoesNotExist:
         snapshot = UserAllocationSnapshot.objects.create(
@@ -305,6 +307,9 @@ def listen_for_instance_allocation_changes(sender, instance, created, **kwargs):
         snapshot = InstanceAllocationSourceSnapshot.objects.create(
             allocation_source=allocation_source, instance=instance
         )
+    InstanceAllocationSourceInterval.record(
+        instance, allocation_source, event.timestamp
+    )
     return snapshot
 
 
@@ -373,6 +378,7 @@ def listen_for_allocation_source_created_or_renewed(
         for user_allocation_snapshot in allocation_source.user_allocation_snapshots.all(
         ):
             user_allocation_snapshot.compute_used = 0.0
+            user_allocation_snapshot.reset_usage_watermark()
             user_allocation_snapshot.save()
     else:
         # Jetstream
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import OuterRef, Subquery
+
+from core.models import Instance, InstanceStatusHistory
+
+
+def newest_history_ids():
+    """
+    Subquery: id of the newest InstanceStatusHistory of the outer Instance
+    """
+    histories = InstanceStatusHistory.objects.filter(instance=OuterRef('pk'))
+    return Subquery(histories.order_by('-start_date', '-id').values('id')[:1])
+
+
+def find_inconsistent_instances():
+    """
+    Return [(instance id, last_history id, newest history id)] for every
+    instance whose `last_history` is not its newest history
+    """
+    return [
+        row for row in Instance.objects.annotate(
+            newest_history_id=newest_history_ids()
+        ).values_list('id', 'last_history_id', 'newest_history_id').iterator()
+        if row[1] != row[2]
+    ]
+
+
+def backfill_last_history():
+    """
+    Point every instance at its newest history, in a single UPDATE
+    """
+    return Instance.objects.update(last_history=newest_history_ids())
+
+
+class Command(BaseCommand):
+    help = "Check (or, with --fix, backfill) Instance.last_history"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Point every instance at its newest history"
+        )
+
+    def handle(self, *args, **options):
+        if options['fix']:
+            updated = backfill_last_history()
+            self.stdout.write(
+                self.style.SUCCESS("Updated %s instances" % updated)
+            )
+            return
+        inconsistent = find_inconsistent_instances()
+        for instance_id, last_history_id, newest_id in inconsistent:
+            self.stdout.write(
+                "Instance %s: last_history=%s, newest history=%s" %
+                (instance_id, last_history_id, newest_id)
+            )
+        if inconsistent:
+            raise CommandError(
+                "%s instances have a stale last_history, "
+                "run with --fix to backfill them" % len(inconsistent)
+            )
+        self.stdout.write(
+            self.style.SUCCESS("Instance.last_history is consistent")
+        )
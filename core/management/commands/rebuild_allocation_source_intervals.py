@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.models import InstanceAllocationSourceInterval
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild InstanceAllocationSourceInterval from "
+        "'instance_allocation_source_changed' events"
+    )
+
+    def handle(self, *args, **options):
+        count = InstanceAllocationSourceInterval.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Rebuilt %s allocation source intervals" % count
+            )
+        )
@@ -1,7 +1,6 @@
-import pickle
 import collections
-import redis
 
+from django.core.cache import cache
 from threepio import logger
 from core.models import Instance
 
@@ -12,17 +11,14 @@ def _get_summarized_application_metrics(
     application, force=False, read_only=False
 ):
     metrics = collections.OrderedDict()
-    redis_cache = redis.StrictRedis()
     key = "metrics-application-summary-%s" % (application.id)
     try:
-        if redis_cache.exists(key) and not force:
-            pickled_object = redis_cache.get(key)
-            metrics = pickle.loads(pickled_object)
+        cached_metrics = None if force else cache.get(key)
+        if cached_metrics is not None:
+            metrics = cached_metrics
         elif not read_only:
             metrics = calculate_summarized_application_metrics(application)
-            pickled_object = pickle.dumps(metrics)
-            redis_cache.set(key, pickled_object)
-            redis_cache.expire(key, METRICS_CACHE_DURATION)
+            cache.set(key, metrics, METRICS_CACHE_DURATION)
     except:
         logger.exception("Unexpected errror in application metrics")
     return metrics
@@ -1,10 +1,8 @@
 """
  Instance metrics stored in graphite
 """
-import json
-
 from django.conf import settings
-import redis
+from django.core.cache import cache
 import requests
 
 from rest_framework.exceptions import NotFound
@@ -108,18 +106,15 @@ def _to_instance_key(instance, fields):
 
 def get_instance_metrics(instance, params=None):
     fields = params_to_fields(params)
-    key = _to_instance_key(instance, fields)
-    redis_cache = redis.StrictRedis()
+    key = "metrics-instance-%s" % _to_instance_key(instance, fields)
     instance_metrics = {}
     try:
-        if redis_cache.exists(key):
-            instance_metrics = json.loads(redis_cache.get(key))
-        else:
+        instance_metrics = cache.get(key)
+        if instance_metrics is None:
             instance_metrics = request_instance_metrics(
                 instance.provider_alias, params=params
             )
-            redis_cache.set(key, json.dumps(instance_metrics))
-            redis_cache.expire(key, CACHE_DURATION)
+            cache.set(key, instance_metrics, CACHE_DURATION)
     except Exception:
         logger.exception("Failed to retrieve metrics")
     return instance_metrics
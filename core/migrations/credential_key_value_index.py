@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-19 01:05
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', 'instance_allocation_source_interval'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='credential',
+            index_together=set([('key', 'value')]),
+        ),
+    ]
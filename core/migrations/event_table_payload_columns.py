@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-18 23:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+BACKFILL_PAYLOAD_COLUMNS = """
+UPDATE event_table SET
+    allocation_source_name = left(payload->>'allocation_source_name', 255),
+    instance_id = left(payload->>'instance_id', 255),
+    username = left(payload->>'username', 255),
+    threshold = CASE WHEN jsonb_typeof(payload->'threshold') = 'number'
+        THEN (payload->>'threshold')::double precision END
+WHERE jsonb_typeof(payload) = 'object'
+    AND payload ?| array[
+        'allocation_source_name', 'instance_id', 'username', 'threshold'
+    ];
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', 'report_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventtable',
+            name='allocation_source_name',
+            field=models.CharField(
+                blank=True, db_index=True, max_length=255, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name='eventtable',
+            name='instance_id',
+            field=models.CharField(
+                blank=True, db_index=True, max_length=255, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name='eventtable',
+            name='username',
+            field=models.CharField(
+                blank=True, db_index=True, max_length=255, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name='eventtable',
+            name='threshold',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_PAYLOAD_COLUMNS, migrations.RunSQL.noop),
+    ]
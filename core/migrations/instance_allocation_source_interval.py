@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-19 00:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BACKFILL_INTERVALS = """
+INSERT INTO instance_allocation_source_interval
+    (instance_id, allocation_source_id, valid_from, valid_to)
+SELECT instance.id, allocation_source.id, event_table.timestamp,
+    LEAD(event_table.timestamp) OVER (
+        PARTITION BY instance.id
+        ORDER BY event_table.timestamp, event_table.id
+    )
+FROM event_table
+JOIN instance ON instance.provider_alias = event_table.instance_id
+JOIN allocation_source ON allocation_source.name =
+    event_table.allocation_source_name OR (
+        event_table.allocation_source_name IS NULL
+        AND allocation_source.uuid::text =
+            event_table.payload->>'allocation_source_id'
+    )
+WHERE event_table.name = 'instance_allocation_source_changed'
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', 'event_table_payload_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstanceAllocationSourceInterval',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID'
+                    )
+                ),
+                ('valid_from', models.DateTimeField()),
+                ('valid_to', models.DateTimeField(blank=True, null=True)),
+                (
+                    'allocation_source',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='core.AllocationSource'
+                    )
+                ),
+                (
+                    'instance',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='allocation_source_intervals',
+                        to='core.Instance'
+                    )
+                ),
+            ],
+            options={
+                'db_table': 'instance_allocation_source_interval',
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='instanceallocationsourceinterval',
+            index_together=set([('instance', 'valid_from')]),
+        ),
+        migrations.RunSQL(BACKFILL_INTERVALS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-18 21:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', 'user_allocation_snapshot_usage_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='instance',
+            name='last_history',
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name='+',
+                to='core.InstanceStatusHistory'
+            ),
+        ),
+    ]
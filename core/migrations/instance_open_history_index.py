@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-19 01:40
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', 'credential_key_value_index'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='instance',
+            index_together=set([('created_by_identity', 'end_date')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='instancestatushistory',
+            index_together=set([('instance', 'end_date')]),
+        ),
+    ]
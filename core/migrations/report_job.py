@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-18 23:10
+from __future__ import unicode_literals
+
+from django.conf import settings
+import django.contrib.postgres.fields.jsonb
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', 'instance_last_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID'
+                    )
+                ),
+                (
+                    'uuid',
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, unique=True
+                    )
+                ),
+                (
+                    'report_type',
+                    models.CharField(
+                        choices=[
+                            ('instance', 'Instance report'),
+                            ('allocation', 'Allocation report')
+                        ],
+                        max_length=32
+                    )
+                ),
+                ('spec', django.contrib.postgres.fields.jsonb.JSONField()),
+                ('spec_hash', models.CharField(db_index=True, max_length=64)),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[
+                            ('pending', 'Pending'), ('running', 'Running'),
+                            ('complete', 'Complete'), ('error', 'Error')
+                        ],
+                        default='pending',
+                        max_length=32
+                    )
+                ),
+                (
+                    'result',
+                    django.contrib.postgres.fields.jsonb.JSONField(
+                        blank=True,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        null=True
+                    )
+                ),
+                ('error_message', models.TextField(blank=True, null=True)),
+                (
+                    'start_date',
+                    models.DateTimeField(default=django.utils.timezone.now)
+                ),
+                ('end_date', models.DateTimeField(blank=True, null=True)),
+                (
+                    'created_by',
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL
+                    )
+                ),
+            ],
+            options={
+                'db_table': 'report_job',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-18 19:05
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', 'remove-unused-applicationscore-model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userallocationsnapshot',
+            name='usage_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userallocationsnapshot',
+            name='usage_start_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userallocationsnapshot',
+            name='usage_watermark',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
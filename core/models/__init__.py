@@ -6,7 +6,8 @@ from django.db.models import ObjectDoesNotExist
 from core.models.access_token import AccessToken
 from core.models.allocation_source import (
     AllocationSource, UserAllocationSource, UserAllocationSnapshot,
-    InstanceAllocationSourceSnapshot, AllocationSourceSnapshot
+    InstanceAllocationSourceSnapshot, InstanceAllocationSourceInterval,
+    AllocationSourceSnapshot
 )
 from core.models.application import Application, ApplicationMembership,\
     ApplicationBookmark, ApplicationThreshold
@@ -41,6 +42,7 @@ from core.models.instance_source import InstanceSource
 from core.models.node import NodeController
 from core.models.boot_script import ScriptType, BootScript, ApplicationVersionBootScript
 from core.models.quota import Quota
+from core.models.report_job import ReportJob
 #from core.models.renewal_strategy import RenewalStrategy
 from core.models.resource_request import ResourceRequest
 from core.models.size import Size
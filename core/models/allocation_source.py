@@ -2,7 +2,7 @@ import decimal
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.db import connection, models, transaction
 from django.utils import timezone
 from threepio import logger
 from uuid import uuid4
@@ -66,11 +66,21 @@ class AllocationSource(models.Model):
         else:
             compute_allowed = self.compute_allowed
             last_snapshot = self.snapshot
+        compute_used = last_snapshot.compute_used if last_snapshot else 0
+        return self.remaining_compute(compute_allowed, compute_used)
+
+    @staticmethod
+    def remaining_compute(compute_allowed, compute_used):
+        """
+        Returns `compute_allowed - compute_used`, or Infinity if `compute_allowed` is negative.
+
+        Shared by `time_remaining` and the bulk evaluation in `monitor_allocation_sources`.
+        :return: decimal.Decimal
+        :rtype: decimal.Decimal
+        """
         if compute_allowed < 0:
             return decimal.Decimal('Infinity')
-        compute_used = last_snapshot.compute_used if last_snapshot else 0
-        remaining_compute = compute_allowed - compute_used
-        return remaining_compute
+        return compute_allowed - compute_used
 
     @property
     def compute_used_updated(self):
@@ -152,6 +162,26 @@ class UserAllocationSnapshot(models.Model):
     compute_used = models.DecimalField(max_digits=19, decimal_places=3)
     burn_rate = models.DecimalField(max_digits=19, decimal_places=3)
     updated = models.DateTimeField(auto_now=True)
+    # Incremental usage: `usage_seconds` is the (unrounded) CPU-seconds used
+    # between `usage_start_date` and `usage_watermark`.
+    usage_start_date = models.DateTimeField(null=True, blank=True)
+    usage_watermark = models.DateTimeField(null=True, blank=True)
+    usage_seconds = models.FloatField(default=0)
+
+    def can_resume_usage(self, start_date, end_date):
+        """
+        Return True if the stored partial usage was computed from `start_date`
+        and can be extended up to `end_date`.
+        """
+        if not self.usage_watermark or not self.usage_start_date:
+            return False
+        return self.usage_start_date == start_date \
+            and start_date <= self.usage_watermark <= end_date
+
+    def reset_usage_watermark(self):
+        self.usage_start_date = None
+        self.usage_watermark = None
+        self.usage_seconds = 0
 
     def __unicode__(self):
         return "User %s + AllocationSource %s: Total AU Usage:%s Burn Rate:%s hours/hour Updated:%s" %\
@@ -177,6 +207,103 @@ class InstanceAllocationSourceSnapshot(models.Model):
         app_label = 'core'
 
 
+# Rebuild every interval from `instance_allocation_source_changed` events,
+# each one lasting until the next event of its instance
+REBUILD_INTERVALS_SQL = """
+INSERT INTO instance_allocation_source_interval
+    (instance_id, allocation_source_id, valid_from, valid_to)
+SELECT instance.id, allocation_source.id, event_table.timestamp,
+    LEAD(event_table.timestamp) OVER (
+        PARTITION BY instance.id
+        ORDER BY event_table.timestamp, event_table.id
+    )
+FROM event_table
+JOIN instance ON instance.provider_alias = event_table.instance_id
+JOIN allocation_source ON allocation_source.name =
+    event_table.allocation_source_name OR (
+        event_table.allocation_source_name IS NULL
+        AND allocation_source.uuid::text =
+            event_table.payload->>'allocation_source_id'
+    )
+WHERE event_table.name = 'instance_allocation_source_changed'
+"""
+
+
+class InstanceAllocationSourceInterval(models.Model):
+    """
+    The allocation source an instance used from `valid_from` until
+    `valid_to` (NULL for the current one): one row per
+    `instance_allocation_source_changed` event, kept up to date by
+    `listen_for_instance_allocation_changes`.
+    """
+    instance = models.ForeignKey(
+        "Instance", related_name="allocation_source_intervals"
+    )
+    allocation_source = models.ForeignKey(AllocationSource)
+    valid_from = models.DateTimeField()
+    valid_to = models.DateTimeField(null=True, blank=True)
+
+    def __unicode__(self):
+        return "%s used allocation %s from %s to %s" %\
+            (self.instance, self.allocation_source,
+             self.valid_from, self.valid_to)
+
+    class Meta:
+        db_table = 'instance_allocation_source_interval'
+        app_label = 'core'
+        index_together = [('instance', 'valid_from')]
+
+    @classmethod
+    def record(cls, instance, allocation_source, valid_from):
+        """
+        Add the interval starting at `valid_from`: the interval it interrupts
+        now ends there, and the new one ends where the next one starts.
+        Recording the same interval again (e.g. when its event is re-saved)
+        returns the existing one.
+        """
+        intervals = cls.objects.filter(instance=instance)
+        existing = intervals.filter(
+            valid_from=valid_from, allocation_source=allocation_source
+        ).first()
+        if existing:
+            return existing
+        following = intervals.filter(valid_from__gt=valid_from
+                                    ).order_by('valid_from', 'id').first()
+        intervals.filter(valid_from__lte=valid_from).filter(
+            models.Q(valid_to__isnull=True) | models.Q(valid_to__gt=valid_from)
+        ).update(valid_to=valid_from)
+        return cls.objects.create(
+            instance=instance,
+            allocation_source=allocation_source,
+            valid_from=valid_from,
+            valid_to=following.valid_from if following else None
+        )
+
+    @classmethod
+    def allocation_source_at(cls, moment, **instance_lookup):
+        """
+        Return the allocation source used by an instance (`instance=` or any
+        other instance lookup, e.g. `instance__provider_alias=`) just before
+        `moment`, or None
+        """
+        interval = cls.objects.filter(
+            valid_from__lt=moment, **instance_lookup
+        ).select_related('allocation_source').order_by('-valid_from',
+                                                       '-id').first()
+        return interval.allocation_source if interval else None
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Replace every interval with intervals computed from the event table
+        """
+        with transaction.atomic():
+            cls.objects.all().delete()
+            with connection.cursor() as cursor:
+                cursor.execute(REBUILD_INTERVALS_SQL)
+        return cls.objects.count()
+
+
 class AllocationSourceSnapshot(models.Model):
     allocation_source = models.OneToOneField(
         AllocationSource, related_name="snapshot"
@@ -211,7 +338,7 @@ def total_usage(
     """
         This function outputs the total allocation usage in hours
     """
-    from service.allocation_logic import create_report
+    from service.allocation_report import create_report
     if not end_date:
         end_date = timezone.now()
     user_allocation = create_report(
@@ -222,10 +349,7 @@ def total_usage(
     )
     if email:
         return user_allocation
-    total_allocation = 0.0
-    for data in user_allocation:
-        if not data['allocation_source'] == 'N/A':
-            total_allocation += data['applicable_duration']
+    total_allocation = _sum_applicable_duration(user_allocation)
     compute_used_total = round(total_allocation / 3600.0, 2)
     if compute_used_total > 0:
         logger.info(
@@ -236,8 +360,7 @@ def total_usage(
             )
         )
     if burn_rate:
-        burn_rate_total = 0 if len(user_allocation
-                                  ) < 1 else user_allocation[-1]['burn_rate']
+        burn_rate_total = _last_burn_rate(user_allocation)
         if burn_rate_total != 0:
             logger.info(
                 "User %s with AllocationSource %s Burn Rate: %s" %
@@ -247,6 +370,98 @@ def total_usage(
     return compute_used_total
 
 
+def usage_seconds_for_source(allocation_source, start_date, end_date, users):
+    """
+    Return {username: [cpu_seconds, burn_rate]} for each user of the
+    allocation source, computed from a single report pass over all of them.
+    """
+    from service.allocation_report import create_report_for_users
+    users = list(users)
+    if not users:
+        return {}
+    if getattr(settings, 'ALLOCATION_USAGE_BACKEND', 'python') == 'numpy':
+        return _usage_seconds_columnar(
+            allocation_source, start_date, end_date, users
+        )
+    rows = create_report_for_users(
+        start_date,
+        end_date,
+        users,
+        allocation_source_name=allocation_source.name
+    )
+    rows_by_user = dict((user.username, []) for user in users)
+    for row in rows:
+        rows_by_user[row['username']].append(row)
+    usage = {}
+    for username, user_rows in rows_by_user.iteritems():
+        usage[username] = [
+            _sum_applicable_duration(user_rows),
+            _last_burn_rate(user_rows)
+        ]
+    return usage
+
+
+def _usage_seconds_columnar(allocation_source, start_date, end_date, users):
+    """
+    NumPy backend for `usage_seconds_for_source`: builds history slices
+    straight from the history and allocation source interval tables,
+    without producing report rows.
+    """
+    from service.allocation_columnar import HistorySlices
+    from service.allocation_logic import (
+        filter_events_and_instances, parse_report_dates
+    )
+    from service.allocation_report import _get_current_date_utc
+    start_date, end_date = parse_report_dates(start_date, end_date)
+    instances = filter_events_and_instances(start_date, end_date)['instances']
+    slices = HistorySlices.from_querysets(
+        instances.filter(created_by__in=users), start_date, end_date,
+        _get_current_date_utc()
+    )
+    seconds = slices.usage_by_user(start_date, end_date, allocation_source.name)
+    burn_rates = slices.burn_rate_by_user(allocation_source.name)
+    usage = {}
+    for user in users:
+        usage[user.username] = [
+            seconds.get(user.username, 0.0),
+            burn_rates.get(user.username, 0)
+        ]
+    return usage
+
+
+def total_usage_for_source(
+    allocation_source, start_date, end_date=None, users=None
+):
+    """
+    Batch version of `total_usage(..., burn_rate=True)`: returns
+    {username: [compute_used, burn_rate]} for every user of the allocation
+    source (or the `users` given) in hours, from one report pass.
+    """
+    if not end_date:
+        end_date = timezone.now()
+    if users is None:
+        users = allocation_source.all_users
+    usage = usage_seconds_for_source(
+        allocation_source, start_date, end_date, users
+    )
+    return dict(
+        (username, [round(seconds / 3600.0, 2), burn_rate])
+        for username, (seconds, burn_rate) in usage.iteritems()
+    )
+
+
+def _sum_applicable_duration(user_allocation):
+    total_allocation = 0.0
+    for data in user_allocation:
+        if not data['allocation_source'] == 'N/A':
+            total_allocation += data['applicable_duration']
+    return total_allocation
+
+
+def _last_burn_rate(user_allocation):
+    return 0 if len(user_allocation) < 1 else user_allocation[-1]['burn_rate']
+
+
 def get_allocation_source_object(source_id):
     if not source_id:
         raise Exception(
@@ -1,7 +1,11 @@
 """
 Cloud Administrator model for atmosphere
 """
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+
 from core.models.user import AtmosphereUser
 from core.models.provider import Provider
 import uuid
@@ -35,10 +39,27 @@ class CloudAdministrator(models.Model):
         app_label = 'core'
 
 
+CLOUD_ADMIN_KEY = "cloud-admin-user-%s"
+
+
 def cloud_admin_list(user):
     return CloudAdministrator.objects.filter(user=user)
 
 
+def is_cloud_admin(user):
+    """
+    Return whether `user` administers any provider, from the Django cache
+    (kept for `settings.CLOUD_ADMIN_CACHE_TTL` seconds, and dropped whenever
+    one of the user's CloudAdministrator accounts changes)
+    """
+    key = CLOUD_ADMIN_KEY % user.id
+    is_admin = cache.get(key)
+    if is_admin is None:
+        is_admin = cloud_admin_list(user).exists()
+        cache.set(key, is_admin, settings.CLOUD_ADMIN_CACHE_TTL)
+    return is_admin
+
+
 def admin_provider_list(user):
     cloud_admins = cloud_admin_list(user)
     provider_ids = cloud_admins.values_list('provider', flat=True)
@@ -51,3 +72,11 @@ def get_cloud_admin_for_provider(user, provider_uuid):
             .get(provider__uuid=provider_uuid)
     except CloudAdministrator.DoesNotExist:
         return None
+
+
+def invalidate_is_cloud_admin(sender, instance, **kwargs):
+    cache.delete(CLOUD_ADMIN_KEY % instance.user_id)
+
+
+post_save.connect(invalidate_is_cloud_admin, sender=CloudAdministrator)
+post_delete.connect(invalidate_is_cloud_admin, sender=CloudAdministrator)
@@ -7,6 +7,7 @@ Note:
 
 from uuid import uuid4
 from django.db import models
+from django.db.models.signals import post_delete, post_save
 from core.models.identity import Identity
 from core.models.provider import Provider
 
@@ -68,3 +69,28 @@ class Credential(models.Model):
     class Meta:
         db_table = 'credential'
         app_label = 'core'
+        # Tenant (ex_project_name) -> identity lookups
+        index_together = [('key', 'value')]
+
+
+def _clear_cached_credentials(field_name):
+    """
+    Return a receiver that drops the memoized credentials of the
+    Identity/Provider object a saved or deleted credential is attached to,
+    when that object is already loaded (e.g. `identity.credential_set.create`)
+    """
+
+    def clear_cached_credentials(sender, instance, **kwargs):
+        cache_name = sender._meta.get_field(field_name).get_cache_name()
+        owner = getattr(instance, cache_name, None)
+        if owner is not None:
+            owner.clear_credential_cache()
+
+    return clear_cached_credentials
+
+
+clear_identity_credentials = _clear_cached_credentials('identity')
+clear_provider_credentials = _clear_cached_credentials('provider')
+for signal in (post_save, post_delete):
+    signal.connect(clear_identity_credentials, sender=Credential)
+    signal.connect(clear_provider_credentials, sender=ProviderCredential)
@@ -32,6 +32,22 @@ class EventTable(models.Model):
     name = models.CharField(max_length=128, db_index=True)
     payload = JSONField()
     timestamp = models.DateTimeField(default=timezone.now, db_index=True)
+    # Copied from `payload` on save (see PAYLOAD_COLUMNS), so that the keys
+    # most often filtered on are indexed
+    allocation_source_name = models.CharField(
+        max_length=255, null=True, blank=True, db_index=True
+    )
+    instance_id = models.CharField(
+        max_length=255, null=True, blank=True, db_index=True
+    )
+    username = models.CharField(
+        max_length=255, null=True, blank=True, db_index=True
+    )
+    threshold = models.FloatField(null=True, blank=True)
+
+    PAYLOAD_COLUMNS = (
+        'allocation_source_name', 'instance_id', 'username', 'threshold'
+    )
 
     @classmethod
     def create_event(cls, name, payload, entity_id):
@@ -40,6 +56,58 @@ class EventTable(models.Model):
             name=name, entity_id=entity_id, payload=payload
         )
 
+    def set_payload_columns(self):
+        """
+        Copy the PAYLOAD_COLUMNS keys of `payload` into their columns
+        """
+        payload = self.payload if isinstance(self.payload, dict) else {}
+        for key in ['allocation_source_name', 'instance_id', 'username']:
+            value = payload.get(key)
+            setattr(self, key, None if value is None else unicode(value)[:255])
+        # Only JSON numbers, like BACKFILL_PAYLOAD_COLUMNS in
+        # core/migrations/event_table_payload_columns.py
+        threshold = payload.get('threshold')
+        if isinstance(threshold, (int, long, float)) \
+                and not isinstance(threshold, bool):
+            self.threshold = float(threshold)
+        else:
+            self.threshold = None
+
+    def save(self, *args, **kwargs):
+        self.set_payload_columns()
+        return super(EventTable, self).save(*args, **kwargs)
+
+    @classmethod
+    def bulk_create_events(cls, events, batch_size=None, dispatch=True):
+        """
+        Insert `events` with `bulk_create`, which sends no save signals, then
+        (unless `dispatch=False`) call their handlers in one pass, in order,
+        as if each event had been saved.
+
+        Pre-save handlers of an event run after the whole batch is inserted,
+        right before that event's post-save handlers.
+        """
+        for event in events:
+            event.set_payload_columns()
+        events = cls.objects.bulk_create(events, batch_size=batch_size)
+        if dispatch:
+            cls.dispatch_events(events)
+        return events
+
+    @staticmethod
+    def dispatch_events(events):
+        """
+        Call the handlers of events that were inserted without save signals
+        """
+        for event in events:
+            using = event._state.db
+            pre_save_handlers.dispatch(
+                event, raw=False, using=using, update_fields=None
+            )
+            post_save_handlers.dispatch(
+                event, created=True, raw=False, using=using, update_fields=None
+            )
+
     def __str__(self):
         return "%s" % self.name
 
@@ -51,24 +119,83 @@ class EventTable(models.Model):
         app_label = "core"
 
 
+class EventHandlerRegistry(object):
+    """
+    Maps an event name to the handlers of that event, so that saving an event
+    only calls the handlers registered for its name.
+
+    Handlers keep the signature of the signal they used to be connected to:
+    `handler(sender, instance, **kwargs)`.
+    """
+
+    def __init__(self):
+        self.handlers = {}
+
+    def register(self, event_name, handler):
+        handlers = self.handlers.setdefault(event_name, [])
+        if handler not in handlers:
+            handlers.append(handler)
+
+    def dispatch(self, event, **kwargs):
+        for handler in self.handlers.get(event.name, ()):
+            handler(sender=EventTable, instance=event, **kwargs)
+
+
+pre_save_handlers = EventHandlerRegistry()
+post_save_handlers = EventHandlerRegistry()
+
+
+def dispatch_pre_save(sender, instance, **kwargs):
+    pre_save_handlers.dispatch(instance, **kwargs)
+
+
+def dispatch_post_save(sender, instance, **kwargs):
+    post_save_handlers.dispatch(instance, **kwargs)
+
+
 # Instantiate the hooks:
-post_save.connect(listen_for_allocation_threshold_met, sender=EventTable)
-post_save.connect(listen_for_instance_allocation_changes, sender=EventTable)
-post_save.connect(
-    listen_for_allocation_source_created_or_renewed, sender=EventTable
+pre_save_handlers.register(
+    'allocation_source_snapshot', listen_before_allocation_snapshot_changes
+)
+post_save_handlers.register(
+    'allocation_source_threshold_met', listen_for_allocation_threshold_met
+)
+post_save_handlers.register(
+    'instance_allocation_source_changed', listen_for_instance_allocation_changes
+)
+post_save_handlers.register(
+    'allocation_source_created_or_renewed',
+    listen_for_allocation_source_created_or_renewed
+)
+post_save_handlers.register(
+    'allocation_source_compute_allowed_changed',
+    listen_for_allocation_source_compute_allowed_changed
+)
+post_save_handlers.register(
+    'user_allocation_source_created', listen_for_user_allocation_source_created
+)
+post_save_handlers.register(
+    'user_allocation_source_deleted', listen_for_user_allocation_source_deleted
+)
+post_save_handlers.register(
+    'instance_allocation_source_removed', listen_for_instance_allocation_removed
+)
+post_save_handlers.register(
+    'allocation_source_snapshot', listen_for_allocation_snapshot_changes
+)
+post_save_handlers.register(
+    'user_allocation_snapshot_changed', listen_for_user_snapshot_changes
+)
+post_save_handlers.register(
+    'allocation_source_renewal_strategy_changed',
+    listen_for_allocation_source_renewal_strategy_changed
 )
-post_save.connect(
-    listen_for_allocation_source_compute_allowed_changed, sender=EventTable
+post_save_handlers.register(
+    'allocation_source_name_changed', listen_for_allocation_source_name_changed
 )
-post_save.connect(listen_for_user_allocation_source_created, sender=EventTable)
-post_save.connect(listen_for_user_allocation_source_deleted, sender=EventTable)
-pre_save.connect(listen_before_allocation_snapshot_changes, sender=EventTable)
-post_save.connect(listen_for_instance_allocation_removed, sender=EventTable)
-post_save.connect(listen_for_allocation_snapshot_changes, sender=EventTable)
-post_save.connect(listen_for_user_snapshot_changes, sender=EventTable)
-post_save.connect(
-    listen_for_allocation_source_renewal_strategy_changed, sender=EventTable
+post_save_handlers.register(
+    'allocation_source_removed', listen_for_allocation_source_removed
 )
-post_save.connect(listen_for_allocation_source_name_changed, sender=EventTable)
-post_save.connect(listen_for_allocation_source_removed, sender=EventTable)
-post_save.connect(listen_for_quota_assigned, sender=EventTable)
+post_save_handlers.register('quota_assigned', listen_for_quota_assigned)
+pre_save.connect(dispatch_pre_save, sender=EventTable)
+post_save.connect(dispatch_post_save, sender=EventTable)
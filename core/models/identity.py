@@ -3,6 +3,8 @@
 Note:
   Multiple users can 'own' an identity (IdentityMembership - group.py)
 """
+from collections import OrderedDict
+
 from django.db import models
 from django.db.models import Q
 
@@ -327,6 +329,7 @@ class Identity(models.Model):
     @classmethod
     def update_credential(cls, identity, c_key, c_value, replace=False):
         from core.models import Credential
+        from service.driver_pool import invalidate_identity_drivers
         test_key_exists = Credential.objects.filter(
             identity=identity, key=c_key
         )
@@ -353,7 +356,11 @@ class Identity(models.Model):
                 return test_key_exists
             test_key_exists.value = c_value
             test_key_exists.save()
+            identity.clear_credential_cache()
+            invalidate_identity_drivers(identity)
             return test_key_exists
+        identity.clear_credential_cache()
+        invalidate_identity_drivers(identity)
         return Credential.objects.get_or_create(
             identity=identity, key=c_key, value=c_value
         )[0]
@@ -386,16 +393,28 @@ class Identity(models.Model):
                creds.get("tenant_name", False)     or \
                ""
 
+    def _credential_map(self):
+        """
+        Return {key: value} for this identity's credentials, loading them at
+        most once per instance (from `prefetch_related('credential_set')`
+        when available).
+        """
+        if getattr(self, '_credential_cache', None) is None:
+            self._credential_cache = dict(
+                (cred.key, cred.value) for cred in self.credential_set.all()
+            )
+        return self._credential_cache
+
+    def clear_credential_cache(self):
+        self._credential_cache = None
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        prefetched.pop('credential_set', None)
+
     def get_credential(self, key):
-        for cred in self.credential_set.all():
-            if cred.key == key:
-                return cred.value
-        return None
+        return self._credential_map().get(key)
 
     def get_credentials(self):
-        cred_dict = {}
-        for cred in self.credential_set.all():
-            cred_dict[cred.key] = cred.value
+        cred_dict = dict(self._credential_map())
 
         # Hotfix to avoid errors in rtwo+OpenStack
         # Note: when this hotfix is removed, the creds dict can be removed
@@ -405,12 +424,9 @@ class Identity(models.Model):
         return cred_dict
 
     def get_all_credentials(self):
-        cred_dict = {}
-        for cred in self.provider.providercredential_set.all():
-            cred_dict[cred.key] = cred.value
+        cred_dict = self.provider.get_credentials()
         # Allow overriding in the identity
-        for cred in self.credential_set.all():
-            cred_dict[cred.key] = cred.value
+        cred_dict.update(self._credential_map())
         return cred_dict
 
     def get_urls(self):
@@ -445,3 +461,35 @@ class Identity(models.Model):
         db_table = "identity"
         app_label = "core"
         verbose_name_plural = "identities"
+
+
+def credentials_for(identities):
+    """
+    Return an OrderedDict of {identity: identity.get_credentials()}.
+
+    Credentials of identities that have not loaded them yet (and were not
+    fetched with `prefetch_related('credential_set')`) are loaded with a
+    single query, and stay memoized on each identity afterwards.
+    """
+    from core.models.credential import Credential
+    identities = list(identities)
+    missing = {}
+    for identity in identities:
+        if getattr(identity, '_credential_cache', None) is not None:
+            continue
+        if 'credential_set' in getattr(
+            identity, '_prefetched_objects_cache', {}
+        ):
+            identity._credential_map()
+            continue
+        identity._credential_cache = {}
+        missing.setdefault(identity.id, []).append(identity)
+    if missing:
+        for identity_id, key, value in Credential.objects.filter(
+            identity_id__in=missing.keys()
+        ).values_list('identity_id', 'key', 'value'):
+            for identity in missing[identity_id]:
+                identity._credential_cache[key] = value
+    return OrderedDict(
+        (identity, identity.get_credentials()) for identity in identities
+    )
@@ -4,8 +4,8 @@
 from hashlib import md5
 from datetime import datetime, timedelta
 
-from django.db import models
-from django.db.models import (Q, ObjectDoesNotExist)
+from django.db import models, transaction
+from django.db.models import (Case, Q, ObjectDoesNotExist, Value, When)
 from django.utils import timezone
 
 import pytz
@@ -65,6 +65,15 @@ class Instance(models.Model):
     # FIXME  Problems when setting a default, missing auto_now_add
     start_date = models.DateTimeField()
     end_date = models.DateTimeField(null=True, blank=True)
+    # Newest InstanceStatusHistory, kept up to date by
+    # InstanceStatusHistory.save (see `_update_last_history`)
+    last_history = models.ForeignKey(
+        'InstanceStatusHistory',
+        models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
 
     # Model Managers
     objects = models.Manager()    # The default manager.
@@ -117,6 +126,9 @@ class Instance(models.Model):
         """
         Returns the newest InstanceStatusHistory
         """
+        if self.last_history_id and \
+                self.last_history.status.name == status_name:
+            return self.last_history
         has_history = self.instancestatushistory_set.order_by(
             '-start_date'
         ).filter(status__name=status_name).first()
@@ -134,9 +146,13 @@ class Instance(models.Model):
         # except InstanceStatusHistory.DoesNotExist:
         # TODO: Profile current choice
         # FIXME: Move this call so that it happens inside InstanceStatusHistory to avoid circ.dep.
-        last_history = self.instancestatushistory_set.order_by('-start_date'
-                                                              ).first()
+        if self.last_history_id:
+            return self.last_history
+        last_history = self.instancestatushistory_set.order_by(
+            '-start_date', '-id'
+        ).first()
         if last_history:
+            self._update_last_history(last_history)
             return last_history
         else:
             unknown_size, _ = Size.objects.get_or_create(
@@ -157,6 +173,17 @@ class Instance(models.Model):
             )
             return last_history
 
+    def _update_last_history(self, history):
+        """
+        Point `last_history` at `history`, unless a newer history exists
+        """
+        updated = Instance.objects.filter(id=self.id).filter(
+            Q(last_history__isnull=True) |
+            Q(last_history__start_date__lte=history.start_date)
+        ).update(last_history=history)
+        if updated:
+            self.last_history = history
+
     def _build_first_history(
         self,
         status_name,
@@ -224,7 +251,8 @@ class Instance(models.Model):
         )
 
         # 2. Get the last history (or Build a new one if no other exists)
-        has_history = self.instancestatushistory_set.all().count()
+        has_history = self.last_history_id or \
+            self.instancestatushistory_set.exists()
         if not has_history:
             last_history = InstanceStatusHistory.create_history(
                 status_name,
@@ -510,6 +538,15 @@ class Instance(models.Model):
         snapshot = Snapshot.objects.filter(instance=self).first()
         return snapshot.allocation_source if snapshot else None
 
+    def allocation_source_at(self, moment):
+        """
+        Return the allocation source this instance used just before `moment`
+        """
+        from core.models.allocation_source import InstanceAllocationSourceInterval
+        return InstanceAllocationSourceInterval.allocation_source_at(
+            moment, instance=self
+        )
+
     def change_allocation_source(self, allocation_source, user=None):
         """
         Call this method when you want to issue a 'change_allocation_source' event to the database.
@@ -546,6 +583,8 @@ class Instance(models.Model):
     class Meta:
         db_table = "instance"
         app_label = "core"
+        # Open instances of an identity (see service.monitoring)
+        index_together = [('created_by_identity', 'end_date')]
 
 
 """
@@ -843,6 +882,173 @@ def _esh_instance_size_to_core(esh_driver, esh_instance, provider_uuid):
     return core_size
 
 
+def convert_esh_instances(
+    esh_driver, esh_instances, provider_uuid, identity_uuid, user
+):
+    """
+    Bulk `convert_esh_instance` for the instances of one provider.
+
+    Instances, their sizes and their newest histories are loaded in a
+    handful of queries. Only the instances, sizes and histories that changed
+    are written: changed histories are end-dated in one UPDATE and their
+    replacements created with one `bulk_create`. Instances that are not in
+    the database yet go through `convert_esh_instance`.
+    Returns the core instances, in the order of `esh_instances`.
+    """
+    from core.models import InstanceStatus, InstanceStatusHistory
+    from core.models.provider import Provider
+    if not esh_instances:
+        return []
+    provider = Provider.objects.select_related('type').get(uuid=provider_uuid)
+    aliases = [esh_instance.id for esh_instance in esh_instances]
+    instances = Instance.objects.filter(
+        provider_alias__in=aliases
+    ).select_related('source__provider__type', 'created_by')
+    existing = dict(
+        (instance.provider_alias, instance) for instance in instances
+    )
+    histories = InstanceStatusHistory.objects.filter(
+        instance__in=existing.values()
+    ).order_by('instance_id', '-start_date').distinct('instance_id')
+    last_histories = dict(
+        (history.instance_id, history)
+        for history in histories.select_related('status', 'size')
+    )
+    core_sizes = _esh_instance_sizes_to_core(
+        esh_driver, esh_instances, provider
+    )
+    core_instances = []
+    histories_to_end = []
+    new_histories = []
+    statuses = {}
+    now_time = timezone.now()
+    for esh_instance in esh_instances:
+        core_instance = existing.get(esh_instance.id)
+        if not core_instance:
+            core_instances.append(
+                convert_esh_instance(
+                    esh_driver, esh_instance, provider_uuid, identity_uuid, user
+                )
+            )
+            continue
+        _update_changed_core_instance(core_instance, _find_esh_ip(esh_instance))
+        core_instance.esh = esh_instance
+        core_instances.append(core_instance)
+        core_size = core_sizes[esh_instance.size.id]
+        metadata = esh_instance.extra.get('metadata', {})
+        status_name = _get_status_name_for_provider(
+            provider, esh_instance.extra['status'],
+            esh_instance.extra.get('task'),
+            metadata.get('tmp_status', "MISSING")
+        )
+        last_history = last_histories.get(core_instance.id)
+        if last_history and last_history.status.name == status_name \
+                and last_history.size_id == core_size.id:
+            continue
+        extra = InstanceStatusHistory._build_extra(
+            status_name=status_name,
+            fault=esh_instance.extra.get('fault', None),
+            deploy_fault_message=metadata.get('fault_message', None),
+            deploy_fault_trace=metadata.get('fault_trace', None)
+        )
+        if last_history:
+            start_date = now_time
+            histories_to_end.append(last_history.id)
+            logger.info(
+                "Status Update - User:%s Instance:%s Old:%s New:%s Time:%s" % (
+                    core_instance.created_by, core_instance.provider_alias,
+                    last_history.status.name, status_name, start_date
+                )
+            )
+        else:
+            start_date = core_instance.start_date
+        if status_name not in statuses:
+            statuses[status_name] = InstanceStatus.objects.get_or_create(
+                name=status_name
+            )[0]
+        new_histories.append(
+            InstanceStatusHistory(
+                instance=core_instance,
+                size=core_size,
+                status=statuses[status_name],
+                activity=core_instance.esh_activity(),
+                start_date=start_date,
+                extra=extra
+            )
+        )
+    with transaction.atomic():
+        InstanceStatusHistory.objects.filter(id__in=histories_to_end
+                                            ).update(end_date=now_time)
+        InstanceStatusHistory.objects.bulk_create(new_histories)
+        # bulk_create skips InstanceStatusHistory.save, point the instances
+        # at their new (newest) history here
+        if new_histories:
+            Instance.objects.filter(
+                id__in=[history.instance_id for history in new_histories]
+            ).update(
+                last_history=Case(
+                    *[
+                        When(id=history.instance_id, then=Value(history.id))
+                        for history in new_histories
+                    ],
+                    output_field=models.IntegerField()
+                )
+            )
+    for history in new_histories:
+        history.instance.last_history = history
+    logger.debug(
+        "Converted %s instances, %s new histories" %
+        (len(core_instances), len(new_histories))
+    )
+    return core_instances
+
+
+def _update_changed_core_instance(core_instance, ip_address):
+    """
+    `_update_core_instance`, saving only when something changed
+    """
+    if core_instance.ip_address == ip_address and not core_instance.end_date:
+        return
+    _update_core_instance(core_instance, ip_address, None)
+
+
+def _esh_instance_sizes_to_core(esh_driver, esh_instances, provider):
+    """
+    Return {size alias: core size} for the sizes of `esh_instances`, looking
+    up each distinct MockSize (and core size) once.
+    """
+    esh_sizes = {}
+    for esh_instance in esh_instances:
+        esh_size = esh_instance.size
+        if esh_size.id in esh_sizes:
+            continue
+        if isinstance(esh_size, MockSize):
+            lc_size = esh_driver.get_size(esh_size.id, forced_lookup=True)
+            if lc_size:
+                esh_size = OSSize(lc_size)
+        esh_sizes[esh_size.id] = esh_size
+    sizes = Size.objects.filter(provider=provider, alias__in=esh_sizes.keys())
+    core_sizes = dict((size.alias, size) for size in sizes)
+    for alias, esh_size in esh_sizes.iteritems():
+        core_size = core_sizes.get(alias)
+        if not core_size or _size_changed(core_size, esh_size):
+            core_size = convert_esh_size(esh_size, provider.uuid)
+        core_size.esh = esh_size
+        core_sizes[alias] = core_size
+    return core_sizes
+
+
+def _size_changed(core_size, esh_size):
+    if isinstance(esh_size, MockSize) or core_size.name != esh_size.name:
+        return True
+    # `_update_from_cloud_size` ignores sizes without cpu/ram
+    if esh_size.cpu < 1 or esh_size.ram < 1:
+        return False
+    core_values = (core_size.disk, core_size.root, core_size.cpu, core_size.mem)
+    esh_values = (esh_size.disk, esh_size.ephemeral, esh_size.cpu, esh_size.ram)
+    return core_values != esh_values
+
+
 def set_instance_from_metadata(esh_driver, core_instance):
     """
     NOT BEING USED ANYMORE.. DEPRECATED..
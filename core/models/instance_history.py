@@ -58,6 +58,12 @@ class InstanceStatusHistory(models.Model):
     end_date = models.DateTimeField(null=True, blank=True)
     extra = JSONField(null=True, blank=True)
 
+    def save(self, *args, **kwargs):
+        created = self.pk is None
+        super(InstanceStatusHistory, self).save(*args, **kwargs)
+        if created:
+            self.instance._update_last_history(self)
+
     def previous(self):
         """
         Given that you are a node on a linked-list, traverse yourself backwards
@@ -283,3 +289,5 @@ class InstanceStatusHistory(models.Model):
     class Meta:
         db_table = "instance_status_history"
         app_label = "core"
+        # Open histories of an instance (end_date=None)
+        index_together = [('instance', 'end_date')]
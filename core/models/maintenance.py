@@ -1,11 +1,82 @@
 import collections
+import threading
+import time
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models
 from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
 from django.utils import timezone
 
 from core.models.provider import Provider
 
+# Bumped in the shared cache whenever a MaintenanceRecord changes, so every
+# process knows to reload its copy of the global records
+MAINTENANCE_VERSION_KEY = 'maintenance_record:version'
+
+
+class GlobalMaintenanceCache(object):
+    """
+    Per-process copy of the current and upcoming maintenance records that
+    apply to every provider, for the checks made on every API request.
+
+    The copy is reused for `settings.MAINTENANCE_CACHE_TTL` seconds. After
+    that the version in the shared cache is checked, and the records are only
+    reloaded from the database when it changed, or when the copy is older
+    than `settings.MAINTENANCE_CACHE_MAX_AGE` (for changes made without
+    saving a MaintenanceRecord, e.g. `QuerySet.update`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.records = None
+            self.version = None
+            self.expires = 0
+            self.loaded = 0
+
+    def _load(self):
+        now = timezone.now()
+        return list(
+            MaintenanceRecord.objects.filter(
+                Q(end_date__gt=now) | Q(end_date__isnull=True),
+                provider__isnull=True
+            )
+        )
+
+    def active(self):
+        ttl = getattr(settings, 'MAINTENANCE_CACHE_TTL', 0)
+        if not ttl:
+            return list(MaintenanceRecord.active())
+        if self.records is None or self.expires <= time.time():
+            version = cache.get(MAINTENANCE_VERSION_KEY)
+            if version is None:
+                cache.add(MAINTENANCE_VERSION_KEY, 1, None)
+                version = cache.get(MAINTENANCE_VERSION_KEY, 1)
+            max_age = getattr(settings, 'MAINTENANCE_CACHE_MAX_AGE', 0)
+            with self._lock:
+                if self.records is None or version != self.version\
+                        or self.loaded + max_age <= time.time():
+                    self.records = self._load()
+                    self.version = version
+                    self.loaded = time.time()
+                self.expires = time.time() + ttl
+        now = timezone.now()
+        started = [
+            record for record in self.records if record.start_date <= now
+        ]
+        return [
+            record for record in started
+            if record.end_date is None or record.end_date > now
+        ]
+
+
+global_maintenance = GlobalMaintenanceCache()
+
 
 class MaintenanceRecord(models.Model):
     """
@@ -38,6 +109,14 @@ class MaintenanceRecord(models.Model):
             records = records.filter(Q(provider__isnull=True))
         return records
 
+    @classmethod
+    def active_global(cls):
+        """
+        Return the records active now that apply to every provider, from the
+        per-process `global_maintenance` cache
+        """
+        return global_maintenance.active()
+
     def json(self):
         json = {
             'start': self.start_date,
@@ -58,3 +137,16 @@ class MaintenanceRecord(models.Model):
     class Meta:
         db_table = "maintenance_record"
         app_label = "core"
+
+
+def invalidate_global_maintenance(sender, instance, **kwargs):
+    global_maintenance.clear()
+    try:
+        cache.incr(MAINTENANCE_VERSION_KEY)
+    except ValueError:
+        # The version was lost, start from one no process can have seen
+        cache.set(MAINTENANCE_VERSION_KEY, int(time.time() * 1000), None)
+
+
+post_save.connect(invalidate_global_maintenance, sender=MaintenanceRecord)
+post_delete.connect(invalidate_global_maintenance, sender=MaintenanceRecord)
@@ -237,9 +237,25 @@ class Provider(models.Model):
     def get_location(self):
         return self.location
 
+    def _credential_map(self):
+        """
+        Return {key: value} for this provider's credentials, loading them at
+        most once per instance (from
+        `prefetch_related('providercredential_set')` when available).
+        """
+        if getattr(self, '_credential_cache', None) is None:
+            self._credential_cache = dict(
+                (cred.key, cred.value) for cred in self.credentials()
+            )
+        return self._credential_cache
+
+    def clear_credential_cache(self):
+        self._credential_cache = None
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        prefetched.pop('providercredential_set', None)
+
     def get_credential(self, key):
-        cred = self.providercredential_set.filter(key=key)
-        return cred[0].value if cred else None
+        return self._credential_map().get(key)
 
     def credentials(self):
         return self.providercredential_set.all()
@@ -251,10 +267,7 @@ class Provider(models.Model):
         instead of
         [ <Credential: Key=key, Value=abc>, <Credential: Key=secret Value=xyz> ]
         """
-        cred_map = {}
-        for cred in self.credentials():
-            cred_map[cred.key] = cred.value
-        return cred_map
+        return dict(self._credential_map())
 
     def get_routers(self):
         """
@@ -0,0 +1,107 @@
+import hashlib
+import json
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.postgres.fields import JSONField
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models.user import AtmosphereUser as User
+
+
+class ReportJob(models.Model):
+    """
+    A report built by the `build_report` celery task.
+
+    Jobs are keyed by a hash of their report type and spec, so that repeated
+    requests for the same report are served by the same job.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETE = 'complete'
+    ERROR = 'error'
+    STATUSES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (COMPLETE, 'Complete'),
+        (ERROR, 'Error'),
+    )
+    INSTANCE_REPORT = 'instance'
+    ALLOCATION_REPORT = 'allocation'
+    REPORT_TYPES = (
+        (INSTANCE_REPORT, 'Instance report'),
+        (ALLOCATION_REPORT, 'Allocation report'),
+    )
+
+    uuid = models.UUIDField(default=uuid4, unique=True, editable=False)
+    report_type = models.CharField(max_length=32, choices=REPORT_TYPES)
+    spec = JSONField()
+    spec_hash = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=32, choices=STATUSES, default=PENDING)
+    result = JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error_message = models.TextField(null=True, blank=True)
+    created_by = models.ForeignKey(User, null=True, on_delete=models.SET_NULL)
+    start_date = models.DateTimeField(default=timezone.now)
+    end_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "report_job"
+        app_label = "core"
+
+    def __unicode__(self):
+        return "%s report %s (%s)" % (self.report_type, self.uuid, self.status)
+
+    @staticmethod
+    def hash_spec(report_type, spec):
+        spec_json = json.dumps([report_type, spec], sort_keys=True)
+        return hashlib.sha256(spec_json).hexdigest()
+
+    @classmethod
+    def find_cached(cls, report_type, spec):
+        """
+        Return a job that can answer this spec: one still being built, or one
+        completed less than REPORT_JOB_RESULT_TTL seconds ago
+        """
+        now = timezone.now()
+        return cls.objects.filter(
+            spec_hash=cls.hash_spec(report_type, spec)
+        ).filter(
+            Q(
+                status__in=[cls.PENDING, cls.RUNNING],
+                start_date__gte=now -
+                timedelta(seconds=settings.REPORT_JOB_TIME_LIMIT)
+            ) | Q(
+                status=cls.COMPLETE,
+                end_date__gte=now -
+                timedelta(seconds=settings.REPORT_JOB_RESULT_TTL)
+            )
+        ).order_by('-start_date').first()
+
+    @classmethod
+    def create_job(cls, report_type, spec, user):
+        return cls.objects.create(
+            report_type=report_type,
+            spec=spec,
+            spec_hash=cls.hash_spec(report_type, spec),
+            created_by=user
+        )
+
+    def start(self):
+        self.status = self.RUNNING
+        self.save(update_fields=['status'])
+
+    def complete(self, result):
+        self.status = self.COMPLETE
+        self.result = result
+        self.end_date = timezone.now()
+        self.save(update_fields=['status', 'result', 'end_date'])
+
+    def fail(self, error_message):
+        self.status = self.ERROR
+        self.error_message = error_message
+        self.end_date = timezone.now()
+        self.save(update_fields=['status', 'error_message', 'end_date'])
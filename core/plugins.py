@@ -1,10 +1,14 @@
 import inspect
+import threading
+import time
 
 import enum
 
 from django.utils.module_loading import import_string
 from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
 from django.conf import settings
+from django.dispatch import receiver
 from threepio import logger
 
 
@@ -12,6 +16,98 @@ def load_plugin_class(plugin_path):
     return import_string(plugin_path)
 
 
+class PluginRegistry(object):
+    """
+    Per-process cache of plugin instances, plugin method checks and
+    (optionally) plugin answers.
+
+    Plugins are imported and instantiated once per list of plugin paths, and
+    each plugin method is checked against the kwargs it will be called with
+    once, instead of on every call. Answers are only memoized when asked to,
+    for `ttl` seconds.
+    """
+    max_results = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._instances = {}
+            self._checked = set()
+            self._results = {}
+
+    def get_instances(self, plugin_paths):
+        plugin_paths = tuple(plugin_paths)
+        instances = self._instances.get(plugin_paths)
+        if instances is None:
+            instances = [
+                load_plugin_class(plugin_path)() for plugin_path in plugin_paths
+            ]
+            with self._lock:
+                instances = self._instances.setdefault(plugin_paths, instances)
+        return instances
+
+    def check_method(self, plugin, method_name, kwarg_names):
+        """
+        Log (once) when `plugin.method_name` is missing or does not accept
+        `kwarg_names`
+        """
+        key = (type(plugin), method_name, tuple(kwarg_names))
+        if key in self._checked:
+            return
+        try:
+            inspect.getcallargs(
+                getattr(plugin, method_name),
+                **{name: None
+                   for name in kwarg_names}
+            )
+        except AttributeError:
+            logger.info(
+                "Plugin %s missing method '%s'", type(plugin), method_name
+            )
+        except TypeError:
+            logger.info(
+                "Plugin %s method '%s' does not accept kwargs %s", type(plugin),
+                method_name, ", ".join(kwarg_names)
+            )
+        with self._lock:
+            self._checked.add(key)
+
+    def get_result(self, key):
+        """
+        Return `(True, answer)` for a memoized answer that has not expired,
+        `(False, None)` otherwise
+        """
+        found = self._results.get(key)
+        if found and found[0] > time.time():
+            return True, found[1]
+        return False, None
+
+    def set_result(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            if len(self._results) >= self.max_results:
+                self._results = {
+                    result_key: found
+                    for result_key, found in self._results.items()
+                    if found[0] > now
+                }
+                if len(self._results) >= self.max_results:
+                    self._results.clear()
+            self._results[key] = (now + ttl, value)
+
+
+plugin_registry = PluginRegistry()
+
+
+@receiver(setting_changed)
+def clear_plugin_registry(**kwargs):
+    # Plugins and their answers depend on settings (e.g. in tests)
+    plugin_registry.clear()
+
+
 class PluginManager(object):
     plugin_required = False
     plugin_required_message = "A Plugin is required."
@@ -65,6 +161,8 @@ To restore 'basic' functionality, please set settings.MACHINE_VALIDATION_PLUGIN
 class PluginListManager(object):
     plugin_required = False
     plugin_required_message = "At least one plugin is required."
+    # Name of the setting with the seconds to memoize plugin answers for
+    result_ttl_setting = None
 
     @classmethod
     def load_plugins(cls, list_of_classes):
@@ -81,6 +179,37 @@ class PluginListManager(object):
             raise ImproperlyConfigured(cls.plugin_required_message)
         return plugin_class_list
 
+    @classmethod
+    def get_plugins(cls, method_name, kwarg_names):
+        """
+        Return the plugins of `cls.list_of_classes`, imported, instantiated and
+        checked for `method_name(**kwarg_names)` once per process.
+        """
+        if cls.plugin_required and not cls.list_of_classes:
+            raise ImproperlyConfigured(cls.plugin_required_message)
+        plugins = plugin_registry.get_instances(cls.list_of_classes)
+        for plugin in plugins:
+            plugin_registry.check_method(plugin, method_name, kwarg_names)
+        return plugins
+
+    @classmethod
+    def call_plugin(cls, plugin, method_name, memo_key=None, **kwargs):
+        """
+        Return `plugin.method_name(**kwargs)`. When `cls.result_ttl_setting`
+        names a positive number of seconds and a `memo_key` is given, the
+        answer is memoized for that long.
+        """
+        ttl = getattr(settings, cls.result_ttl_setting, 0)\
+            if cls.result_ttl_setting else 0
+        if not ttl or memo_key is None:
+            return getattr(plugin, method_name)(**kwargs)
+        key = (type(plugin), method_name, memo_key)
+        found, value = plugin_registry.get_result(key)
+        if not found:
+            value = getattr(plugin, method_name)(**kwargs)
+            plugin_registry.set_result(key, value, ttl)
+        return value
+
 
 class DefaultQuotaPluginManager(PluginListManager):
     """
@@ -95,24 +224,9 @@ class DefaultQuotaPluginManager(PluginListManager):
         Load each Default Quota Plugin and call `plugin.get_default_quota(user, provider)`
         """
         _default_quota = None
-        for DefaultQuotaPlugin in cls.load_plugins(cls.list_of_classes):
-            plugin = DefaultQuotaPlugin()
-            try:
-                inspect.getcallargs(
-                    getattr(plugin, 'get_default_quota'),
-                    user=user,
-                    provider=provider
-                )
-            except AttributeError:
-                logger.info(
-                    "Validation plugin %s missing method 'get_default_quota'" %
-                    DefaultQuotaPlugin
-                )
-            except TypeError:
-                logger.info(
-                    "Validation plugin %s does not accept kwargs `user` & `provider`"
-                    % DefaultQuotaPlugin
-                )
+        for plugin in cls.get_plugins(
+            'get_default_quota', ('user', 'provider')
+        ):
             _default_quota = plugin.get_default_quota(
                 user=user, provider=provider
             )
@@ -134,6 +248,17 @@ class AllocationSourcePluginManager(PluginListManager):
     """
     list_of_classes = getattr(settings, 'ALLOCATION_SOURCE_PLUGINS', [])
     plugin_required = True    # For now...
+    result_ttl_setting = 'ENFORCEMENT_OVERRIDE_PLUGIN_TTL'
+    enforcement_override_kwargs = ('user', 'allocation_source', 'provider')
+
+    @classmethod
+    def _enforcement_override_key(
+        cls, plugin, user, allocation_source, provider
+    ):
+        provider_id = provider.id if provider else None
+        if getattr(plugin, 'enforcement_override_per_user', True):
+            return (allocation_source.id, provider_id, user.id)
+        return (allocation_source.id, provider_id)
 
     @classmethod
     def ensure_user_allocation_sources(cls, user, provider=None):
@@ -148,24 +273,9 @@ class AllocationSourcePluginManager(PluginListManager):
         :rtype: bool
         """
         _has_valid_allocation_sources = False
-        for AllocationSourcePlugin in cls.load_plugins(cls.list_of_classes):
-            plugin = AllocationSourcePlugin()
-            try:
-                inspect.getcallargs(
-                    getattr(plugin, 'ensure_user_allocation_source'),
-                    user=user,
-                    provider=provider
-                )
-            except AttributeError:
-                logger.info(
-                    "Allocation Source plugin %s missing method 'ensure_user_allocation_source'",
-                    AllocationSourcePlugin
-                )
-            except TypeError:
-                logger.info(
-                    "Allocation Source plugin %s does not accept kwargs `user` & `provider`",
-                    AllocationSourcePlugin
-                )
+        for plugin in cls.get_plugins(
+            'ensure_user_allocation_source', ('user', 'provider')
+        ):
             _has_valid_allocation_sources = plugin.ensure_user_allocation_source(
                 user=user, provider=provider
             )
@@ -191,26 +301,15 @@ class AllocationSourcePluginManager(PluginListManager):
         :rtype: EnforcementOverrideChoice
         """
         _enforcement_override_choice = EnforcementOverrideChoice.NO_OVERRIDE
-        for AllocationSourcePlugin in cls.load_plugins(cls.list_of_classes):
-            plugin = AllocationSourcePlugin()
-            try:
-                inspect.getcallargs(
-                    getattr(plugin, 'get_enforcement_override'),
-                    user=user,
-                    allocation_source=allocation_source,
-                    provider=provider
-                )
-            except AttributeError:
-                logger.info(
-                    "Allocation Source plugin %s missing method 'get_enforcement_override'",
-                    AllocationSourcePlugin
-                )
-            except TypeError:
-                logger.info(
-                    "Allocation Source plugin %s does not accept kwargs `user`, `allocation_source`, & `provider`",
-                    AllocationSourcePlugin
-                )
-            _enforcement_override_choice = plugin.get_enforcement_override(
+        for plugin in cls.get_plugins(
+            'get_enforcement_override', cls.enforcement_override_kwargs
+        ):
+            _enforcement_override_choice = cls.call_plugin(
+                plugin,
+                'get_enforcement_override',
+                memo_key=cls._enforcement_override_key(
+                    plugin, user, allocation_source, provider
+                ),
                 user=user,
                 allocation_source=allocation_source,
                 provider=provider
@@ -219,6 +318,47 @@ class AllocationSourcePluginManager(PluginListManager):
                 return _enforcement_override_choice
         return _enforcement_override_choice
 
+    @classmethod
+    def get_enforcement_override_resolver(cls, provider=None):
+        """Returns a function `resolve(user, allocation_source)` which behaves like `get_enforcement_override`, for
+        evaluating many user & allocation source combinations in one pass.
+
+        Each Allocation Source Plugin is loaded, instantiated and checked once, rather than once per combination.
+        Answers are memoized per allocation source for plugins which set `enforcement_override_per_user = False`, and
+        per user & allocation source for all other plugins.
+
+        :param provider: The provider (optional, not used by any plugins yet)
+        :type provider: core.models.Provider
+        :return: A function returning the `EnforcementOverrideChoice` for a user & allocation source
+        :rtype: function
+        """
+        plugins = cls.get_plugins(
+            'get_enforcement_override', cls.enforcement_override_kwargs
+        )
+        memo = {}
+
+        def resolve(user, allocation_source):
+            _enforcement_override_choice = EnforcementOverrideChoice.NO_OVERRIDE
+            for plugin in plugins:
+                key = (plugin, ) + cls._enforcement_override_key(
+                    plugin, user, allocation_source, provider
+                )
+                if key not in memo:
+                    memo[key] = cls.call_plugin(
+                        plugin,
+                        'get_enforcement_override',
+                        memo_key=key[1:],
+                        user=user,
+                        allocation_source=allocation_source,
+                        provider=provider
+                    )
+                _enforcement_override_choice = memo[key]
+                if _enforcement_override_choice != EnforcementOverrideChoice.NO_OVERRIDE:
+                    return _enforcement_override_choice
+            return _enforcement_override_choice
+
+        return resolve
+
 
 class AccountCreationPluginManager(PluginListManager):
     """
@@ -282,20 +422,7 @@ class ValidationPluginManager(PluginListManager):
         Load each ValidationPlugin and call `plugin.validate_user(user)`
         """
         _is_valid = False
-        for ValidationPlugin in cls.load_plugins(cls.list_of_classes):
-            plugin = ValidationPlugin()
-            try:
-                inspect.getcallargs(getattr(plugin, 'validate_user'), user=user)
-            except AttributeError:
-                logger.info(
-                    "Validation plugin %s missing method 'validate_user'" %
-                    ValidationPlugin
-                )
-            except TypeError:
-                logger.info(
-                    "Validation plugin %s does not accept kwarg `user`" %
-                    ValidationPlugin
-                )
+        for plugin in cls.get_plugins('validate_user', ('user', )):
             _is_valid = plugin.validate_user(user=user)
             if _is_valid:
                 return True
@@ -311,6 +438,7 @@ class ExpirationPluginManager(PluginListManager):
     For that, see ValidationPlugin
     """
     list_of_classes = getattr(settings, 'EXPIRATION_PLUGINS', [])
+    result_ttl_setting = 'EXPIRATION_PLUGIN_TTL'
 
     @classmethod
     def is_expired(cls, user):
@@ -318,27 +446,16 @@ class ExpirationPluginManager(PluginListManager):
         Load each ExpirationPlugin and call `plugin.is_expired(user)`
         """
         _is_expired = False
-        for ExpirationPlugin in cls.load_plugins(cls.list_of_classes):
-            plugin = ExpirationPlugin()
-            try:
-                inspect.getcallargs(getattr(plugin, 'is_expired'), user=user)
-            except AttributeError:
-                logger.info(
-                    "Expiration plugin %s does not have a 'is_expired' method" %
-                    ExpirationPlugin
-                )
-            except TypeError:
-                logger.info(
-                    "Expiration plugin %s does not accept kwarg `user`" %
-                    ExpirationPlugin
-                )
+        for plugin in cls.get_plugins('is_expired', ('user', )):
             try:
                 # TODO: Set a reasonable timeout but don't let it hold this indefinitely
-                _is_expired = plugin.is_expired(user=user)
+                _is_expired = cls.call_plugin(
+                    plugin, 'is_expired', memo_key=user.id, user=user
+                )
             except Exception as exc:
                 logger.info(
                     "Expiration plugin %s encountered an error: %s" %
-                    (ExpirationPlugin, exc)
+                    (type(plugin), exc)
                 )
                 _is_expired = True
 
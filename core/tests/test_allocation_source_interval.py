@@ -0,0 +1,88 @@
+import uuid
+from datetime import timedelta
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from api.tests.factories import AllocationSourceFactory, InstanceFactory
+from core.models import EventTable, InstanceAllocationSourceInterval
+
+
+class InstanceAllocationSourceIntervalTest(TestCase):
+    def setUp(self):
+        self.instance = InstanceFactory.create(provider_alias=str(uuid.uuid4()))
+        self.first = AllocationSourceFactory.create(name='TG-FIRST')
+        self.second = AllocationSourceFactory.create(name='TG-SECOND')
+        self.start = timezone.now() - timedelta(days=10)
+
+    def assign(self, source, days):
+        return EventTable.objects.create(
+            name='instance_allocation_source_changed',
+            entity_id=self.instance.created_by.username,
+            payload={
+                'allocation_source_name': source.name,
+                'instance_id': self.instance.provider_alias
+            },
+            timestamp=self.start + timedelta(days=days)
+        )
+
+    def intervals(self):
+        intervals = self.instance.allocation_source_intervals
+        return list(
+            intervals.order_by('valid_from').values_list(
+                'allocation_source__name', 'valid_from', 'valid_to'
+            )
+        )
+
+    def source_at(self, days):
+        return self.instance.allocation_source_at(
+            self.start + timedelta(days=days)
+        )
+
+    def test_events_open_and_close_intervals(self):
+        self.assign(self.first, 0)
+        self.assign(self.second, 5)
+        self.assertEqual(
+            self.intervals(), [
+                ('TG-FIRST', self.start, self.start + timedelta(days=5)),
+                ('TG-SECOND', self.start + timedelta(days=5), None),
+            ]
+        )
+        self.assertIsNone(self.source_at(0))
+        self.assertEqual(self.source_at(1), self.first)
+        self.assertEqual(self.source_at(5), self.first)
+        self.assertEqual(self.source_at(6), self.second)
+
+    def test_late_events_are_inserted_in_order(self):
+        self.assign(self.first, 0)
+        self.assign(self.first, 8)
+        self.assign(self.second, 4)
+        self.assertEqual(
+            [(name, valid_to) for name, _, valid_to in self.intervals()], [
+                ('TG-FIRST', self.start + timedelta(days=4)),
+                ('TG-SECOND', self.start + timedelta(days=8)),
+                ('TG-FIRST', None),
+            ]
+        )
+
+    def test_saving_an_event_again_keeps_one_interval(self):
+        self.assign(self.first, 0)
+        event = self.assign(self.second, 5)
+        event.save()
+        self.assertEqual(
+            self.intervals(), [
+                ('TG-FIRST', self.start, self.start + timedelta(days=5)),
+                ('TG-SECOND', self.start + timedelta(days=5), None),
+            ]
+        )
+
+    def test_rebuild_matches_the_hook(self):
+        self.assign(self.first, 0)
+        self.assign(self.second, 3)
+        self.assign(self.first, 7)
+        expected = self.intervals()
+        InstanceAllocationSourceInterval.objects.all().delete()
+        call_command('rebuild_allocation_source_intervals', stdout=StringIO())
+        self.assertEqual(self.intervals(), expected)
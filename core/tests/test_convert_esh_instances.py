@@ -0,0 +1,116 @@
+import uuid
+from datetime import timedelta
+
+import mock
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.tests.factories import (
+    InstanceFactory, InstanceHistoryFactory, InstanceStatusFactory,
+    ProviderMachineFactory, SizeFactory
+)
+from core.models.instance import convert_esh_instances
+
+
+class FakeEshSize(object):
+    def __init__(self, core_size):
+        self.id = core_size.alias
+        self.name = core_size.name
+        self.cpu = core_size.cpu
+        self.ram = core_size.mem
+        self.disk = core_size.disk
+        self.ephemeral = core_size.root
+
+
+class FakeEshInstance(object):
+    def __init__(self, core_instance, size, status):
+        self.id = core_instance.provider_alias
+        self.name = core_instance.name
+        self.ip = '10.0.0.1'
+        self.size = size
+        self.extra = {'status': status, 'metadata': {}}
+
+
+class ConvertEshInstancesTest(TestCase):
+    def setUp(self):
+        self.machine = ProviderMachineFactory.create()
+        self.provider = self.machine.instance_source.provider
+        self.size = SizeFactory.create(provider=self.provider, cpu=2, mem=4)
+        self.esh_size = FakeEshSize(self.size)
+        self.active = InstanceStatusFactory.create(name='active')
+        self.started = timezone.now() - timedelta(days=1)
+
+    def launch(self, status=None, size=None):
+        instance = InstanceFactory.create(
+            provider_machine=self.machine,
+            provider_alias=str(uuid.uuid4()),
+            start_date=self.started,
+            ip_address='10.0.0.1'
+        )
+        if status:
+            InstanceHistoryFactory.create(
+                instance=instance,
+                status=status,
+                size=size or self.size,
+                start_date=self.started
+            )
+        return instance
+
+    def convert(self, esh_instances):
+        return convert_esh_instances(
+            mock.Mock(), esh_instances, self.provider.uuid, uuid.uuid4(), None
+        )
+
+    def test_unchanged_instances_keep_their_history(self):
+        instance = self.launch(self.active)
+        core_instances = self.convert(
+            [FakeEshInstance(instance, self.esh_size, 'active')]
+        )
+        self.assertEqual(core_instances, [instance])
+        history = instance.instancestatushistory_set.get()
+        self.assertIsNone(history.end_date)
+
+    def test_changed_instances_get_a_new_history(self):
+        instance = self.launch(self.active)
+        self.convert([FakeEshInstance(instance, self.esh_size, 'suspended')])
+        histories = list(
+            instance.instancestatushistory_set.order_by('start_date')
+        )
+        self.assertEqual(
+            [history.status.name for history in histories],
+            ['active', 'suspended']
+        )
+        self.assertEqual(histories[0].end_date, histories[1].start_date)
+        self.assertIsNone(histories[1].end_date)
+
+    def test_resized_instances_get_a_new_history(self):
+        instance = self.launch(self.active)
+        bigger = SizeFactory.create(provider=self.provider, cpu=8, mem=16)
+        self.convert([FakeEshInstance(instance, FakeEshSize(bigger), 'active')])
+        self.assertEqual(instance.get_last_history().size_id, bigger.id)
+
+    def test_first_history_starts_with_the_instance(self):
+        instance = self.launch()
+        self.convert([FakeEshInstance(instance, self.esh_size, 'active')])
+        history = instance.instancestatushistory_set.get()
+        self.assertEqual(history.start_date, self.started)
+        self.assertEqual(history.status.name, 'active')
+
+    def test_query_count_does_not_grow_with_instances(self):
+        def esh_instances(count):
+            return [
+                FakeEshInstance(
+                    self.launch(self.active), self.esh_size, status
+                ) for status in ['active', 'suspended'] * count
+            ]
+
+        InstanceStatusFactory.create(name='suspended')
+        few = esh_instances(1)
+        many = esh_instances(10)
+        with CaptureQueriesContext(connection) as few_queries:
+            self.convert(few)
+        with CaptureQueriesContext(connection) as many_queries:
+            self.convert(many)
+        self.assertEqual(len(many_queries), len(few_queries))
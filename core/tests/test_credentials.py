@@ -0,0 +1,75 @@
+from django.test import TestCase
+
+from api.tests.factories import IdentityFactory, ProviderFactory
+from core.models import Identity
+from core.models.credential import Credential, ProviderCredential
+from core.models.identity import credentials_for
+
+
+class CredentialAccessTest(TestCase):
+    def setUp(self):
+        self.provider = ProviderFactory.create()
+        ProviderCredential.objects.create(
+            provider=self.provider, key='auth_url', value='http://keystone'
+        )
+        ProviderCredential.objects.create(
+            provider=self.provider, key='network_name', value='public'
+        )
+        self.identities = []
+        for idx in range(5):
+            identity = IdentityFactory.create(provider=self.provider)
+            Credential.objects.create(
+                identity=identity, key='key', value='user%s' % idx
+            )
+            Credential.objects.create(
+                identity=identity, key='ex_tenant_name', value='tenant%s' % idx
+            )
+            self.identities.append(identity)
+
+    def identity_ids(self):
+        return [identity.id for identity in self.identities]
+
+    def test_credentials_are_memoized(self):
+        identity = Identity.objects.get(id=self.identities[0].id)
+        # identity credentials, the provider and its credentials
+        with self.assertNumQueries(3):
+            self.assertEqual(identity.get_credential('key'), 'user0')
+            self.assertEqual(identity.get_credential('secret'), None)
+            self.assertEqual(
+                identity.get_all_credentials()['network_name'], 'public'
+            )
+            self.assertEqual(
+                identity.provider.get_credential('auth_url'), 'http://keystone'
+            )
+
+    def test_prefetched_credentials_are_used(self):
+        identities = Identity.objects.filter(
+            id__in=self.identity_ids()
+        ).prefetch_related('credential_set')
+        with self.assertNumQueries(2):
+            tenants = [
+                identity.get_credential('ex_tenant_name')
+                for identity in identities
+            ]
+        self.assertEqual(
+            sorted(tenants), ['tenant%s' % idx for idx in range(5)]
+        )
+
+    def test_credentials_for_uses_one_query(self):
+        identities = Identity.objects.filter(id__in=self.identity_ids())
+        with self.assertNumQueries(2):
+            credentials = credentials_for(identities)
+            for identity in credentials:
+                identity.get_credential('key')
+        self.assertEqual(len(credentials), 5)
+        for identity, creds in credentials.items():
+            self.assertEqual(creds, identity.get_credentials())
+            self.assertEqual(creds['ex_tenant_name'][:6], 'tenant')
+
+    def test_changes_through_the_identity_are_seen(self):
+        identity = Identity.objects.get(id=self.identities[0].id)
+        self.assertIsNone(identity.get_credential('secret'))
+        identity.credential_set.create(key='secret', value='hunter2')
+        self.assertEqual(identity.get_credential('secret'), 'hunter2')
+        Identity.update_credential(identity, 'key', 'renamed', replace=True)
+        self.assertEqual(identity.get_credential('key'), 'renamed')
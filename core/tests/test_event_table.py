@@ -1,10 +1,12 @@
 from unittest import skip
 
+import mock
 from django.test import TestCase, override_settings
 
 from api.tests.factories import UserFactory
 from core.models import EventTable, AllocationSource
 from core.models import UserAllocationSource
+from core.models.event_table import post_save_handlers
 
 
 class EventTableTest(TestCase):
@@ -47,3 +49,85 @@ class EventTableTest(TestCase):
                 'threshold': 10
             }
         )
+
+
+class EventDispatchTest(TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def handler(sender, instance, created, **kwargs):
+            self.calls.append((instance.entity_id, EventTable.objects.count()))
+
+        patcher = mock.patch.dict(
+            post_save_handlers.handlers, {'test_event': [handler]}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_handlers_of_the_event_name_are_called(self):
+        EventTable.create_event('other_event', {}, 'ignored')
+        EventTable.create_event('test_event', {}, 'handled')
+        self.assertEqual(self.calls, [('handled', 2)])
+
+    def test_bulk_created_events_are_dispatched_after_insert(self):
+        EventTable.bulk_create_events(
+            [
+                EventTable(name='test_event', entity_id=str(idx), payload={})
+                for idx in range(3)
+            ]
+        )
+        self.assertEqual(self.calls, [('0', 3), ('1', 3), ('2', 3)])
+
+    def test_bulk_create_can_defer_dispatch(self):
+        events = EventTable.bulk_create_events(
+            [EventTable(name='test_event', entity_id='later', payload={})],
+            dispatch=False
+        )
+        self.assertEqual(self.calls, [])
+        EventTable.dispatch_events(events)
+        self.assertEqual(self.calls, [('later', 1)])
+
+
+class EventPayloadColumnsTest(TestCase):
+    def test_payload_keys_are_copied_on_save(self):
+        event = EventTable.create_event(
+            'allocation_source_threshold_met', {
+                'allocation_source_name': 'TG-ASC160018',
+                'threshold': 50,
+                'usage_percentage': 51.2
+            }, 'TG-ASC160018'
+        )
+        self.assertEqual(event.allocation_source_name, 'TG-ASC160018')
+        self.assertEqual(event.threshold, 50.0)
+        self.assertIsNone(event.username)
+        self.assertEqual(
+            EventTable.objects.get(
+                allocation_source_name='TG-ASC160018', threshold=50.0
+            ), event
+        )
+
+    def test_threshold_is_only_copied_from_json_numbers(self):
+        for threshold, expected in [
+            (0.5, 0.5), ('0.5', None), (True, None), (None, None)
+        ]:
+            event = EventTable.create_event(
+                'allocation_source_threshold_met', {'threshold': threshold},
+                'TG-ASC160018'
+            )
+            self.assertEqual(event.threshold, expected)
+
+    def test_payload_keys_are_copied_on_bulk_create(self):
+        EventTable.bulk_create_events(
+            [
+                EventTable(
+                    name='unhandled_event',
+                    entity_id='amitj',
+                    payload={
+                        'instance_id': 'abcd-efgh',
+                        'username': 'amitj'
+                    }
+                )
+            ]
+        )
+        event = EventTable.objects.get(username='amitj')
+        self.assertEqual(event.instance_id, 'abcd-efgh')
@@ -0,0 +1,74 @@
+import uuid
+from datetime import timedelta
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from api.tests.factories import (
+    InstanceFactory, InstanceHistoryFactory, InstanceStatusFactory
+)
+from core.models import Instance, InstanceStatusHistory
+from core.management.commands.instance_last_history import (
+    find_inconsistent_instances
+)
+
+
+class InstanceLastHistoryTest(TestCase):
+    def setUp(self):
+        self.started = timezone.now() - timedelta(days=1)
+        self.instance = InstanceFactory.create(
+            provider_alias=str(uuid.uuid4()), start_date=self.started
+        )
+        self.active = InstanceStatusFactory.create(name='active')
+        self.first = InstanceHistoryFactory.create(
+            instance=self.instance, status=self.active, start_date=self.started
+        )
+
+    def reload(self):
+        return Instance.objects.get(id=self.instance.id)
+
+    def test_new_history_becomes_last_history(self):
+        self.assertEqual(self.reload().last_history_id, self.first.id)
+
+    def test_older_history_does_not_replace_last_history(self):
+        InstanceHistoryFactory.create(
+            instance=self.instance,
+            status=self.active,
+            start_date=self.started - timedelta(hours=1)
+        )
+        self.assertEqual(self.reload().last_history_id, self.first.id)
+
+    def test_transaction_moves_last_history(self):
+        new_history = InstanceStatusHistory.transaction(
+            'suspended',
+            None,
+            self.instance,
+            self.first.size,
+            start_time=timezone.now()
+        )
+        instance = self.reload()
+        self.assertEqual(instance.last_history_id, new_history.id)
+        self.assertEqual(instance.api_status(), 'suspended')
+
+    def test_last_history_is_read_without_ordering_histories(self):
+        instance = Instance.objects.select_related('last_history__status').get(
+            id=self.instance.id
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(instance.get_last_history(), self.first)
+            self.assertEqual(instance.esh_status(), 'active')
+
+    def test_checker_and_backfill(self):
+        Instance.objects.filter(id=self.instance.id).update(last_history=None)
+        self.assertEqual(
+            find_inconsistent_instances(),
+            [(self.instance.id, None, self.first.id)]
+        )
+        with self.assertRaises(CommandError):
+            call_command('instance_last_history', stdout=StringIO())
+        call_command('instance_last_history', fix=True, stdout=StringIO())
+        self.assertEqual(find_inconsistent_instances(), [])
+        self.assertEqual(self.reload().last_history_id, self.first.id)
@@ -0,0 +1,60 @@
+import mock
+from django.test import TestCase, override_settings
+
+from api.tests.factories import UserFactory
+from core.plugins import ExpirationPluginManager, plugin_registry
+
+PLUGIN_PATH = 'core.tests.test_plugins.CountingExpirationPlugin'
+
+
+class CountingExpirationPlugin(object):
+    instances = 0
+    calls = 0
+
+    def __init__(self):
+        CountingExpirationPlugin.instances += 1
+
+    def is_expired(self, user):
+        CountingExpirationPlugin.calls += 1
+        return False
+
+
+class PluginRegistryTest(TestCase):
+    def setUp(self):
+        plugin_registry.clear()
+        CountingExpirationPlugin.instances = 0
+        CountingExpirationPlugin.calls = 0
+        patcher = mock.patch.object(
+            ExpirationPluginManager, 'list_of_classes', [PLUGIN_PATH]
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(plugin_registry.clear)
+        self.user = UserFactory.create()
+
+    def test_plugins_are_instantiated_once(self):
+        with override_settings(EXPIRATION_PLUGIN_TTL=0):
+            for _ in range(3):
+                self.assertFalse(ExpirationPluginManager.is_expired(self.user))
+        self.assertEqual(CountingExpirationPlugin.instances, 1)
+        self.assertEqual(CountingExpirationPlugin.calls, 3)
+
+    def test_answers_are_memoized_per_user(self):
+        other_user = UserFactory.create()
+        with override_settings(EXPIRATION_PLUGIN_TTL=60):
+            for _ in range(3):
+                ExpirationPluginManager.is_expired(self.user)
+            ExpirationPluginManager.is_expired(other_user)
+            self.assertEqual(CountingExpirationPlugin.calls, 2)
+            with mock.patch('core.plugins.time.time') as now:
+                now.return_value = 10**10
+                ExpirationPluginManager.is_expired(self.user)
+            self.assertEqual(CountingExpirationPlugin.calls, 3)
+
+    def test_changing_settings_clears_the_registry(self):
+        with override_settings(EXPIRATION_PLUGIN_TTL=60):
+            ExpirationPluginManager.is_expired(self.user)
+        with override_settings(EXPIRATION_PLUGIN_TTL=60):
+            ExpirationPluginManager.is_expired(self.user)
+        self.assertEqual(CountingExpirationPlugin.instances, 2)
+        self.assertEqual(CountingExpirationPlugin.calls, 2)
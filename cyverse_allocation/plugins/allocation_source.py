@@ -8,6 +8,9 @@ from core.models import EventTable, AllocationSource, AtmosphereUser, UserAlloca
 
 
 class FlexibleAllocationSourcePlugin(object):
+    # Overrides only depend on the allocation source, see `_get_enforcement_override`
+    enforcement_override_per_user = False
+
     def ensure_user_allocation_source(self, user, provider=None):
         """Ensures that a user has valid allocation sources.
 
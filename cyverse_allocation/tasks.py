@@ -9,13 +9,19 @@ from threepio import celery_logger as logger
 
 from core.models import EventTable
 from core.models.allocation_source import AllocationSourceSnapshot, AllocationSource, UserAllocationSnapshot, \
-    total_usage
+    usage_seconds_for_source
 from cyverse_allocation.cyverse_rules_engine_setup import CyverseTestRenewalVariables, CyverseTestRenewalActions, \
     cyverse_rules, renewal_strategies
 
 
 @task(name="update_snapshot_cyverse")
-def update_snapshot_cyverse(start_date=None, end_date=None):
+def update_snapshot_cyverse(start_date=None, end_date=None, force=False):
+    """
+    Update the allocation snapshots of every allocation source.
+
+    force: Ignore the stored usage watermarks and recompute all usage since
+    the last renewal (used to reconcile the incremental snapshots).
+    """
     all_sources = AllocationSource.objects.order_by('name')
     n = settings.ALLOC_SNAPSHOT_SIZE
     num_sources = len(all_sources)
@@ -28,7 +34,8 @@ def update_snapshot_cyverse(start_date=None, end_date=None):
                 args=(all_sources[i:i + n], ),
                 kwargs={
                     'start_date': start_date,
-                    'end_date': end_date
+                    'end_date': end_date,
+                    'force': force
                 },
                 expires=15 * 60
             )
@@ -39,25 +46,35 @@ def update_snapshot_cyverse(start_date=None, end_date=None):
             )
         )
         update_snapshot_cyverse_for(
-            all_sources, start_date=start_date, end_date=end_date
+            all_sources, start_date=start_date, end_date=end_date, force=force
         )
 
 
 @task(name="update_snapshot_cyverse_for")
 def update_snapshot_cyverse_for(
-    allocation_sources, start_date=None, end_date=None
+    allocation_sources, start_date=None, end_date=None, force=False
 ):
+    """
+    Usage is computed incrementally: each UserAllocationSnapshot remembers the
+    usage up to the end_date of the previous run, so only the time since then
+    is scanned. Pass `force=True` (or an explicit `start_date`) to recompute
+    everything since the last renewal.
+    """
     logger.debug("update_snapshot_cyverse task started at %s." % datetime.now())
     end_date = timezone.now().replace(
         microsecond=0
     ) if not end_date else end_date
+    force = force or not getattr(
+        settings, 'ALLOCATION_SNAPSHOT_INCREMENTAL', True
+    ) or bool(start_date)
+    report_start_date = start_date
 
     for allocation_source in allocation_sources:
         # calculate and save snapshots here
         allocation_source_name = allocation_source.name
         last_renewal_event = EventTable.objects.filter(
             name='allocation_source_created_or_renewed',
-            payload__allocation_source_name__exact=str(allocation_source_name)
+            allocation_source_name__exact=str(allocation_source_name)
         ).order_by('timestamp')
 
         if not last_renewal_event:
@@ -69,29 +86,11 @@ def update_snapshot_cyverse_for(
 
         start_date = last_renewal_event.last().timestamp.replace(
             microsecond=0
-        ) if not start_date else start_date
-
-        total_compute_used = 0
-        total_burn_rate = 0
-        for user in allocation_source.all_users:
-            compute_used, burn_rate = total_usage(
-                user.username,
-                start_date=start_date,
-                end_date=end_date,
-                allocation_source_name=allocation_source_name,
-                burn_rate=True
-            )
+        ) if not report_start_date else report_start_date
 
-            UserAllocationSnapshot.objects.update_or_create(
-                allocation_source=allocation_source,
-                user=user,
-                defaults={
-                    'compute_used': compute_used,
-                    'burn_rate': burn_rate
-                }
-            )
-            total_compute_used += compute_used
-            total_burn_rate += burn_rate
+        total_compute_used, total_burn_rate = _update_user_snapshots(
+            allocation_source, start_date, end_date, force=force
+        )
         AllocationSourceSnapshot.objects.update_or_create(
             allocation_source=allocation_source,
             defaults={
@@ -118,6 +117,63 @@ def update_snapshot_cyverse_for(
     allocation_threshold_check.apply_async()
 
 
+def _update_user_snapshots(
+    allocation_source, start_date, end_date, force=False
+):
+    """
+    Extend each user's usage from their stored watermark up to end_date (or
+    recompute it from start_date) and save the UserAllocationSnapshots.
+    Users sharing a watermark are computed together in one report pass.
+
+    Histories that are still running are clipped at the watermark, so the
+    next run picks them up again from there.
+
+    Returns the (compute_used, burn_rate) totals of the allocation source.
+    """
+    user_snapshots = dict(
+        (snapshot.user_id, snapshot)
+        for snapshot in allocation_source.user_allocation_snapshots.all()
+    )
+    windows = {}
+    for user in allocation_source.all_users:
+        snapshot = user_snapshots.get(user.id)
+        if not force and snapshot and snapshot.can_resume_usage(
+            start_date, end_date
+        ):
+            window_start = snapshot.usage_watermark
+            seconds_used = snapshot.usage_seconds
+        else:
+            window_start = start_date
+            seconds_used = 0.0
+        windows.setdefault(window_start, []).append((user, seconds_used))
+
+    total_compute_used = 0
+    total_burn_rate = 0
+    for window_start, window_users in windows.iteritems():
+        usage = usage_seconds_for_source(
+            allocation_source, window_start, end_date,
+            [user for user, _ in window_users]
+        )
+        for user, seconds_used in window_users:
+            window_seconds, burn_rate = usage[user.username]
+            seconds_used += window_seconds
+            compute_used = round(seconds_used / 3600.0, 2)
+            UserAllocationSnapshot.objects.update_or_create(
+                allocation_source=allocation_source,
+                user=user,
+                defaults={
+                    'compute_used': compute_used,
+                    'burn_rate': burn_rate,
+                    'usage_start_date': start_date,
+                    'usage_watermark': end_date,
+                    'usage_seconds': seconds_used
+                }
+            )
+            total_compute_used += compute_used
+            total_burn_rate += burn_rate
+    return total_compute_used, total_burn_rate
+
+
 @task(name="allocation_threshold_check")
 def allocation_threshold_check():
     logger.debug(
@@ -146,8 +202,8 @@ def allocation_threshold_check():
                 # check if event has been fired
                 prev_event = EventTable.objects.filter(
                     name='allocation_source_threshold_met',
-                    payload__allocation_source_name=allocation_source_name,
-                    payload__threshold=threshold
+                    allocation_source_name=allocation_source_name,
+                    threshold=threshold
                 ).last()
                 if prev_event:
                     continue
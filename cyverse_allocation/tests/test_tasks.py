@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+import mock
+from django.test import TestCase
+
+from api.tests.factories import UserAllocationSourceFactory
+from core.models import EventTable, UserAllocationSnapshot
+from cyverse_allocation.tasks import update_snapshot_cyverse_for
+from service import allocation_logic, allocation_report
+from service.tests.test_allocation_report import (
+    AllocationReportFixture, REPORT_START, NOW
+)
+
+
+class IncrementalSnapshotTest(TestCase):
+    def setUp(self):
+        self.fixture = AllocationReportFixture()
+        self.fixture.add_user(REPORT_START - timedelta(days=15))
+        self.fixture.add_user(REPORT_START + timedelta(days=1))
+        for source in self.fixture.sources:
+            EventTable.objects.create(
+                name='allocation_source_created_or_renewed',
+                entity_id=source.name,
+                payload={
+                    'uuid': str(source.uuid),
+                    'allocation_source_name': source.name,
+                    'compute_allowed': source.compute_allowed,
+                    'renewal_strategy': source.renewal_strategy
+                },
+                timestamp=REPORT_START
+            )
+            for user in self.fixture.users:
+                UserAllocationSourceFactory.create(
+                    user=user, allocation_source=source
+                )
+        for patcher in [
+            mock.patch.object(
+                allocation_logic, '_get_current_date_utc', return_value=NOW
+            ),
+            mock.patch.object(
+                allocation_report, '_get_current_date_utc', return_value=NOW
+            ),
+            mock.patch('cyverse_allocation.tasks.run_all'),
+            mock.patch(
+                'cyverse_allocation.tasks.allocation_threshold_check.apply_async'
+            ),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _snapshots(self):
+        return dict(
+            ((s.user_id, s.allocation_source_id), s.compute_used)
+            for s in UserAllocationSnapshot.objects.all()
+        )
+
+    def test_incremental_matches_full_recompute(self):
+        for days in [2, 4, 5, 11, 20, 31]:
+            update_snapshot_cyverse_for(
+                self.fixture.sources,
+                end_date=REPORT_START + timedelta(days=days)
+            )
+        incremental = self._snapshots()
+        self.assertTrue(any(incremental.values()))
+        update_snapshot_cyverse_for(
+            self.fixture.sources,
+            end_date=REPORT_START + timedelta(days=31),
+            force=True
+        )
+        self.assertEqual(self._snapshots(), incremental)
+
+    def test_watermark_is_stored(self):
+        end_date = REPORT_START + timedelta(days=7)
+        update_snapshot_cyverse_for(self.fixture.sources, end_date=end_date)
+        for snapshot in UserAllocationSnapshot.objects.all():
+            self.assertEqual(snapshot.usage_start_date, REPORT_START)
+            self.assertEqual(snapshot.usage_watermark, end_date)
+
+    def test_earlier_end_date_recomputes(self):
+        update_snapshot_cyverse_for(
+            self.fixture.sources, end_date=REPORT_START + timedelta(days=20)
+        )
+        update_snapshot_cyverse_for(
+            self.fixture.sources, end_date=REPORT_START + timedelta(days=5)
+        )
+        rewound = self._snapshots()
+        update_snapshot_cyverse_for(
+            self.fixture.sources,
+            end_date=REPORT_START + timedelta(days=5),
+            force=True
+        )
+        self.assertEqual(self._snapshots(), rewound)
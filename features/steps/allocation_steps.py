@@ -75,7 +75,7 @@ def run_monitor_allocation_source(context):
     ]
     from service.tasks.monitoring import monitor_allocation_sources
     with mock.patch(
-        'service.tasks.monitoring.allocation_source_overage_enforcement_for_user',
+        'service.tasks.monitoring.allocation_sources_overage_enforcement_for_user',
         autospec=True
     ) as allocation_source_overage_enforcement_for_user:
         with django.test.override_settings(
@@ -98,17 +98,19 @@ def allocation_source_overage_enforcement_for_user_called(context):
     for call in allocation_source_overage_enforcement_for_user.method_calls:
         context.test.assertEqual(len(call), 3)
         context.test.assertEqual(len(call[2]['args']), 2)
-        allocation_source = call[2]['args'][0]
-        context.test.assertIsInstance(allocation_source, AllocationSource)
+        allocation_sources = call[2]['args'][0]
         user = call[2]['args'][1]
         context.test.assertIsInstance(user, AtmosphereUser)
-        method_calls.append(
-            {
-                'username': user.username,
-                'allocation_source': allocation_source.name,
-                'called': 'Yes'
-            }
-        )
+        # Enforcement is queued once per user, for all of their sources
+        for allocation_source in allocation_sources:
+            context.test.assertIsInstance(allocation_source, AllocationSource)
+            method_calls.append(
+                {
+                    'username': user.username,
+                    'allocation_source': allocation_source.name,
+                    'called': 'Yes'
+                }
+            )
 
     context.test.assertEqual(method_calls, expected_calls)
 
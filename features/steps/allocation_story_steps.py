@@ -327,7 +327,7 @@ def one_off_renewal_task_is_run_without_rules_engine(context):
 
         renewal_event = EventTable.objects.filter(
             name='allocation_source_created_or_renewed',
-            payload__allocation_source_name=allocation_source.name,
+            allocation_source_name=allocation_source.name,
             timestamp=time
         )
         assert len(renewal_event) > 0
@@ -1,5 +1,9 @@
 import uuid
+from multiprocessing.pool import ThreadPool
+
+import requests
 from django.conf import settings
+from django.core.cache import cache
 from django.db import IntegrityError
 from django.utils import timezone
 from dateutil.parser import parse
@@ -12,8 +16,20 @@ from core.models.allocation_source import AllocationSource, UserAllocationSource
 
 from threepio import logger
 
+TAS_CACHE_VERSION_KEY = 'tas_api:version'
+# Marks an allocation list that has not been looked up yet
+NOT_FOUND = object()
+
 
 class TASAPIDriver(object):
+    """
+    Client for the TACC Accounting System (TAS) API.
+
+    XSEDE to TACC username mappings, projects and allocations are kept on the
+    driver and in the Django cache for `settings.TAS_API_CACHE_TTL` seconds,
+    so a driver can be shared by a whole run, and a new driver starts warm.
+    `clear_cache` forgets both.
+    """
     tacc_api = None
     tacc_username = None
     tacc_password = None
@@ -42,6 +58,7 @@ class TASAPIDriver(object):
         self.tacc_password = tacc_password
         self.resource_name = resource_name
         self.timeout = timeout
+        self._cache_version = None
 
     def _tacc_api_get(self, url):
         return tacc_api_get(
@@ -57,26 +74,89 @@ class TASAPIDriver(object):
             timeout=self.timeout
         )
 
+    def _cache_key(self, *parts):
+        if self._cache_version is None:
+            cache.add(TAS_CACHE_VERSION_KEY, 1, None)
+            self._cache_version = cache.get(TAS_CACHE_VERSION_KEY, 1)
+        return 'tas_api:%s:%s:%s:%s' % (
+            self._cache_version, self.tacc_api, self.resource_name,
+            ':'.join(parts)
+        )
+
+    def _cached(self, cache_key, fetch):
+        """
+        Return the value cached under `cache_key`, or `fetch()` it and cache it
+        """
+        value = cache.get(cache_key)
+        if value is None:
+            value = fetch()
+            cache.set(
+                cache_key, value, getattr(settings, 'TAS_API_CACHE_TTL', 0)
+            )
+        return value
+
+    def map_concurrently(self, method, items):
+        """
+        Return `[method(item) for item in items]`, with at most
+        `settings.TAS_API_CONCURRENCY` calls in flight
+        """
+        items = list(items)
+        workers = min(getattr(settings, 'TAS_API_CONCURRENCY', 1), len(items))
+        if workers <= 1:
+            return [method(item) for item in items]
+        pool = ThreadPool(workers)
+        try:
+            return pool.map(method, items)
+        finally:
+            pool.close()
+            pool.join()
+
     def clear_cache(self):
         self.user_project_list = []
         self.project_list = []
         self.allocation_list = []
         self.username_map = {}
+        # Forget everything cached by any driver
+        try:
+            self._cache_version = cache.incr(TAS_CACHE_VERSION_KEY)
+        except ValueError:
+            # Nothing was cached since the version was lost, start over at 2
+            self._cache_version = 2
+            cache.set(TAS_CACHE_VERSION_KEY, self._cache_version, None)
 
     def get_all_allocations(self):
         if not self.allocation_list:
-            self.allocation_list = self._get_all_allocations()
+            self.allocation_list = self._cached(
+                self._cache_key('allocations'), self._get_all_allocations
+            )
         return self.allocation_list
 
     def get_all_projects(self):
         if not self.project_list:
-            self.project_list = self._get_all_projects()
+            self.project_list = self._cached(
+                self._cache_key('projects'), self._get_all_projects
+            )
         return self.project_list
 
+    def prefetch_tacc_usernames(self, users):
+        """
+        Look up the TACC usernames of `users` concurrently, skipping those
+        already known
+        """
+        missing = {
+            user.username: user
+            for user in users if not self.username_map.get(user.username)
+        }
+        self.map_concurrently(self.get_tacc_username, missing.values())
+
     def get_tacc_username(self, user, raise_exception=False):
         if self.username_map.get(user.username):
             return self.username_map[user.username]
-        tacc_user = None
+        cache_key = self._cache_key('username', user.username)
+        tacc_user = cache.get(cache_key)
+        if tacc_user:
+            self.username_map[user.username] = tacc_user
+            return tacc_user
         try:
             tacc_user = self._xsede_to_tacc_username(user.username)
         except NoTaccUserForXsedeException:
@@ -92,6 +172,9 @@ class TASAPIDriver(object):
                 raise
         else:
             self.username_map[user.username] = tacc_user
+            cache.set(
+                cache_key, tacc_user, getattr(settings, 'TAS_API_CACHE_TTL', 0)
+            )
         return tacc_user
 
     def find_projects_for(self, tacc_username):
@@ -120,10 +203,12 @@ class TASAPIDriver(object):
 
     def get_all_project_users(self):
         if not self.user_project_list:
-            self.project_list = self._get_all_projects()
-            for project in sorted(self.project_list, key=lambda p: p['id']):
-                project_users = self.get_project_users(project['id'])
-                project['users'] = project_users
+            projects = sorted(self.get_all_projects(), key=lambda p: p['id'])
+            project_users = self.map_concurrently(
+                self.get_project_users, [project['id'] for project in projects]
+            )
+            for project, users in zip(projects, project_users):
+                project['users'] = users
             self.user_project_list = self.project_list
         return self.user_project_list
 
@@ -176,6 +261,14 @@ class TASAPIDriver(object):
         # logger.debug("TAS_REQ: %s - POST - %s" % (url_match, post_data))
         resp = self._tacc_api_post(url_match, post_data)
         # logger.debug("TAS_RESP: %s" % resp.__dict__)  # Overkill?
+        if resp.status_code != 200:
+            exc_message = (
+                "Report %s produced an Invalid Response - Expected 200 "
+                "response: %s - %s" % (report_id, resp.status_code, resp.text)
+            )
+            logger.error(exc_message)
+            # Carries `resp`, so callers can tell server errors apart
+            raise requests.HTTPError(exc_message, response=resp)
         try:
             data = resp.json()
             #logger.debug("TAS_RESP - Data: %s" % data)
@@ -191,7 +284,7 @@ class TASAPIDriver(object):
             logger.exception(exc_message)
             raise ValueError(exc_message)
 
-        if resp_status != 'success' or resp.status_code != 200:
+        if resp_status != 'success':
             exc_message = (
                 "Report %s produced an Invalid Response - Expected 200 and "
                 "'success' response: %s - %s" %
@@ -381,26 +474,49 @@ def find_user_allocation_source_for(driver, user):
     return allocations
 
 
-def fill_user_allocation_sources():
+def _find_user_allocation_source_for(driver, user):
+    try:
+        return True, find_user_allocation_source_for(driver, user)
+    except Exception:
+        logger.exception("Error filling user allocation source for %s" % user)
+        return False, None
+
+
+def fill_user_allocation_sources(driver=None):
     from core.models import AtmosphereUser
-    driver = TASAPIDriver()
+    if not driver:
+        driver = TASAPIDriver()
+    users = list(AtmosphereUser.objects.order_by('username'))
+    # Ask TAS about every user concurrently, then update the database in order
+    found = driver.map_concurrently(
+        lambda user: _find_user_allocation_source_for(driver, user), users
+    )
     allocation_resources = {}
-    for user in AtmosphereUser.objects.order_by('username'):
-        try:
-            resources = fill_user_allocation_source_for(driver, user)
-        except Exception:
-            logger.exception(
-                "Error filling user allocation source for %s" % user
-            )
-            resources = []
+    for user, (success, allocation_list) in zip(users, found):
+        resources = []
+        if success:
+            try:
+                resources = fill_user_allocation_source_for(
+                    driver, user, allocation_list=allocation_list
+                )
+            except Exception:
+                logger.exception(
+                    "Error filling user allocation source for %s" % user
+                )
+                resources = []
         allocation_resources[user.username] = resources
     return allocation_resources
 
 
-def fill_user_allocation_source_for(driver, user):
+def fill_user_allocation_source_for(driver, user, allocation_list=NOT_FOUND):
+    """
+    Mirror the TAS allocations of `user` locally. Pass `allocation_list` when
+    it has already been found with `find_user_allocation_source_for`.
+    """
     from core.models import AtmosphereUser
     assert isinstance(user, AtmosphereUser)
-    allocation_list = find_user_allocation_source_for(driver, user)
+    if allocation_list is NOT_FOUND:
+        allocation_list = find_user_allocation_source_for(driver, user)
     if allocation_list is None:
         logger.info(
             "find_user_allocation_source_for %s is None, so stop and don't delete allocations"
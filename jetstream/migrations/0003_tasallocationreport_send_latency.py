@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-19 02:10
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jetstream', '0002_admin-panel-dynamic-models'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasallocationreport',
+            name='send_attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tasallocationreport',
+            name='send_latency',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -32,11 +32,21 @@ class TASAllocationReport(models.Model):
     # FIXME:  Save a response confirmation -instead of- success
     report_date = models.DateTimeField(blank=True, null=True)
     success = models.BooleanField(default=False)
+    # Times `send_reports` tried to send the report, and seconds its last try took
+    send_attempts = models.IntegerField(default=0)
+    send_latency = models.FloatField(blank=True, null=True)
 
     class Meta:
         app_label = 'jetstream'
 
-    def send(self, use_beta=False):
+    def send(self, use_beta=False, driver=None, save=True):
+        """
+        Report this to TAS (with `driver`, if given), marking it successful
+        if TAS accepts it.
+
+        With `save=False` the report is not saved, and errors are raised
+        instead of swallowed, so the caller can retry and save it.
+        """
         if not self.id:
             raise Exception(
                 "ERROR -- This report should be *saved* before you send it!"
@@ -46,12 +56,12 @@ class TASAllocationReport(models.Model):
                 "ERROR -- This report has already been *saved*! Create a new report!"
             )
         try:
-            if use_beta:
+            if not driver and use_beta:
                 from atmosphere.settings.local import BETA_TACC_API_URL, BETA_TACC_API_USER, BETA_TACC_API_PASS
                 driver = TASAPIDriver(
                     BETA_TACC_API_URL, BETA_TACC_API_USER, BETA_TACC_API_PASS
                 )
-            else:
+            elif not driver:
                 driver = TASAPIDriver()
             success = driver.report_project_allocation(
                 self.id, self.username, self.project_name,
@@ -61,8 +71,11 @@ class TASAllocationReport(models.Model):
             self.success = True if success else False
             if self.success:
                 self.report_date = timezone.now()
-            self.save()
+            if save:
+                self.save()
         except:
+            if not save:
+                raise
             return
 
     @property
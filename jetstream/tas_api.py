@@ -1,4 +1,7 @@
+import threading
+
 import requests
+from requests.adapters import HTTPAdapter
 
 from django.conf import settings
 from memoize import memoize
@@ -7,6 +10,29 @@ from .exceptions import TASAPIException
 
 from threepio import logger
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return this process' `requests.Session` for the TAS API, keeping alive up
+    to `settings.TAS_API_CONCURRENCY` connections per host
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = max(getattr(settings, 'TAS_API_CONCURRENCY', 1), 1)
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=pool_size, pool_maxsize=pool_size
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
 
 def tacc_api_post(url, post_data, username=None, password=None, timeout=None):
     if not username:
@@ -15,7 +41,7 @@ def tacc_api_post(url, post_data, username=None, password=None, timeout=None):
         password = settings.TACC_API_PASS
     logger.debug('url: %s', url)
     # logger.debug("REQ BODY: %s" % post_data)
-    resp = requests.post(
+    resp = get_session().post(
         url, post_data, auth=(username, password), timeout=timeout
     )
     logger.debug('resp.status_code: %s', resp.status_code)
@@ -30,7 +56,7 @@ def tacc_api_get(url, username=None, password=None, timeout=None):
     if not password:
         password = settings.TACC_API_PASS
     logger.debug('url: %s', url)
-    resp = requests.get(url, auth=(username, password), timeout=timeout)
+    resp = get_session().get(url, auth=(username, password), timeout=timeout)
     logger.debug('resp.status_code: %s', resp.status_code)
     # logger.debug('resp.__dict__: %s', resp.__dict__)
     if resp.status_code != 200:
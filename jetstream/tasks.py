@@ -1,3 +1,7 @@
+import time
+from multiprocessing.pool import ThreadPool
+
+import requests
 from celery.decorators import task
 from django.conf import settings
 from django.utils import timezone
@@ -8,7 +12,7 @@ from core.models.allocation_source import (
     UserAllocationSource, AllocationSourceSnapshot, AllocationSource,
     UserAllocationSnapshot
 )
-from core.models.allocation_source import total_usage
+from core.models.allocation_source import total_usage, total_usage_for_source
 from .allocation import (
     TASAPIDriver, fill_user_allocation_sources, select_valid_allocation
 )
@@ -35,7 +39,14 @@ def create_reports():
     if 'TACC username' includes a jetstream resource, create a report
     """
     logger.debug('create_reports - START')
-    user_allocation_list = UserAllocationSource.objects.all()
+    user_allocation_list = list(
+        UserAllocationSource.objects.select_related(
+            'user', 'allocation_source'
+        )
+    )
+    # One driver for the whole run, with every TACC username looked up upfront
+    driver = TASAPIDriver()
+    driver.prefetch_tacc_usernames(item.user for item in user_allocation_list)
     all_reports = []
     end_date = timezone.now()
     logger.debug('create_reports - end_date: %s', end_date)
@@ -54,7 +65,7 @@ def create_reports():
         logger.debug('create_reports - allocation_name: %s', allocation_name)
         logger.debug('create_reports - item.user: %s', item.user)
         project_report = _create_reports_for(
-            item.user, allocation_name, end_date
+            item.user, allocation_name, end_date, driver=driver
         )
         if project_report:
             all_reports.append(project_report)
@@ -70,18 +81,21 @@ def create_reports():
         user = AtmosphereUser.objects.get(username=event.entity_id)
         allocation_name = event.payload['allocation_source_name']
         end_date = event.timestamp
-        project_report = _create_reports_for(user, allocation_name, end_date)
+        project_report = _create_reports_for(
+            user, allocation_name, end_date, driver=driver
+        )
         if project_report:
             all_reports.append(project_report)
     return all_reports
 
 
-def _create_reports_for(user, allocation_name, end_date):
+def _create_reports_for(user, allocation_name, end_date, driver=None):
     logger.debug(
         '_create_reports_for - user: %s, allocation_name: %s, end_date: %s',
         user, allocation_name, end_date
     )
-    driver = TASAPIDriver()
+    if not driver:
+        driver = TASAPIDriver()
     tacc_username = driver.get_tacc_username(user)
     if not tacc_username:
         logger.error(
@@ -157,25 +171,95 @@ def report_allocations_to_tas():
     logger.info("Reporting: Reports sent")
 
 
-def send_reports():
+def _is_transient(exc):
+    """
+    True for TAS errors worth retrying: connection errors, timeouts and 5xx
+    responses
+    """
+    if isinstance(
+        exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    ):
+        return True
+    response = getattr(exc, 'response', None)
+    return isinstance(exc, requests.exceptions.HTTPError) \
+        and response is not None and response.status_code >= 500
+
+
+def _post_report(driver, tas_report):
+    """
+    Send `tas_report` to TAS, retrying transient failures with exponential
+    backoff; any other failure is final.
+
+    Returns `(tas_report, attempts, latency)`, `latency` being the seconds
+    the last attempt took. Only talks to TAS, never to the database.
+    """
+    retries = getattr(settings, 'TAS_REPORT_RETRIES', 0)
+    backoff = getattr(settings, 'TAS_REPORT_RETRY_BACKOFF', 0)
+    attempts = 0
+    while True:
+        attempts += 1
+        started = time.time()
+        try:
+            tas_report.send(driver=driver, save=False)
+            return tas_report, attempts, time.time() - started
+        except Exception as exc:
+            latency = time.time() - started
+            if attempts > retries or not _is_transient(exc):
+                logger.exception(
+                    "Report %s failed to send after %s attempts", tas_report.id,
+                    attempts
+                )
+                return tas_report, attempts, latency
+            logger.warning(
+                "Report %s failed to send (attempt %s), retrying",
+                tas_report.id, attempts
+            )
+            time.sleep(backoff * 2**(attempts - 1))
+
+
+def send_reports(driver=None):
+    """
+    Send every unsent report with usage to TAS.
+
+    Up to `settings.TAS_API_CONCURRENCY` reports are in flight at once over
+    the pooled TAS session; each report is marked as it completes, with the
+    number of attempts and the latency of the last one.
+    """
     failed_reports = 0
-    reports_to_send = TASAllocationReport.objects.filter(
-        Q(compute_used__gt=0, success=False)
-    ).order_by('user__username', 'start_date')
-    count = reports_to_send.count()
+    reports_to_send = list(
+        TASAllocationReport.objects.filter(
+            Q(compute_used__gt=0, success=False)
+        ).order_by('user__username', 'start_date')
+    )
+    count = len(reports_to_send)
     logger.info('send_reports - count: %d', count)
-    for current_report_index, tas_report in enumerate(reports_to_send):
-        logger.debug(
-            'send_reports - current_report_index: %d', current_report_index
+    if not count:
+        return
+    if not driver:
+        driver = TASAPIDriver()
+    workers = max(min(getattr(settings, 'TAS_API_CONCURRENCY', 1), count), 1)
+    pool = ThreadPool(workers)
+    try:
+        results = pool.imap_unordered(
+            lambda tas_report: _post_report(driver, tas_report), reports_to_send
         )
-        try:
-            tas_report.send()
-        except TASPluginException:
-            logger.exception(
-                "Could not send the report because of the error below"
+        for tas_report, attempts, latency in results:
+            logger.debug(
+                'send_reports - report: %s, success: %s, attempts: %s, latency: %.3fs',
+                tas_report.id, tas_report.success, attempts, latency
             )
-            failed_reports += 1
-            continue
+            tas_report.send_attempts += attempts
+            tas_report.send_latency = latency
+            if not tas_report.success:
+                failed_reports += 1
+            tas_report.save(
+                update_fields=[
+                    'send_attempts', 'send_latency', 'success', 'report_date'
+                ]
+            )
+    finally:
+        pool.close()
+        pool.join()
     if failed_reports != 0:
         raise Exception(
             "%s/%s reports failed to send to TAS" % (failed_reports, count)
@@ -204,21 +288,19 @@ def update_snapshot(start_date=None, end_date=None):
 
             created_or_updated_event = EventTable.objects.filter(
                 name='allocation_source_created_or_renewed',
-                payload__allocation_source_name=allocation_source.name
+                allocation_source_name=allocation_source.name
             ).order_by('timestamp').last()
 
             if created_or_updated_event:
                 # if renewed, change ignore old allocation usage
                 start_date = created_or_updated_event.payload['start_date']
 
-            for user in allocation_source.all_users:
-                compute_used, burn_rate = total_usage(
-                    user.username,
-                    start_date,
-                    allocation_source_name=allocation_source.name,
-                    end_date=end_date,
-                    burn_rate=True
-                )
+            users = list(allocation_source.all_users)
+            usage = total_usage_for_source(
+                allocation_source, start_date, end_date=end_date, users=users
+            )
+            for user in users:
+                compute_used, burn_rate = usage[user.username]
                 total_burn_rate += burn_rate
                 UserAllocationSnapshot.objects.update_or_create(
                     allocation_source_id=allocation_source.id,
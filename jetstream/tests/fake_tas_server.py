@@ -0,0 +1,132 @@
+"""
+A TAS API stand-in served over HTTP, for testing jetstream.allocation.TASAPIDriver
+"""
+import json
+import threading
+import urlparse
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
+from django.test import override_settings
+
+ALLOCATION = {
+    'id': 1,
+    'project': 'TG-BIO170000',
+    'computeAllocated': 1000,
+    'computeUsed': 10,
+    'resource': 'Jetstream',
+    'status': 'Active',
+    'start': '2000-01-01T00:00:00Z',
+    'end': '2100-01-01T00:00:00Z',
+}
+PROJECT = {
+    'id': 10,
+    'chargeCode': 'TG-BIO170000',
+    'allocations': [ALLOCATION],
+}
+
+
+class FakeTASServer(ThreadingMixIn, HTTPServer):
+    """
+    Answers the TAS API requests made by TASAPIDriver, and records their paths
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), FakeTASHandler)
+        self.paths = []
+        self.posted = []
+        # Number of upcoming POSTs to answer with `post_failure_status`
+        self.post_failures = 0
+        self.post_failure_status = 500
+        self.lock = threading.Lock()
+
+    @classmethod
+    def start(cls, test_case, **settings):
+        """
+        Serve in a thread for the duration of `test_case`, with the TAS API
+        settings pointing at this server (plus `settings`)
+        """
+        server = cls()
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        test_case.addCleanup(server.server_close)
+        test_case.addCleanup(server.shutdown)
+        settings.setdefault('TAS_API_CONCURRENCY', 4)
+        settings_override = override_settings(
+            TACC_API_URL=server.url,
+            TACC_API_USER='tas',
+            TACC_API_PASS='tas',
+            **settings
+        )
+        settings_override.enable()
+        test_case.addCleanup(settings_override.disable)
+        return server
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%s' % self.server_port
+
+    def answer(self, path):
+        with self.lock:
+            self.paths.append(path)
+        if path.startswith('/v1/users/xsede/'):
+            return path.split('/')[-1] + '_tacc'
+        if path.startswith('/v1/projects/username/'):
+            return [PROJECT]
+        if path == '/v1/projects/resource/Jetstream':
+            return [PROJECT]
+        if path == '/v1/allocations/resource/Jetstream':
+            return [ALLOCATION]
+        if path.startswith('/v1/projects/') and path.endswith('/users'):
+            return [{'username': 'user_tacc'}]
+        return None
+
+    def post(self, path, body):
+        """
+        Return the status code for a POST, and record the successful ones
+        """
+        with self.lock:
+            if self.post_failures > 0:
+                self.post_failures -= 1
+                return self.post_failure_status
+            self.posted.append((path, body))
+        return 200
+
+
+class FakeTASHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps(
+            {
+                'status': 'success',
+                'message': None,
+                'result': self.server.answer(self.path)
+            }
+        )
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.getheader('Content-Length') or 0)
+        status = self.server.post(
+            self.path, urlparse.parse_qs(self.rfile.read(length))
+        )
+        body = json.dumps(
+            {
+                'status': 'success' if status == 200 else 'error',
+                'message': None,
+                'result': None
+            }
+        )
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.test import TestCase, modify_settings
+from django.utils import timezone
+
+from api.tests.factories import UserFactory
+from jetstream.tests.fake_tas_server import FakeTASServer
+
+
+@modify_settings(INSTALLED_APPS={
+    'append': 'jetstream',
+})
+class SendReportsTest(TestCase):
+    def setUp(self):
+        from jetstream.models import TASAllocationReport
+        self.server = FakeTASServer.start(
+            self, TAS_REPORT_RETRIES=2, TAS_REPORT_RETRY_BACKOFF=0
+        )
+        end_date = timezone.now()
+        self.reports = [
+            TASAllocationReport.objects.create(
+                user=UserFactory.create(),
+                username='user%s_tacc' % idx,
+                project_name='TG-BIO170000',
+                compute_used=idx + 1,
+                start_date=end_date - timedelta(days=1),
+                end_date=end_date,
+                tacc_api=self.server.url
+            ) for idx in range(6)
+        ]
+
+    def test_reports_are_sent_and_retried(self):
+        from jetstream.tasks import send_reports
+        self.server.post_failures = 2
+        send_reports()
+        self.assertEqual(len(self.server.posted), 6)
+        self.assertEqual(
+            sorted(body['username'][0] for _, body in self.server.posted),
+            sorted(report.username for report in self.reports)
+        )
+        attempts = 0
+        for report in self.reports:
+            report.refresh_from_db()
+            self.assertTrue(report.success)
+            self.assertIsNotNone(report.report_date)
+            self.assertIsNotNone(report.send_latency)
+            attempts += report.send_attempts
+        self.assertEqual(attempts, 8)
+
+    def test_failed_reports_are_left_unsent(self):
+        from jetstream.models import TASAllocationReport
+        from jetstream.tasks import send_reports
+        failing = self.reports[0]
+        TASAllocationReport.objects.exclude(id=failing.id).update(success=True)
+        self.server.post_failures = 3
+        with self.assertRaises(Exception):
+            send_reports()
+        failing.refresh_from_db()
+        self.assertFalse(failing.success)
+        self.assertEqual(failing.send_attempts, 3)
+        self.assertEqual(self.server.posted, [])
+
+    def test_client_errors_are_not_retried(self):
+        from jetstream.models import TASAllocationReport
+        from jetstream.tasks import send_reports
+        failing = self.reports[0]
+        TASAllocationReport.objects.exclude(id=failing.id).update(success=True)
+        self.server.post_failures = 1
+        self.server.post_failure_status = 400
+        with self.assertRaises(Exception):
+            send_reports()
+        failing.refresh_from_db()
+        self.assertFalse(failing.success)
+        self.assertEqual(failing.send_attempts, 1)
@@ -0,0 +1,83 @@
+import memoize
+from django.core.cache import cache
+from django.test import TestCase, modify_settings
+
+from api.tests.factories import UserFactory
+from jetstream.tests.fake_tas_server import FakeTASServer
+
+
+@modify_settings(INSTALLED_APPS={
+    'append': 'jetstream',
+})
+class TASAPIDriverCacheTest(TestCase):
+    def setUp(self):
+        self.server = FakeTASServer.start(self, TAS_API_CACHE_TTL=60)
+
+        from jetstream.allocation import TASAPIDriver
+        from jetstream.tas_api import tacc_api_get
+        memoize.delete_memoized(tacc_api_get)
+        cache.clear()
+        TASAPIDriver().clear_cache()
+        TASAPIDriver.username_map.clear()
+        self.addCleanup(cache.clear)
+        self.users = [
+            UserFactory.create(username='user%s' % idx) for idx in range(5)
+        ]
+
+    def requests_for(self, prefix):
+        return [path for path in self.server.paths if path.startswith(prefix)]
+
+    def test_new_drivers_share_the_cache(self):
+        from jetstream.allocation import TASAPIDriver
+        driver = TASAPIDriver()
+        driver.prefetch_tacc_usernames(self.users)
+        self.assertEqual(len(self.requests_for('/v1/users/xsede/')), 5)
+        self.assertEqual(
+            driver.get_allocation_project_name('TG-BIO170000'), 'TG-BIO170000'
+        )
+
+        other_driver = TASAPIDriver()
+        other_driver.username_map.clear()
+        other_driver.allocation_list = []
+        self.assertEqual(
+            other_driver.get_tacc_username(self.users[0]), 'user0_tacc'
+        )
+        other_driver.get_all_allocations()
+        self.assertEqual(len(self.requests_for('/v1/users/xsede/')), 5)
+        self.assertEqual(len(self.requests_for('/v1/allocations/resource/')), 1)
+
+        other_driver.clear_cache()
+        # tacc_api_get also memoizes responses by URL
+        from jetstream.tas_api import tacc_api_get
+        memoize.delete_memoized(tacc_api_get)
+        other_driver.get_tacc_username(self.users[0])
+        self.assertEqual(len(self.requests_for('/v1/users/xsede/')), 6)
+
+    def test_fill_user_allocation_sources(self):
+        from core.models import AtmosphereUser, UserAllocationSource
+        from jetstream.allocation import fill_user_allocation_sources
+        resources = fill_user_allocation_sources()
+        user_count = AtmosphereUser.objects.count()
+        self.assertEqual(len(resources), user_count)
+        self.assertEqual(
+            UserAllocationSource.objects.filter(
+                allocation_source__name='TG-BIO170000'
+            ).count(), user_count
+        )
+        self.assertEqual(len(self.requests_for('/v1/users/xsede/')), user_count)
+        self.assertEqual(
+            len(self.requests_for('/v1/projects/username/')), user_count
+        )
+
+    def test_project_users_use_the_cached_projects(self):
+        from jetstream.allocation import TASAPIDriver
+        from jetstream.tas_api import tacc_api_get
+        TASAPIDriver().get_all_projects()
+        memoize.delete_memoized(tacc_api_get)
+
+        driver = TASAPIDriver()
+        driver.project_list = []
+        driver.user_project_list = []
+        projects = driver.get_all_project_users()
+        self.assertEqual(projects[0]['users'], [{'username': 'user_tacc'}])
+        self.assertEqual(len(self.requests_for('/v1/projects/resource/')), 1)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+"""
+Compare the 'python' (report row dicts) and 'numpy' (HistorySlices) allocation
+arithmetic of `usage_seconds_for_source`.
+
+By default both run on a synthetic report (1M rows), without touching the
+database: the dict path runs `calculate_allocation` over `create_rows`-style
+dicts, then sums usage and reads burn rates per user, and the NumPy path runs
+`HistorySlices.usage_by_user` and `burn_rate_by_user`. Building the inputs is
+timed separately:
+
+    ./scripts/benchmark_allocation_backends.py --rows 1000000
+
+With --source, both backends instead run end to end (queries, building rows
+or arrays, and the arithmetic) for the users of an existing allocation
+source:
+
+    ./scripts/benchmark_allocation_backends.py --source TG-BIO170000 --days 90
+"""
+import argparse
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import django
+django.setup()
+
+import numpy as np
+import pytz
+from django.test import override_settings
+from django.utils import timezone
+
+from core.models import AllocationSource
+from core.models.allocation_source import (
+    _last_burn_rate, _sum_applicable_duration, usage_seconds_for_source
+)
+from service.allocation_columnar import (
+    HistorySlices, ReportHistories, STATUS_ACTIVE, STATUS_OTHER, to_epoch
+)
+from service.allocation_logic import calculate_allocation
+
+Status = namedtuple('Status', ['name'])
+Size = namedtuple('Size', ['cpu'])
+History = namedtuple('History', ['status', 'size'])
+
+CPU_CHOICES = [1, 2, 4, 8, 16]
+NO_SOURCE = -1
+
+
+class SyntheticReport(object):
+    """
+    Report rows, in report order, as arrays. Every history is split into
+    one or more rows, each charged to an allocation source or to none.
+    """
+
+    def __init__(self, rows, users, sources, report_start, report_end, seed):
+        random = np.random.RandomState(seed)
+        histories = max(rows // 3, 1)
+        self.usernames = ['user%d' % idx for idx in range(users)]
+        self.allocation_sources = ['TG-%05d' % idx for idx in range(sources)]
+        self.history_user = random.randint(0, users, histories)
+        self.history_active = random.random_sample(histories) < 0.8
+        self.history_open = random.random_sample(histories) < 0.05
+        self.history_cpu = random.choice(CPU_CHOICES, histories)
+        # Every history has a row, and rows of a history are consecutive
+        self.history = np.sort(
+            np.append(
+                np.arange(histories),
+                random.randint(0, histories, rows - histories)
+            )
+        )
+        self.source = random.randint(NO_SOURCE, sources, rows)
+        window = to_epoch(report_end) - to_epoch(report_start)
+        self.start = to_epoch(report_start) - window * 0.25 + \
+            random.random_sample(rows) * window * 1.25
+        self.end = np.maximum(
+            self.start + random.exponential(window * 0.05, rows),
+            to_epoch(report_start) + 1
+        )
+
+    def to_slices(self):
+        """
+        The HistorySlices of the report: its charged rows, plus the report
+        order for burn rates
+        """
+        charged = self.source != NO_SOURCE
+        history = self.history[charged]
+        return HistorySlices(
+            self.start[charged], self.end[charged], self.history_cpu[history],
+            np.where(self.history_active[history], STATUS_ACTIVE, STATUS_OTHER),
+            self.source[charged], self.history_user[history],
+            ReportHistories(
+                self.history_user, self.history_open & self.history_active,
+                history, self.source[charged]
+            ), self.usernames, self.allocation_sources
+        )
+
+    def to_rows(self):
+        """
+        The report as `service.allocation_report.create_rows` builds it: row
+        dicts with a running, per-user burn rate counter, and history
+        stand-ins for `calculate_allocation`
+        """
+        statuses = {True: Status('active'), False: Status('suspended')}
+        sizes = dict((cpu, Size(cpu)) for cpu in CPU_CHOICES)
+        burn_rates = {}
+        rows = []
+        previous = None
+        for idx in xrange(len(self.history)):
+            hist_idx = self.history[idx]
+            username = self.usernames[self.history_user[hist_idx]]
+            if hist_idx != previous and self.history_open[hist_idx] \
+                    and self.history_active[hist_idx]:
+                burn_rates[username] = burn_rates.get(username, 0) + 1
+            previous = hist_idx
+            allocation_source = 'N/A'
+            if self.source[idx] != NO_SOURCE:
+                allocation_source = self.allocation_sources[self.source[idx]]
+            history = History(
+                statuses[bool(self.history_active[hist_idx])],
+                sizes[int(self.history_cpu[hist_idx])]
+            )
+            rows.append(
+                {
+                    'username': username,
+                    'allocation_source': allocation_source,
+                    'instance_status_start_date': _from_epoch(self.start[idx]),
+                    'instance_status_end_date': _from_epoch(self.end[idx]),
+                    'burn_rate': burn_rates.get(username, 0),
+                    'history': history
+                }
+            )
+        return rows
+
+
+def _from_epoch(seconds):
+    return datetime.fromtimestamp(seconds, pytz.utc)
+
+
+def dict_usage(rows, report_start, report_end, allocation_source_name):
+    """
+    The python backend: `calculate_allocation` for every row, then the
+    rows of the allocation source summed and read per user
+    """
+    for row in rows:
+        row['applicable_duration'] = calculate_allocation(
+            row['history'], row['instance_status_start_date'],
+            row['instance_status_end_date'], report_start, report_end
+        )
+    rows_by_user = {}
+    for row in rows:
+        if row['allocation_source'] == allocation_source_name:
+            rows_by_user.setdefault(row['username'], []).append(row)
+    usage = {}
+    for username, user_rows in rows_by_user.iteritems():
+        usage[username] = [
+            _sum_applicable_duration(user_rows),
+            _last_burn_rate(user_rows)
+        ]
+    return usage
+
+
+def numpy_usage(slices, report_start, report_end, allocation_source_name):
+    seconds = slices.usage_by_user(
+        report_start, report_end, allocation_source_name
+    )
+    burn_rates = slices.burn_rate_by_user(allocation_source_name)
+    usage = {}
+    for username in slices.usernames:
+        usage[username] = [seconds[username], burn_rates[username]]
+    return usage
+
+
+def timed(label, method, *args):
+    started = time.time()
+    result = method(*args)
+    print "%-28s %8.3fs" % (label, time.time() - started)
+    return result
+
+
+def compare(expected, actual):
+    worst = max(
+        [0.0] + [
+            abs(expected.get(username, [0.0, 0])[0] - seconds)
+            for username, (seconds, _) in actual.iteritems()
+        ]
+    )
+    burn_rate_differences = len(
+        [
+            username for username, (_, burn_rate) in actual.iteritems()
+            if expected.get(username, [0.0, 0])[1] != burn_rate
+        ]
+    )
+    print "Max per-user difference: %.6f cpu-seconds" % worst
+    print "Users with a different burn rate: %s" % burn_rate_differences
+
+
+def synthetic(args):
+    report_end = datetime(2017, 1, 1, tzinfo=pytz.utc)
+    report_start = report_end - timedelta(days=365)
+    report = SyntheticReport(
+        args.rows, args.users, args.sources, report_start, report_end, args.seed
+    )
+    name = report.allocation_sources[0]
+    print "%s rows, %s users, %s allocation sources" % (
+        args.rows, args.users, args.sources
+    )
+    rows = timed("build row dicts", report.to_rows)
+    slices = timed("build HistorySlices", report.to_slices)
+    expected = timed(
+        "python (row dicts)", dict_usage, rows, report_start, report_end, name
+    )
+    actual = timed(
+        "numpy (HistorySlices)", numpy_usage, slices, report_start, report_end,
+        name
+    )
+    compare(expected, actual)
+
+
+def end_to_end(backend, allocation_source, start_date, end_date, users):
+    with override_settings(ALLOCATION_USAGE_BACKEND=backend):
+        return usage_seconds_for_source(
+            allocation_source, start_date, end_date, users
+        )
+
+
+def from_database(args):
+    allocation_source = AllocationSource.objects.get(name=args.source)
+    users = list(allocation_source.all_users)
+    end_date = timezone.now()
+    start_date = end_date - timedelta(days=args.days)
+    print "%s users, %s days" % (len(users), args.days)
+    expected = timed(
+        "python (report rows)", end_to_end, 'python', allocation_source,
+        start_date, end_date, users
+    )
+    actual = timed(
+        "numpy (columnar)", end_to_end, 'numpy', allocation_source, start_date,
+        end_date, users
+    )
+    compare(expected, actual)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--sources", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--source",
+        help="Time both backends end to end on this allocation source's "
+        "users, instead of on a synthetic report"
+    )
+    parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+    if args.source:
+        from_database(args)
+    else:
+        synthetic(args)
+
+
+if __name__ == "__main__":
+    main()
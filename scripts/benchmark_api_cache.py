@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Compare `/api/v2/images` and `/api/v2/instances` latency with the configured
+Django cache (`CACHES['default']`) and with caching disabled, e.g.:
+
+    ./scripts/benchmark_api_cache.py --username sgregory --requests 50
+
+Each endpoint is warmed up with one request before it is timed, so the
+'cached' rows measure the steady state (application metrics, instance
+metrics, cloud admin lookups and cloud resource lists served from the
+cache).
+"""
+import argparse
+import time
+
+import django
+django.setup()
+
+from django.core.urlresolvers import resolve
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import AtmosphereUser
+
+ENDPOINTS = ['/api/v2/images', '/api/v2/instances']
+NO_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
+
+
+def get(user, path):
+    request = APIRequestFactory().get(path)
+    force_authenticate(request, user=user)
+    match = resolve(path)
+    response = match.func(request, *match.args, **match.kwargs)
+    response.render()
+    return response
+
+
+def timed(label, user, path, count):
+    get(user, path)
+    latencies = []
+    for _ in xrange(count):
+        started = time.time()
+        get(user, path)
+        latencies.append(time.time() - started)
+    latencies.sort()
+    print "%-20s %-10s %8.1fms %8.1fms %8.1fms" % (
+        path, label, 1000 * sum(latencies) / len(latencies),
+        1000 * latencies[len(latencies) // 2],
+        1000 * latencies[int(len(latencies) * 0.95)]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    user = AtmosphereUser.objects.get(username=args.username)
+    print "%-20s %-10s %10s %10s %10s" % (
+        "endpoint", "cache", "mean", "p50", "p95"
+    )
+    for path in ENDPOINTS:
+        with override_settings(CACHES=NO_CACHE):
+            timed("off", user, path, args.requests)
+        timed("on", user, path, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Compare `_cleanup_missing_instances` against the previous per-instance
+implementation for one identity with many instances, e.g.:
+
+    ./scripts/benchmark_cleanup_missing_instances.py \\
+        --identity <identity-uuid> --instances 10000 --missing 0.1
+
+`--instances` open instances (each with one open history) are created for
+the identity with bulk_create, `--missing` of them are left out of the
+'running' list, and each implementation runs inside a transaction that is
+rolled back.
+"""
+import argparse
+import time
+import uuid
+
+import django
+django.setup()
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import (
+    Identity, Instance, InstanceSource, InstanceStatus, InstanceStatusHistory,
+    Size
+)
+from service.monitoring import _cleanup_missing_instances
+
+
+def legacy_cleanup(identity, core_running_instances):
+    """
+    The previous implementation: an OR-joined distinct() query, a list scan
+    per instance and a history query per running instance.
+    """
+    start_date = timezone.datetime(1970, 1, 1).replace(tzinfo=timezone.utc)
+    core_instances = Instance.objects.filter(
+        Q(instancestatushistory__end_date=None) |
+        Q(instancestatushistory__end_date__gt=start_date) | Q(end_date=None) |
+        Q(end_date__gt=start_date),
+        created_by=identity.created_by,
+        created_by_identity=identity
+    ).distinct()
+    for inst in core_instances:
+        if not core_running_instances or inst not in core_running_instances:
+            inst.end_date_all()
+        else:
+            len(inst.instancestatushistory_set.filter(end_date=None))
+
+
+def create_instances(identity, count):
+    source = InstanceSource.objects.filter(provider=identity.provider).first()
+    size = Size.objects.filter(provider=identity.provider).first()
+    status = InstanceStatus.objects.get_or_create(name='active')[0]
+    now = timezone.now()
+    Instance.objects.bulk_create(
+        Instance(
+            name='benchmark-%s' % idx,
+            source=source,
+            provider_alias=str(uuid.uuid4()),
+            created_by=identity.created_by,
+            created_by_identity=identity,
+            start_date=now
+        ) for idx in xrange(count)
+    )
+    instances = list(
+        Instance.objects.filter(
+            created_by_identity=identity, name__startswith='benchmark-'
+        )
+    )
+    InstanceStatusHistory.objects.bulk_create(
+        InstanceStatusHistory(
+            instance=instance, size=size, status=status, start_date=now
+        ) for instance in instances
+    )
+    return instances
+
+
+def timed(label, method, identity, instance_count, missing):
+    with transaction.atomic():
+        instances = create_instances(identity, instance_count)
+        running = instances[int(len(instances) * missing):]
+        with CaptureQueriesContext(connection) as queries:
+            started = time.time()
+            method(identity, running)
+            elapsed = time.time() - started
+        transaction.set_rollback(True)
+    print "%-28s %8.3fs %8d queries" % (
+        label, elapsed, len(queries.captured_queries)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--identity", required=True)
+    parser.add_argument("--instances", type=int, default=10000)
+    parser.add_argument(
+        "--missing",
+        type=float,
+        default=0.1,
+        help="Fraction of instances which are not running"
+    )
+    args = parser.parse_args()
+
+    identity = Identity.objects.get(uuid=args.identity)
+    timed("previous", legacy_cleanup, identity, args.instances, args.missing)
+    timed(
+        "set-based", _cleanup_missing_instances, identity, args.instances,
+        args.missing
+    )
+
+
+if __name__ == "__main__":
+    main()
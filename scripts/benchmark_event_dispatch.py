@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Compare EventTable insert throughput with every hook connected to every save
+(as before the handler registry), with name-keyed dispatch, and with
+`EventTable.bulk_create_events`, e.g.:
+
+    ./scripts/benchmark_event_dispatch.py --events 5000
+
+Events are inserted inside transactions that are rolled back. The default
+event name has no handler, so only dispatch overhead is measured; pass
+`--name` to include the cost of a handler.
+"""
+import argparse
+import time
+
+import django
+django.setup()
+
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+
+from core.models import EventTable
+from core.models.event_table import (
+    dispatch_post_save, dispatch_pre_save, post_save_handlers, pre_save_handlers
+)
+
+HOOKS = [(pre_save, pre_save_handlers), (post_save, post_save_handlers)]
+
+
+def connect_every_hook():
+    pre_save.disconnect(dispatch_pre_save, sender=EventTable)
+    post_save.disconnect(dispatch_post_save, sender=EventTable)
+    for signal, registry in HOOKS:
+        for handlers in registry.handlers.values():
+            for handler in handlers:
+                signal.connect(handler, sender=EventTable)
+
+
+def connect_registry():
+    for signal, registry in HOOKS:
+        for handlers in registry.handlers.values():
+            for handler in handlers:
+                signal.disconnect(handler, sender=EventTable)
+    pre_save.connect(dispatch_pre_save, sender=EventTable)
+    post_save.connect(dispatch_post_save, sender=EventTable)
+
+
+def build_events(name, count):
+    return [
+        EventTable(name=name, entity_id='benchmark', payload={'index': idx})
+        for idx in xrange(count)
+    ]
+
+
+def save_each(events):
+    for event in events:
+        event.save()
+
+
+def bulk_create(events):
+    EventTable.bulk_create_events(events)
+
+
+def timed(label, method, events):
+    with transaction.atomic():
+        started = time.time()
+        method(events)
+        elapsed = time.time() - started
+        transaction.set_rollback(True)
+    print "%-28s %8.3fs %10.0f events/s" % (
+        label, elapsed, len(events) / elapsed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--name", default="benchmark_event")
+    args = parser.parse_args()
+
+    connect_every_hook()
+    try:
+        timed(
+            "save, every hook", save_each, build_events(args.name, args.events)
+        )
+    finally:
+        connect_registry()
+    timed(
+        "save, name dispatch", save_each, build_events(args.name, args.events)
+    )
+    timed(
+        "bulk_create_events", bulk_create, build_events(args.name, args.events)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,9 @@ from django.db.models.query import Q
 from threepio import logger
 
 from core.models import EventTable
-from core.models.allocation_source import AllocationSource
+from core.models.allocation_source import (
+    AllocationSource, InstanceAllocationSourceInterval
+)
 from core.models.instance import Instance
 
 
@@ -16,6 +18,21 @@ def create_report(
     user_id=None,
     allocation_source_name=None
 ):
+    report_start_date, report_end_date = parse_report_dates(
+        report_start_date, report_end_date
+    )
+    data = generate_data(report_start_date, report_end_date, username=user_id)
+    if allocation_source_name:
+        output = []
+        for row in data:
+            if row['allocation_source'] == allocation_source_name:
+                output.append(row)
+        return output
+
+    return data
+
+
+def parse_report_dates(report_start_date, report_end_date):
     if not report_start_date or not report_end_date:
         raise Exception(
             "Start date and end date missing for allocation calculation function"
@@ -31,15 +48,7 @@ def create_report(
         raise Exception(
             "Cannot parse start and end dates for allocation calculation function"
         )
-    data = generate_data(report_start_date, report_end_date, username=user_id)
-    if allocation_source_name:
-        output = []
-        for row in data:
-            if row['allocation_source'] == allocation_source_name:
-                output.append(row)
-        return output
-
-    return data
+    return report_start_date, report_end_date
 
 
 def generate_data(report_start_date, report_end_date, username=None):
@@ -91,7 +100,7 @@ def filter_events_and_instances(
         except:
             raise Exception("User '%s' does not exist" % (username))
         events = events.filter(
-            Q(payload__username__exact=username) | Q(entity_id=username)
+            Q(username__exact=username) | Q(entity_id=username)
         ).order_by('timestamp')
         instances = instances.filter(Q(created_by__exact=user_id_int))
     instance_ids = instances.values_list("id", flat=True)
@@ -143,6 +152,29 @@ def map_events_to_histories(filtered_instance_histories, event_instance_dict):
 def get_allocation_source_name_from_event(
     username, report_start_date, instance_id, instance_history_start_date
 ):
+    """
+    Return the name of the allocation source instance `instance_id` used
+    just before max(report_start_date, instance_history_start_date), or
+    False. `username` is kept for compatibility: every
+    `instance_allocation_source_changed` event of the instance counts.
+    """
+    allocation_source = InstanceAllocationSourceInterval.allocation_source_at(
+        max(report_start_date, instance_history_start_date),
+        instance__provider_alias=instance_id
+    )
+    if not allocation_source:
+        return False
+    return allocation_source.name
+
+
+def _legacy_allocation_source_name_from_event(
+    username, report_start_date, instance_id, instance_history_start_date
+):
+    """
+    The original, event replay, `get_allocation_source_name_from_event`.
+    Only kept as the reference InstanceAllocationSourceInterval is checked
+    against (service/tests/test_allocation_report.py).
+    """
     events = EventTable.objects.filter(
         Q(
             Q(timestamp__lt=report_start_date) |
@@ -0,0 +1,358 @@
+"""
+Set-based allocation report engine.
+
+Produces the same rows as `service.allocation_logic.create_report`, but loads
+events, allocation source intervals, instance status histories, sizes,
+statuses and application names in a fixed number of queries and joins them
+in memory, rather than querying once per instance and once per history row.
+"""
+from bisect import bisect_left, bisect_right
+
+from django.db.models.query import Q
+from threepio import logger
+
+from core.models import EventTable
+from core.models.allocation_source import InstanceAllocationSourceInterval
+from core.models.instance import Instance
+from core.models.instance_history import InstanceStatusHistory
+from service.allocation_logic import (
+    calculate_allocation, filter_events_and_instances, parse_report_dates,
+    _get_current_date_utc
+)
+
+ALLOCATION_CHANGED_EVENT = "instance_allocation_source_changed"
+
+
+def create_report(
+    report_start_date,
+    report_end_date,
+    user_id=None,
+    allocation_source_name=None
+):
+    report_start_date, report_end_date = parse_report_dates(
+        report_start_date, report_end_date
+    )
+    data = generate_data(report_start_date, report_end_date, username=user_id)
+    if allocation_source_name:
+        return [
+            row for row in data
+            if row['allocation_source'] == allocation_source_name
+        ]
+    return data
+
+
+def create_report_for_users(
+    report_start_date, report_end_date, users, allocation_source_name=None
+):
+    """
+    Build the rows of `create_report(..., user_id=username)` for many users
+    in a single pass. Burn rates are counted per user, and only the events
+    made by an instance's owner are applied, as in the per-user report.
+    """
+    report_start_date, report_end_date = parse_report_dates(
+        report_start_date, report_end_date
+    )
+    instances = filter_events_and_instances(
+        report_start_date, report_end_date
+    )['instances'].filter(created_by__in=users)
+    usernames = [user.username for user in users]
+    allocation_events = EventTable.objects.filter(
+        Q(entity_id__in=usernames) | Q(username__in=usernames)
+    )
+    data = _generate_rows(
+        instances,
+        report_start_date,
+        report_end_date,
+        get_allocation_events(
+            report_start_date, report_end_date, queryset=allocation_events
+        ),
+        per_user=True
+    )
+    if allocation_source_name:
+        return [
+            row for row in data
+            if row['allocation_source'] == allocation_source_name
+        ]
+    return data
+
+
+def generate_data(report_start_date, report_end_date, username=None):
+    filtered_items = filter_events_and_instances(
+        report_start_date, report_end_date, username=username
+    )
+    return _generate_rows(
+        filtered_items['instances'], report_start_date, report_end_date,
+        get_allocation_events(
+            report_start_date, report_end_date, username=username
+        )
+    )
+
+
+def _generate_rows(
+    instances,
+    report_start_date,
+    report_end_date,
+    allocation_events,
+    per_user=False
+):
+    instance_aliases = list(instances.values_list('provider_alias', flat=True))
+    histories = get_all_histories_for_instances(
+        instances, instance_aliases, report_start_date, report_end_date
+    )
+    image_names = get_application_names(instances)
+    if per_user:
+        allocation_events = _filter_events_by_owner(
+            allocation_events, histories
+        )
+    event_timeline = IntervalTimeline(instances)
+    events_histories_dict = map_events_to_histories(
+        histories, group_events_by_instances(allocation_events)
+    )
+    return create_rows(
+        histories,
+        events_histories_dict,
+        event_timeline,
+        image_names,
+        report_start_date,
+        report_end_date,
+        per_user=per_user
+    )
+
+
+def _filter_events_by_owner(events, histories):
+    owners = {}
+    for alias, instance_histories in histories.iteritems():
+        if instance_histories:
+            owners[alias] = instance_histories[0].instance.created_by.username
+    return [
+        event for event in events
+        if _is_owner_event(event, owners.get(event.payload['instance_id']))
+    ]
+
+
+def _is_owner_event(event, username):
+    if not username:
+        return False
+    return event.entity_id == username or \
+        event.payload.get('username') == username
+
+
+def get_all_histories_for_instances(
+    instances, instance_aliases, report_start_date, report_end_date
+):
+    """
+    Return a dict of provider_alias -> histories (ordered by start_date),
+    fetched in a single query. Every alias in `instance_aliases` is present,
+    in the same insertion order that the per-instance implementation uses.
+    """
+    history_qs = InstanceStatusHistory.objects.filter(
+        Q(instance__in=instances) & ~Q(start_date__gte=report_end_date) &
+        ~Q(Q(end_date__isnull=False) & Q(end_date__lte=report_start_date))
+    ).select_related('instance__created_by', 'size',
+                     'status').order_by('instance_id', 'start_date', 'id')
+    grouped = {}
+    for hist in history_qs:
+        grouped.setdefault(hist.instance.provider_alias, []).append(hist)
+    histories = {}
+    for alias in instance_aliases:
+        histories[alias] = grouped.get(alias, [])
+    return histories
+
+
+def get_application_names(instances):
+    """
+    Return a dict of instance id -> application name (None for volumes)
+    """
+    return dict(
+        Instance.objects.filter(id__in=instances).values_list(
+            'id',
+            'source__providermachine__application_version__application__name'
+        )
+    )
+
+
+def get_allocation_events(
+    report_start_date, report_end_date, username=None, queryset=None
+):
+    """
+    The `instance_allocation_source_changed` events inside the report window,
+    ordered by timestamp. Earlier events are only needed to find the source
+    an instance started the window with, which IntervalTimeline answers.
+    """
+    if queryset is None:
+        queryset = EventTable.objects.all()
+    events = queryset.filter(
+        name__exact=ALLOCATION_CHANGED_EVENT,
+        timestamp__gte=report_start_date,
+        timestamp__lte=report_end_date
+    )
+    if username:
+        events = events.filter(
+            Q(username__exact=username) | Q(entity_id=username)
+        )
+    return list(events.order_by('timestamp', 'id'))
+
+
+def group_events_by_instances(events):
+    out_dic = {}
+    for event in events:
+        out_dic.setdefault(event.payload['instance_id'], []).append(event)
+    return out_dic
+
+
+def map_events_to_histories(filtered_instance_histories, event_instance_dict):
+    """
+    Map each event to the id of the last history (by start_date) that was
+    open at the time of the event, using a binary search on start dates.
+    """
+    out_dic = {}
+    for instance, events in event_instance_dict.iteritems():
+        hist_list = filtered_instance_histories.get(instance, [])
+        if not hist_list:
+            continue
+        start_dates = [hist.start_date for hist in hist_list]
+        for info in events:
+            ts = info.timestamp
+            idx = bisect_right(start_dates, ts) - 1
+            while idx >= 0:
+                hist = hist_list[idx]
+                if not hist.end_date or hist.end_date >= ts:
+                    out_dic.setdefault(hist.id, []).append(info)
+                    break
+                idx -= 1
+    return out_dic
+
+
+class IntervalTimeline(object):
+    """
+    The allocation source intervals (InstanceAllocationSourceInterval) of the
+    report's instances, loaded in one query, used to answer "which allocation
+    source did this instance use before time T" in memory.
+    """
+
+    def __init__(self, instances):
+        self.names = {}
+        self.valid_from = {}
+        intervals = InstanceAllocationSourceInterval.objects.filter(
+            instance__in=instances
+        ).order_by('instance_id', 'valid_from', 'id').values_list(
+            'instance__provider_alias', 'allocation_source__name', 'valid_from'
+        )
+        for alias, name, valid_from in intervals:
+            self.names.setdefault(alias, []).append(name)
+            self.valid_from.setdefault(alias, []).append(valid_from)
+
+    def allocation_source_name(
+        self, username, report_start_date, instance_id,
+        instance_history_start_date
+    ):
+        """
+        In-memory equivalent of
+        `service.allocation_logic.get_allocation_source_name_from_event`
+        """
+        valid_from = self.valid_from.get(instance_id)
+        if not valid_from:
+            return False
+        cutoff = max(report_start_date, instance_history_start_date)
+        idx = bisect_left(valid_from, cutoff) - 1
+        if idx < 0:
+            return False
+        return self.names[instance_id][idx]
+
+
+def create_rows(
+    filtered_instance_histories,
+    events_histories_dict,
+    event_timeline,
+    image_names,
+    report_start_date,
+    report_end_date,
+    per_user=False
+):
+    """
+    per_user: Count the burn rate separately for each user, instead of as a
+    running total across every row of the report.
+    """
+    data = []
+    current_user = ''
+    allocation_source_name = ''
+    current_instance_id = ''
+
+    still_running = _get_current_date_utc()
+    burn_rates = {}
+    for instance, histories in filtered_instance_histories.iteritems():
+        for hist in histories:
+            current_user = hist.instance.created_by.username
+
+            if current_instance_id != hist.instance.id:
+                current_as_name = event_timeline.allocation_source_name(
+                    current_user, report_start_date,
+                    hist.instance.provider_alias, hist.start_date
+                )
+                allocation_source_name = current_as_name if current_as_name else 'N/A'
+                current_instance_id = hist.instance.id
+
+            filled_row = build_row(
+                hist, allocation_source_name, image_names.get(hist.instance_id),
+                still_running, report_start_date, report_end_date
+            )
+            # check if instance is active and has no end date. If so, increment total burn rate
+            burn_rate_key = current_user if per_user else None
+            if hist.status.name == 'active' and not hist.end_date:
+                burn_rates[burn_rate_key] = burn_rates.get(burn_rate_key, 0) + 1
+            filled_row['burn_rate'] = burn_rates.get(burn_rate_key, 0)
+            start_date = hist.start_date
+            for event in events_histories_dict.get(hist.id, []):
+                end_date = event.timestamp
+                filled_row_temp = filled_row.copy()
+                filled_row_temp['instance_status_start_date'] = start_date
+                filled_row_temp['instance_status_end_date'] = end_date
+                filled_row_temp['allocation_source'] = allocation_source_name
+                allocation_source_name = event.payload.get(
+                    'allocation_source_name', 'N/A'
+                )
+                filled_row_temp['applicable_duration'] = calculate_allocation(
+                    hist, start_date, end_date, report_start_date,
+                    report_end_date
+                )
+                data.append(filled_row_temp)
+                start_date = event.timestamp
+            end_date = still_running if not hist.end_date else hist.end_date
+            filled_row['instance_status_start_date'] = start_date
+            filled_row['allocation_source'] = allocation_source_name
+            filled_row['applicable_duration'] = calculate_allocation(
+                hist, start_date, end_date, report_start_date, report_end_date
+            )
+            data.append(filled_row)
+    logger.debug(
+        "Created %s report rows for %s instances" %
+        (len(data), len(filtered_instance_histories))
+    )
+    return data
+
+
+def build_row(
+    hist, allocation_source, image_name, still_running, report_start_date,
+    report_end_date
+):
+    end_date = still_running if not hist.end_date else hist.end_date
+    return {
+        'username': hist.instance.created_by.username,
+        'instance_id': hist.instance_id,
+        'allocation_source': allocation_source,
+        'image_name': image_name,
+        'provider_alias': hist.instance.provider_alias,
+        'instance_status_history_id': hist.id,
+        'cpu': hist.size.cpu,
+        'memory': hist.size.mem,
+        'disk': hist.size.disk,
+        'instance_status_start_date': hist.start_date,
+        'instance_status_end_date': end_date,
+        'report_start_date': report_start_date,
+        'report_end_date': report_end_date,
+        'instance_status': hist.status.name,
+        'duration': (end_date - hist.start_date).total_seconds(),
+        'applicable_duration': '',
+        'burn_rate': '',
+        'current_time': still_running
+    }
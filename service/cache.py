@@ -1,12 +1,29 @@
+"""
+Cache for cloud (rtwo) listings, kept in the Django cache (Redis, see
+`settings.CACHES`).
+
+Entries are versioned (a deploy that changes `CLOUD_CACHE_VERSION` or the
+serialization format never reads an older entry), expire after a per-resource
+TTL (`CLOUD_CACHE_TTL`) and are kept for `CLOUD_CACHE_STALE_TTL` seconds
+longer, so that while one worker refreshes an expired listing everyone else
+is served the previous one. Refreshes are single-flight: a lock (an `add`ed
+key next to the entry) lets one caller query the cloud while the others wait.
+"""
 import cPickle as pickle
+import time
+from collections import Counter, defaultdict
+
 import redis
+from django.conf import settings
+from django.core.cache import caches
 from threepio import logger
 
 from service.driver import get_esh_driver, get_admin_driver
+from service.driver_pool import driver_pool
 
-admin_drivers = {}
-drivers = {}
-connection = None
+# Bump when the cached representation changes
+SERIALIZATION_VERSION = 3
+KEY_PREFIX = "atmosphere.cloud.v{0}.{1}."
 
 INSTANCES_KEY_PROVIDER = "instances.{0}"
 INSTANCES_KEY_IDENTITY = "instances.{0}.{1}"
@@ -14,71 +31,233 @@ VOLUMES_KEY_PROVIDER = "volumes.{0}"
 VOLUMES_KEY_IDENTITY = "volumes.{0}.{1}"
 MACHINES_KEY_PROVIDER = "machines.{0}"
 MACHINES_KEY_IDENTITY = "machines.{0}.{1}"
+REFRESH_KEY = "{0}.refresh"
+# Longest a refresh may hold the lock, in case its worker dies mid-refresh
+REFRESH_LOCK_TIMEOUT = 120
+REFRESH_POLL_INTERVAL = 0.1
+
+DEFAULT_TTL = 30
+
+# Attributes kept when an rtwo object is cached, everything else (libcloud
+# nodes, connections, provider/identity back-references) is dropped.
+INSTANCE_FIELDS = ['id', 'alias', 'name', 'owner', 'ip', 'extra']
+SIZE_FIELDS = [
+    'id', 'alias', 'name', 'ram', 'cpu', 'disk', 'ephemeral', 'bandwidth',
+    'price', 'extra', 'provider'
+]
+SOURCE_FIELDS = ['id', 'alias', 'name', 'size', 'extra']
+DROPPED_REFERENCES = ['_connection', '_node', '_size', '_image', '_volume']
 
+_stats = defaultdict(Counter)
 
-def _get_cached_admin_driver(provider, force=True):
-    if not admin_drivers.get(provider) or force:
-        admin_drivers[provider] = get_admin_driver(provider)
-    return admin_drivers[provider]
+
+def _get_cached_admin_driver(provider, force=False):
+    return driver_pool.get(
+        ('provider', provider.id),
+        lambda: get_admin_driver(provider),
+        provider.id,
+        force=force
+    )
 
 
-def _get_cached_driver(provider=None, identity=None, force=True):
+def _get_cached_driver(provider=None, identity=None, force=False):
     if provider:
         return _get_cached_admin_driver(provider, force)
-    if not drivers.get(identity) or force:
-        drivers[identity] = get_esh_driver(identity)
-    return drivers[identity]
+    return driver_pool.get(
+        ('identity', identity.id),
+        lambda: get_esh_driver(identity),
+        identity.provider_id,
+        identity_id=identity.id,
+        force=force
+    )
+
+
+def shared_cache():
+    return caches[settings.CLOUD_CACHE_ALIAS]
+
+
+def cache_stats():
+    """
+    Return {resource: {'hit': n, 'stale': n, 'wait': n, 'miss': n}} for this
+    process. 'wait' counts callers served by another caller's refresh.
+    """
+    return dict(
+        (resource, dict(counts)) for resource, counts in _stats.iteritems()
+    )
+
+
+def reset_cache_stats():
+    _stats.clear()
+
+
+def _versioned(key):
+    return KEY_PREFIX.format(
+        SERIALIZATION_VERSION, settings.CLOUD_CACHE_VERSION
+    ) + key
 
 
-def redis_connection():
-    global connection
-    if not connection:
-        connection = redis.StrictRedis()
-    return connection
+def _ttl(resource):
+    return settings.CLOUD_CACHE_TTL.get(resource, DEFAULT_TTL)
+
+
+def _log_connection_error():
+    logger.error(
+        "EXTERNAL SERVICE redis-server IS NOT RUNNING! "
+        "Somebody should turn it on!"
+    )
 
 
 def _invalidate(key):
-    r = redis_connection()
-    if key:
-        r.delete(key)
+    if not key:
+        return
+    try:
+        shared_cache().delete(_versioned(key))
+    except redis.exceptions.ConnectionError:
+        _log_connection_error()
 
 
-def _get_cached(key, data_method, scrub_method, force=False):
+def _get_cached(resource, key, data_method, force=False):
+    """
+    Return the cached result of `data_method` for `key`. Only the caller
+    holding the refresh lock calls `data_method` (single-flight):
+    - fresh entry: returned as-is
+    - expired entry: returned as-is until the refresh completes
+    - no entry: wait up to CLOUD_CACHE_LOCK_WAIT seconds for the refresh,
+      then give up and call `data_method`
+    `force` always calls `data_method`.
+    """
+    key = _versioned(key)
+    ttl = _ttl(resource)
+    r = shared_cache()
+    if force:
+        return _refresh(resource, r, key, data_method, ttl)
     try:
-        r = redis_connection()
-        if force:
-            _invalidate(key)
-        data = r.get(key)
+        entry = _loads(r.get(key))
     except redis.exceptions.ConnectionError:
-        logger.error(
-            "EXTERNAL SERVICE redis-server IS NOT RUNNING! "
-            "Somebody should turn it on!"
-        )
-        data = None
-    if not data:
+        _log_connection_error()
+        _stats[resource]['miss'] += 1
+        return data_method()
+    if entry and time.time() - entry['stored_at'] < ttl:
+        _stats[resource]['hit'] += 1
+        return entry['data']
+    if _acquire_refresh(r, key):
+        return _refresh(resource, r, key, data_method, ttl, locked=True)
+    if entry:
+        _stats[resource]['stale'] += 1
+        return entry['data']
+    entry = _wait_for_refresh(r, key)
+    if entry:
+        _stats[resource]['wait'] += 1
+        return entry['data']
+    logger.warn("Timed out waiting for cache({0}) refresh".format(key))
+    return _refresh(resource, r, key, data_method, ttl)
+
+
+def _refresh(resource, r, key, data_method, ttl, locked=False):
+    _stats[resource]['miss'] += 1
+    try:
         data = data_method()
-        scrub_method(data)
-        logger.debug(
-            "Updated redis({0}) using {1} and {2}".format(
-                key, data_method, scrub_method
-            )
+        _store(r, key, data, ttl)
+    finally:
+        if locked:
+            _release_refresh(r, key)
+    logger.debug("Updated cache({0}) using {1}".format(key, data_method))
+    return data
+
+
+def _wait_for_refresh(r, key):
+    deadline = time.time() + settings.CLOUD_CACHE_LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(REFRESH_POLL_INTERVAL)
+        try:
+            entry = _loads(r.get(key))
+        except redis.exceptions.ConnectionError:
+            _log_connection_error()
+            return None
+        if entry:
+            return entry
+    return None
+
+
+def _acquire_refresh(r, key):
+    try:
+        return r.add(REFRESH_KEY.format(key), 1, REFRESH_LOCK_TIMEOUT)
+    except redis.exceptions.ConnectionError:
+        _log_connection_error()
+        return True
+
+
+def _release_refresh(r, key):
+    try:
+        r.delete(REFRESH_KEY.format(key))
+    except redis.exceptions.ConnectionError:
+        _log_connection_error()
+
+
+def _store(r, key, data, ttl):
+    try:
+        payload = pickle.dumps(
+            {
+                'stored_at': time.time(),
+                'records': [_to_record(obj) for obj in data]
+            }, pickle.HIGHEST_PROTOCOL
         )
-        r.set(key, pickle.dumps(data))
-        r.expire(key, 30)
-        return data
-    logger.debug("Actual type {0}".format(type(data)))
-    return pickle.loads(data)
+    except (pickle.PicklingError, TypeError):
+        logger.exception("Could not cache {0}".format(key))
+        return
+    try:
+        r.set(key, payload, ttl + settings.CLOUD_CACHE_STALE_TTL)
+    except redis.exceptions.ConnectionError:
+        _log_connection_error()
+
+
+def _loads(payload):
+    if not payload:
+        return None
+    try:
+        entry = pickle.loads(payload)
+        entry['data'] = [_from_record(record) for record in entry['records']]
+    except Exception:
+        logger.exception("Ignoring unreadable cloud cache entry")
+        return None
+    return entry
+
+
+def _to_record(obj):
+    """
+    Reduce an rtwo instance to (class, fields); its size and source are
+    reduced the same way, keeping their types for `isinstance` checks.
+    """
+    state = _pick(obj, INSTANCE_FIELDS)
+    for attr in ['size', 'source', 'machine']:
+        related = getattr(obj, attr, None)
+        if related is not None:
+            fields = SIZE_FIELDS if attr == 'size' else SOURCE_FIELDS
+            state[attr] = (related.__class__, _pick(related, fields))
+    return (obj.__class__, state)
+
+
+def _pick(obj, fields):
+    return dict(
+        (field, obj.__dict__[field])
+        for field in fields if field in obj.__dict__
+    )
+
+
+def _from_record(record):
+    cls, state = record
+    for attr in ['size', 'source', 'machine']:
+        if attr in state:
+            state[attr] = _rebuild(*state[attr])
+    return _rebuild(cls, state)
 
 
-def _scrub(objects):
-    for o in objects:
-        o._connection = None
-        for a in ["_node", "_volume", "_image"]:
-            if hasattr(o, a):
-                o.__dict__[a] = None
-        if hasattr(o, "size") and hasattr(o.size, "_size"):
-            if o.size._size:
-                o.size._size = None
+def _rebuild(cls, state):
+    obj = cls.__new__(cls)
+    for attr in DROPPED_REFERENCES:
+        obj.__dict__[attr] = None
+    obj.__dict__.update(state)
+    return obj
 
 
 def _validate_parameters(provider, identity):
@@ -86,42 +265,43 @@ def _validate_parameters(provider, identity):
         raise Exception("Use either provider or identity but not both.")
 
 
-def get_cached_driver(provider=None, identity=None, force=True):
+def get_cached_driver(provider=None, identity=None, force=False):
     _validate_parameters(provider, identity)
     return _get_cached_driver(provider=provider, identity=identity, force=force)
 
 
+def _instances_key(provider=None, identity=None):
+    if provider:
+        return INSTANCES_KEY_PROVIDER.format(provider.id)
+    return INSTANCES_KEY_IDENTITY.format(
+        identity.created_by.username, identity.id
+    )
+
+
 def get_cached_instances(provider=None, identity=None, force=False):
     _validate_parameters(provider, identity)
-    cached_driver = _get_cached_driver(
-        provider=provider, identity=identity, force=force
-    )
-    cached_driver.list_sizes()
-    #NOTE: THIS IS A HACK -- The 'admin' user should be able to see "All the things" -- HOWEVER
-    # In the current implementation of liberty on jetstream, a call to 'list_all_tenants'
-    # Made by a user with a single tenant will produce *IDENTICAL* results to that same call made by admin.
-    # THIS IS CONSIDERED HARMFUL! So we have blocked all users except the admin accounts from making this call.
-    if identity and identity.created_by and identity.created_by.username in [
-        'atmoadmin', 'admin'
-    ]:
-        instances_method = cached_driver.list_all_instances
-    else:
-        instances_method = cached_driver.list_instances
 
-    if provider:
-        key = INSTANCES_KEY_PROVIDER.format(provider.id)
-    else:
-        key = INSTANCES_KEY_IDENTITY.format(
-            identity.created_by.username, identity.id
-        )
-    return _get_cached(key, instances_method, _scrub, force=force)
+    def list_instances():
+        cached_driver = _get_cached_driver(provider=provider, identity=identity)
+        # Sizes are listed first, so that instances carry full sizes
+        cached_driver.list_sizes()
+        #NOTE: THIS IS A HACK -- The 'admin' user should be able to see "All the things" -- HOWEVER
+        # In the current implementation of liberty on jetstream, a call to 'list_all_tenants'
+        # Made by a user with a single tenant will produce *IDENTICAL* results to that same call made by admin.
+        # THIS IS CONSIDERED HARMFUL! So we have blocked all users except the admin accounts from making this call.
+        if identity and identity.created_by and identity.created_by.username in [
+            'atmoadmin', 'admin'
+        ]:
+            return cached_driver.list_all_instances()
+        return cached_driver.list_instances()
+
+    return _get_cached(
+        'instances',
+        _instances_key(provider=provider, identity=identity),
+        list_instances,
+        force=force
+    )
 
 
 def invalidate_cached_instances(provider=None, identity=None):
-    if provider:
-        key = INSTANCES_KEY_PROVIDER.format(provider.id)
-    else:
-        key = INSTANCES_KEY_IDENTITY.format(
-            identity.created_by.username, identity.id
-        )
-    _invalidate(key)
+    _invalidate(_instances_key(provider=provider, identity=identity))
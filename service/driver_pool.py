@@ -0,0 +1,115 @@
+"""
+Process-wide pool of rtwo drivers.
+
+Building a driver means a Keystone authentication, so drivers are kept per
+identity (or per provider, for admin drivers) and reused until:
+- their auth token is about to expire (or, when the token expiry is unknown,
+  they are older than DRIVER_POOL_MAX_AGE seconds)
+- they are evicted, least recently used first, to keep at most
+  DRIVER_POOL_MAX_PER_PROVIDER drivers per provider
+- the credentials they were built from change (`Identity.update_credential`)
+
+Invalidation only reaches the current process, other processes pick up new
+credentials once their driver expires.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from threepio import logger
+
+# Stop reusing a driver this long before its auth token expires
+TOKEN_EXPIRY_MARGIN = timedelta(minutes=5)
+
+
+class PooledDriver(object):
+    def __init__(self, driver, provider_id, identity_id=None):
+        self.driver = driver
+        self.provider_id = provider_id
+        self.identity_id = identity_id
+        self.created = timezone.now()
+
+    def is_expired(self):
+        expires = _token_expires(self.driver)
+        if expires:
+            now = timezone.now() if timezone.is_aware(expires) \
+                else datetime.utcnow()
+            return now >= expires - TOKEN_EXPIRY_MARGIN
+        max_age = timedelta(seconds=settings.DRIVER_POOL_MAX_AGE)
+        return timezone.now() >= self.created + max_age
+
+
+def _token_expires(driver):
+    """
+    Return when the driver's (libcloud) auth token expires, None if the
+    driver has not authenticated yet or does not track it.
+    """
+    connection = getattr(driver, '_connection', None)
+    connection = getattr(connection, 'connection', None)
+    return getattr(connection, 'auth_token_expires', None)
+
+
+class DriverPool(object):
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+
+    def get(
+        self, key, build_method, provider_id, identity_id=None, force=False
+    ):
+        """
+        Return the pooled driver for `key`, calling `build_method` to create
+        it when missing, expired or `force`d.
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry and not force and not entry.is_expired():
+                self.entries[key] = entry
+                return entry.driver
+        driver = build_method()
+        if not driver:
+            return driver
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = PooledDriver(driver, provider_id, identity_id)
+            self._evict(provider_id)
+        return driver
+
+    def _evict(self, provider_id):
+        provider_keys = [
+            key for key, entry in self.entries.iteritems()
+            if entry.provider_id == provider_id
+        ]
+        overflow = len(provider_keys) - settings.DRIVER_POOL_MAX_PER_PROVIDER
+        for key in provider_keys[:max(overflow, 0)]:
+            logger.debug("Evicting driver %s from the driver pool" % (key, ))
+            del self.entries[key]
+
+    def invalidate_identity(self, identity):
+        """
+        Drop the drivers built from `identity`'s credentials, including the
+        admin driver of its provider (which may use them).
+        """
+        with self.lock:
+            for key, entry in self.entries.items():
+                if entry.identity_id == identity.id or (
+                    entry.identity_id is None
+                    and entry.provider_id == identity.provider_id
+                ):
+                    del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+driver_pool = DriverPool()
+
+
+def invalidate_identity_drivers(identity):
+    driver_pool.invalidate_identity(identity)
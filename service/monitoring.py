@@ -1,12 +1,13 @@
 import random
 import time
 from django.core.exceptions import ObjectDoesNotExist
-import pytz
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Q
 from django.utils import timezone
 from threepio import logger
 from core.models import AccountProvider
 from core.models.credential import Credential
+from core.models.identity import credentials_for
 from core.models import InstanceStatusHistory
 from core.models.instance import Instance as CoreInstance
 from core.models.instance import (
@@ -21,6 +22,7 @@ from rtwo.exceptions import LibcloudInvalidCredsError
 # Private
 def _include_all_idents(identities, owner_map):
     # Include all identities with 0 instances to the monitoring
+    identities = credentials_for(identities)
     identity_owners = [
         ident.get_credential('ex_tenant_name') for ident in identities
     ]
@@ -44,19 +46,30 @@ def _make_instance_owner_map(instances, users=None):
     return owner_map
 
 
-def _core_instances_for(identity, start_date=None):
-    if not start_date:
-        # Can't use 'None' as a query value
-        start_date = timezone.datetime(1970, 1, 1).replace(tzinfo=pytz.utc)
-    return CoreInstance.objects.filter(
-        Q(instancestatushistory__end_date=None) |
-        Q(instancestatushistory__end_date__gt=start_date) | Q(end_date=None) |
-        Q(end_date__gt=start_date),
-    # NOTE: May need to remove this created_by line
-    # down-the-road as we share user/tenants.
-        created_by=identity.created_by,
-        created_by_identity=identity
-    ).distinct()
+def _open_instances_for(identity):
+    """
+    Return {provider_alias: (instance_id, open_history_count)} for the
+    instances of `identity` that are not end dated, or that still have a
+    history without an end date. Two queries, both covered by the
+    (created_by_identity, end_date) and (instance, end_date) indexes.
+    """
+    open_instances = dict(
+        (alias, (instance_id, 0))
+        for instance_id, alias in CoreInstance.objects.filter(
+            created_by=identity.created_by,
+            created_by_identity=identity,
+            end_date__isnull=True
+        ).values_list('id', 'provider_alias')
+    )
+    open_histories = InstanceStatusHistory.objects.filter(
+        instance__created_by=identity.created_by,
+        instance__created_by_identity=identity,
+        end_date__isnull=True
+    ).values_list('instance_id', 'instance__provider_alias')
+    open_histories = open_histories.annotate(count=Count('id')).order_by()
+    for instance_id, alias, count in open_histories:
+        open_instances[alias] = (instance_id, count)
+    return open_instances
 
 
 def _select_identities(provider, users=None):
@@ -77,8 +90,35 @@ def _convert_tenant_id_to_names(instances, tenants):
     return instances
 
 
-def _get_identity_from_tenant_name(provider, username):
+def tenant_identity_map(provider):
+    """
+    Return {tenant_name: identity} for every identity on `provider` with an
+    'ex_project_name' credential, with credentials prefetched for building
+    drivers. Two queries, however many tenants the provider has.
+    """
+    credentials = Credential.objects.filter(
+        key='ex_project_name', identity__provider=provider
+    ).select_related('identity__created_by').prefetch_related(
+        'identity__credential_set'
+    ).order_by('id')
+    identity_map = {}
+    for credential in credentials:
+        identity = credential.identity
+        if credential.value in identity_map:
+            logger.warn(
+                "%s has >1 Credentials on Provider %s" %
+                (credential.value, provider)
+            )
+            continue
+        identity.provider = provider
+        identity_map[credential.value] = identity
+    return identity_map
+
+
+def _get_identity_from_tenant_name(provider, username, identity_map=None):
     # FIXME: This needs to be `username, tenant_name` because the `project_name` no longer has to match the `username`
+    if identity_map is not None:
+        return identity_map.get(username)
     try:
         # NOTE: I could see this being a problem when 'user1' and 'user2' use
         # TODO: Ideally we would be able to extract some more information
@@ -96,7 +136,7 @@ def _get_identity_from_tenant_name(provider, username):
         )
         credential = Credential.objects.filter(
             key='ex_project_name', value=username, identity__provider=provider
-        )[0]
+        ).order_by('id')[0]
         identity = credential.identity
         return identity
     except Credential.DoesNotExist:
@@ -169,53 +209,73 @@ def _cleanup_missing_instances(
     active...
 
     core_running_instances - Reference list of KNOWN active instances
-    """
-    instances = []
 
+    Instances of `identity` which are still open but not running are end
+    dated (with all of their open history) in one transaction. Running
+    instances with more than one open history get a fresh history.
+    Returns the running instances which belong to `identity`.
+
+    `start_date` is no longer used: instances that ended before or after it
+    without any open history have nothing left to clean up.
+    """
     if not identity:
-        return instances
-
-    core_instances = _core_instances_for(identity, start_date)
-    fixed_instances = []
-    for inst in core_instances:
-        if not core_running_instances or inst not in core_running_instances:
-            inst.end_date_all()
-            fixed_instances.append(inst)
-        else:
-            # Instance IS in the list of running instances.. Further cleaning
-            # can be done at this level.
-            non_end_dated_history = inst.instancestatushistory_set.filter(
+        return []
+
+    running = dict(
+        (inst.provider_alias, inst) for inst in core_running_instances or []
+    )
+    open_instances = _open_instances_for(identity)
+    missing_ids = [
+        instance_id for alias, (instance_id, _) in open_instances.iteritems()
+        if alias not in running
+    ]
+    if missing_ids:
+        end_date = timezone.now()
+        with transaction.atomic():
+            InstanceStatusHistory.objects.filter(
+                instance_id__in=missing_ids, end_date__isnull=True
+            ).update(end_date=end_date)
+            CoreInstance.objects.filter(
+                id__in=missing_ids, end_date__isnull=True
+            ).update(end_date=end_date)
+        logger.info(
+            "END DATING %s instances of %s: %s" %
+            (len(missing_ids), identity.created_by.username, end_date)
+        )
+
+    conflicts = [
+        (running[alias], count)
+        for alias, (_, count) in sorted(open_instances.iteritems())
+        if alias in running and count > 1
+    ]
+    for core_running_inst, count in conflicts:
+        non_end_dated_history = list(
+            core_running_inst.instancestatushistory_set.filter(
                 end_date=None
+            ).select_related('status')
+        )
+        history_names = [ish.status.name for ish in non_end_dated_history]
+        new_history = _resolve_history_conflict(
+            identity, core_running_inst, non_end_dated_history
+        )
+        logger.warn(
+            "Instance %s contained %s "
+            "NON END DATED history:%s. "
+            " New History: %s" % (
+                core_running_inst.provider_alias, count, history_names,
+                new_history
             )
-            count = len(non_end_dated_history)
-            if count > 1:
-                history_names = [
-                    ish.status.name for ish in non_end_dated_history
-                ]
-                # Note: We have the 'wrong' instance, we want the one that
-                # includes the ESH driver
-                core_running_inst = [
-                    i for i in core_running_instances if i == inst
-                ][0]
-                new_history = _resolve_history_conflict(
-                    identity, core_running_inst, non_end_dated_history
-                )
-                fixed_instances.append(inst)
-                logger.warn(
-                    "Instance %s contained %s "
-                    "NON END DATED history:%s. "
-                    " New History: %s" %
-                    (inst.provider_alias, count, history_names, new_history)
-                )
-            # Gather the updated values..
-            instances.append(inst)
-    # Return the updated list
-    if fixed_instances:
+        )
+    fixed_count = len(missing_ids) + len(conflicts)
+    if fixed_count:
         logger.warn(
             "Cleaned up %s instances for %s" %
-            (len(fixed_instances), identity.created_by.username)
+            (fixed_count, identity.created_by.username)
         )
-    return instances
+    return [
+        inst for inst in core_running_instances or []
+        if inst.created_by_identity_id == identity.id
+    ]
 
 
 def _resolve_history_conflict(
@@ -4,4 +4,5 @@ import service.tasks.driver    # noqa
 import service.tasks.volume    # noqa
 import service.tasks.machine    # noqa
 import service.tasks.snapshot    # noqa
+import service.tasks.reporting    # noqa
 import chromogenic.tasks    # noqa
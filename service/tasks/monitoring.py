@@ -1,6 +1,10 @@
+import time
+from collections import OrderedDict
 from datetime import timedelta
+from multiprocessing.pool import ThreadPool
 
 from django.conf import settings
+from django.db import connection
 from django.db.models import Q, Count
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
@@ -9,18 +13,20 @@ from celery.decorators import task
 
 from core.plugins import MachineValidationPluginManager, AllocationSourcePluginManager, EnforcementOverrideChoice
 from core.query import (
-    contains_credential, only_current, only_current_source, source_in_range,
-    inactive_versions
+    only_current, only_current_source, source_in_range, inactive_versions
 )
 from core.models.group import Group
 from core.models.size import Size, convert_esh_size
 from core.models.volume import Volume, convert_esh_volume
-from core.models.instance import convert_esh_instance
+from core.models.instance import convert_esh_instances
 from core.models.provider import Provider
 from core.models.machine import convert_glance_image, ProviderMachine, ProviderMachineMembership
 from core.models.machine_request import MachineRequest
 from core.models.application import Application, ApplicationMembership
-from core.models.allocation_source import AllocationSource
+from core.models.allocation_source import (
+    AllocationSource, AllocationSourceSnapshot, UserAllocationSnapshot,
+    UserAllocationSource
+)
 from core.models.application_version import ApplicationVersion
 
 from service.machine import (
@@ -29,7 +35,8 @@ from service.machine import (
 )
 from service.monitoring import (
     _cleanup_missing_instances, _get_instance_owner_map,
-    _get_identity_from_tenant_name, allocation_source_overage_enforcement_for
+    _get_identity_from_tenant_name, allocation_source_overage_enforcement_for,
+    tenant_identity_map
 )
 from service.driver import get_account_driver
 from service.cache import get_cached_driver
@@ -540,76 +547,127 @@ def monitor_instances():
         monitor_instances_for.apply_async(args=[p.id])
 
 
-@task(name="monitor_allocation_sources")
-def monitor_allocation_sources(usernames=()):
+def _allocation_sources_to_enforce(usernames=()):
     """
-    Monitor allocation sources, if a snapshot shows that all compute has been used, then enforce as necessary
+    Evaluate every user & allocation source combination in bulk, and return
+    an OrderedDict of `user -> [allocation_source, ...]` needing enforcement.
+
+    Snapshots, user snapshots and user allocation sources are loaded with one
+    query each, over-allocation is computed in memory (as in
+    `AllocationSource.time_remaining`) and enforcement overrides are resolved
+    by plugins loaded once per run.
     """
-    celery_logger.debug('monitor_allocation_sources - usernames: %s', usernames)
-    allocation_sources = AllocationSource.objects.all()
-    for allocation_source in allocation_sources.order_by('name'):
-        celery_logger.debug(
-            'monitor_allocation_sources - allocation_source: %s',
-            allocation_source
+    special_allocation_sources = getattr(
+        settings, 'SPECIAL_ALLOCATION_SOURCES', {}
+    )
+    compute_used = dict(
+        AllocationSourceSnapshot.objects.values_list(
+            'allocation_source_id', 'compute_used'
         )
-        for user in allocation_source.all_users.order_by('username'):
-            celery_logger.debug('monitor_allocation_sources - user: %s', user)
-            if usernames and user.username not in usernames:
-                celery_logger.info(
-                    "Skipping User %s - not in the list" % user.username
+    )
+    user_compute_used = {
+        (user_id, source_id): used
+        for user_id, source_id, used in UserAllocationSnapshot.objects.filter(
+            allocation_source__name__in=special_allocation_sources.keys()
+        ).values_list('user_id', 'allocation_source_id', 'compute_used')
+    }
+    user_allocation_sources = UserAllocationSource.objects.select_related(
+        'user', 'allocation_source'
+    ).order_by('allocation_source__name', 'user__username')
+    if usernames:
+        user_allocation_sources = user_allocation_sources.filter(
+            user__username__in=usernames
+        )
+    resolve_enforcement_override = AllocationSourcePluginManager.get_enforcement_override_resolver(
+    )
+
+    users, allocation_sources = {}, {}
+    to_enforce = OrderedDict()
+    for user_allocation_source in user_allocation_sources:
+        # Share one instance of each user & allocation source between rows
+        user = users.setdefault(
+            user_allocation_source.user_id, user_allocation_source.user
+        )
+        allocation_source = allocation_sources.setdefault(
+            user_allocation_source.allocation_source_id,
+            user_allocation_source.allocation_source
+        )
+        if allocation_source.name in special_allocation_sources:
+            compute_allowed = special_allocation_sources[allocation_source.name
+                                                        ]['compute_allowed']
+            used = user_compute_used.get((user.id, allocation_source.id))
+            if used is None:
+                celery_logger.warning(
+                    'User allocation snapshot does not exist for %s + user %s, so treating it as over allocation',
+                    allocation_source, user
                 )
-                continue
-            over_allocation = allocation_source.is_over_allocation(user)
-            celery_logger.debug(
-                'monitor_allocation_sources - user: %s, over_allocation: %s',
-                user, over_allocation
+                remaining = -1
+            else:
+                remaining = AllocationSource.remaining_compute(
+                    compute_allowed, used
+                )
+        else:
+            remaining = AllocationSource.remaining_compute(
+                allocation_source.compute_allowed,
+                compute_used.get(allocation_source.id, 0)
             )
+        over_allocation = remaining < 0
+        enforcement_override_choice = resolve_enforcement_override(
+            user, allocation_source
+        )
+        celery_logger.debug(
+            'monitor_allocation_sources - allocation_source: %s, user: %s, over_allocation: %s, '
+            'enforcement_override_choice: %s', allocation_source, user,
+            over_allocation, enforcement_override_choice
+        )
 
-            enforcement_override_choice = AllocationSourcePluginManager.get_enforcement_override(
-                user, allocation_source
+        if over_allocation and enforcement_override_choice == EnforcementOverrideChoice.NEVER_ENFORCE:
+            celery_logger.debug(
+                'Allocation source is over allocation, but %s + user %s has an override of %s, '
+                'therefore not enforcing', allocation_source, user,
+                enforcement_override_choice
             )
+            continue
+
+        if not over_allocation and enforcement_override_choice == EnforcementOverrideChoice.ALWAYS_ENFORCE:
             celery_logger.debug(
-                'monitor_allocation_sources - enforcement_override_choice: %s',
+                'Allocation source is not over allocation, but %s + user %s has an override of %s, '
+                'therefore enforcing', allocation_source, user,
                 enforcement_override_choice
             )
+            # Note: The enforcing happens in the next `if` statement.
+        if over_allocation or enforcement_override_choice == EnforcementOverrideChoice.ALWAYS_ENFORCE:
+            assert enforcement_override_choice in (
+                EnforcementOverrideChoice.NO_OVERRIDE,
+                EnforcementOverrideChoice.ALWAYS_ENFORCE
+            )
+            to_enforce.setdefault(user, []).append(allocation_source)
+    return to_enforce
 
-            if over_allocation and enforcement_override_choice == EnforcementOverrideChoice.NEVER_ENFORCE:
-                celery_logger.debug(
-                    'Allocation source is over allocation, but %s + user %s has an override of %s, '
-                    'therefore not enforcing', allocation_source, user,
-                    enforcement_override_choice
-                )
-                continue
 
-            if not over_allocation and enforcement_override_choice == EnforcementOverrideChoice.ALWAYS_ENFORCE:
-                celery_logger.debug(
-                    'Allocation source is not over allocation, but %s + user %s has an override of %s, '
-                    'therefore enforcing', allocation_source, user,
-                    enforcement_override_choice
-                )
-                # Note: The enforcing happens in the next `if` statement.
-            if over_allocation or enforcement_override_choice == EnforcementOverrideChoice.ALWAYS_ENFORCE:
-                assert enforcement_override_choice in (
-                    EnforcementOverrideChoice.NO_OVERRIDE,
-                    EnforcementOverrideChoice.ALWAYS_ENFORCE
-                )
-                celery_logger.debug(
-                    'monitor_allocation_sources - Going to enforce on user: %s',
-                    user
-                )
-                allocation_source_overage_enforcement_for_user.apply_async(
-                    args=(allocation_source, user)
-                )
+@task(name="monitor_allocation_sources")
+def monitor_allocation_sources(usernames=()):
+    """
+    Monitor allocation sources, if a snapshot shows that all compute has been used, then enforce as necessary
+
+    Enforcement is queued as one task per user, covering all of that user's
+    allocation sources which need enforcing.
+    """
+    celery_logger.debug('monitor_allocation_sources - usernames: %s', usernames)
+    to_enforce = _allocation_sources_to_enforce(usernames)
+    for user, allocation_sources in to_enforce.items():
+        celery_logger.debug(
+            'monitor_allocation_sources - Going to enforce on user: %s, allocation_sources: %s',
+            user, allocation_sources
+        )
+        allocation_sources_overage_enforcement_for_user.apply_async(
+            args=(allocation_sources, user)
+        )
 
 
-@task(name="allocation_source_overage_enforcement_for_user")
-def allocation_source_overage_enforcement_for_user(allocation_source, user):
-    celery_logger.debug(
-        'allocation_source_overage_enforcement_for_user - allocation_source: %s, user: %s',
-        allocation_source, user
-    )
+def _overage_enforcement_for_identities(allocation_source, user, identities):
     user_instances = []
-    for identity in user.current_identities:
+    for identity in identities:
         try:
             celery_logger.debug(
                 'allocation_source_overage_enforcement_for_user - identity: %s',
@@ -627,15 +685,55 @@ def allocation_source_overage_enforcement_for_user(allocation_source, user):
     return user_instances
 
 
+@task(name="allocation_source_overage_enforcement_for_user")
+def allocation_source_overage_enforcement_for_user(allocation_source, user):
+    celery_logger.debug(
+        'allocation_source_overage_enforcement_for_user - allocation_source: %s, user: %s',
+        allocation_source, user
+    )
+    return _overage_enforcement_for_identities(
+        allocation_source, user, user.current_identities
+    )
+
+
+@task(name="allocation_sources_overage_enforcement_for_user")
+def allocation_sources_overage_enforcement_for_user(allocation_sources, user):
+    celery_logger.debug(
+        'allocation_sources_overage_enforcement_for_user - allocation_sources: %s, user: %s',
+        allocation_sources, user
+    )
+    # Credentials are needed to build a driver for each identity
+    identities = list(
+        user.current_identities.select_related('provider').prefetch_related(
+            'credential_set', 'provider__providercredential_set'
+        )
+    )
+    user_instances = []
+    for allocation_source in allocation_sources:
+        user_instances.extend(
+            _overage_enforcement_for_identities(
+                allocation_source, user, identities
+            )
+        )
+    return user_instances
+
+
 @task(name="monitor_instances_for")
 def monitor_instances_for(
-    provider_id, users=None, print_logs=False, start_date=None, end_date=None
+    provider_id,
+    users=None,
+    print_logs=False,
+    start_date=None,
+    end_date=None,
+    serial=None
 ):
     """
     Run the set of tasks related to monitoring instances for a provider.
     Optionally, provide a list of usernames to monitor
     While debugging, print_logs=True can be very helpful.
     start_date and end_date allow you to search a 'non-standard' window of time.
+    Tenants are processed by up to MONITOR_INSTANCES_CONCURRENCY threads,
+    unless serial=True (default: settings.MONITOR_INSTANCES_SERIAL).
     """
     provider = Provider.objects.get(id=provider_id)
 
@@ -646,34 +744,43 @@ def monitor_instances_for(
 
     if print_logs:
         console_handler = _init_stdout_logging()
-    seen_instances = []
+    if serial is None:
+        serial = settings.MONITOR_INSTANCES_SERIAL
     # DEVNOTE: Potential slowdown running multiple functions
     # Break this out when instance-caching is enabled
     if not settings.ENFORCING:
         celery_logger.debug('Settings dictate allocations are NOT enforced')
-    for tenant_name in sorted(instance_map.keys()):
-        running_instances = instance_map[tenant_name]
-        identity = _get_identity_from_tenant_name(provider, tenant_name)
-        if identity and running_instances:
-            try:
-                driver = get_cached_driver(identity=identity)
-                core_running_instances = [
-                    convert_esh_instance(
-                        driver, inst, identity.provider.uuid, identity.uuid,
-                        identity.created_by
-                    ) for inst in running_instances
-                ]
-                seen_instances.extend(core_running_instances)
-            except Exception:
-                celery_logger.exception(
-                    "Could not convert running instances for %s" % tenant_name
-                )
-                continue
-        else:
-            # No running instances.
-            core_running_instances = []
-        # Using the 'known' list of running instances, cleanup the DB
-        _cleanup_missing_instances(identity, core_running_instances)
+    identity_map = tenant_identity_map(provider)
+    tenants = [
+        (provider, tenant_name, instance_map[tenant_name], identity_map)
+        for tenant_name in sorted(instance_map.keys())
+    ]
+    started = time.time()
+    if serial or settings.MONITOR_INSTANCES_CONCURRENCY <= 1 \
+            or len(tenants) <= 1:
+        timings = [_monitor_tenant_instances(*tenant) for tenant in tenants]
+    else:
+        workers = min(settings.MONITOR_INSTANCES_CONCURRENCY, len(tenants))
+        pool = ThreadPool(workers)
+        try:
+            chunks = pool.map(
+                _monitor_tenants_in_thread,
+                [tenants[idx::workers] for idx in range(workers)]
+            )
+        finally:
+            pool.close()
+            pool.join()
+        timings = [timing for chunk in chunks for timing in chunk]
+    slowest = sorted(timings, key=lambda timing: timing[1], reverse=True)[:5]
+    celery_logger.info(
+        "Monitored %s tenants on %s in %.2fs (%s). Slowest: %s" % (
+            len(tenants), provider, time.time() - started,
+            "serial" if serial else "parallel", ", ".join(
+                "%s %.2fs" % (tenant_name, elapsed)
+                for tenant_name, elapsed in slowest
+            )
+        )
+    )
     if print_logs:
         _exit_stdout_logging(console_handler)
     # return seen_instances  NOTE: this has been commented out to avoid PicklingError!
@@ -681,6 +788,58 @@ def monitor_instances_for(
     return
 
 
+def _monitor_tenants_in_thread(tenants):
+    """
+    Monitor a worker's share of the tenants, then close the database
+    connection the worker thread opened (once, not per tenant)
+    """
+    try:
+        return [_monitor_tenant_instances(*tenant) for tenant in tenants]
+    finally:
+        connection.close()
+
+
+def _monitor_tenant_instances(
+    provider, tenant_name, running_instances, identity_map=None
+):
+    """
+    Convert a tenant's running instances and clean up the ones that are no
+    longer running. Returns (tenant_name, seconds spent).
+    """
+    started = time.time()
+    identity = _get_identity_from_tenant_name(
+        provider, tenant_name, identity_map
+    )
+    if identity and running_instances:
+        try:
+            driver = get_cached_driver(identity=identity)
+            core_running_instances = convert_esh_instances(
+                driver, running_instances, identity.provider.uuid,
+                identity.uuid, identity.created_by
+            )
+        except Exception:
+            celery_logger.exception(
+                "Could not convert running instances for %s" % tenant_name
+            )
+            return (tenant_name, time.time() - started)
+    else:
+        # No running instances.
+        core_running_instances = []
+    # Using the 'known' list of running instances, cleanup the DB
+    try:
+        _cleanup_missing_instances(identity, core_running_instances)
+    except Exception:
+        celery_logger.exception(
+            "Could not clean up missing instances for %s" % tenant_name
+        )
+    elapsed = time.time() - started
+    celery_logger.debug(
+        "Monitored %s instances of %s in %.2fs" %
+        (len(core_running_instances), tenant_name, elapsed)
+    )
+    return (tenant_name, elapsed)
+
+
 @task(name="monitor_volumes")
 def monitor_volumes():
     """
@@ -699,7 +858,6 @@ def monitor_volumes_for(provider_id, print_logs=False):
     start_date and end_date allow you to search a 'non-standard' window of time.
     """
     from service.driver import get_account_driver
-    from core.models import Identity
     if print_logs:
         console_handler = _init_stdout_logging()
 
@@ -710,6 +868,7 @@ def monitor_volumes_for(provider_id, print_logs=False):
         only_current_source(), instance_source__provider=provider
     )
     all_volumes = account_driver.admin_driver.list_all_volumes(timeout=30)
+    identity_map = tenant_identity_map(provider)
     seen_volumes = []
     for cloud_volume in all_volumes:
         try:
@@ -730,10 +889,7 @@ def monitor_volumes_for(provider_id, print_logs=False):
                         "perspective.", tenant_id, cloud_volume
                     )
                     raise ObjectDoesNotExist()
-                identity = Identity.objects.filter(
-                    contains_credential('ex_project_name', tenant_name),
-                    provider=provider
-                ).first()
+                identity = identity_map.get(tenant_name)
                 if not identity:
                     raise ObjectDoesNotExist()
                 core_volume = convert_esh_volume(
@@ -0,0 +1,61 @@
+"""
+Build reports outside of the request/response cycle, see core.models.ReportJob
+"""
+from django.conf import settings
+
+from celery.decorators import task
+from celery.exceptions import SoftTimeLimitExceeded
+
+from threepio import logger
+
+from core.models import ReportJob
+
+
+def build_allocation_report(spec):
+    from service.allocation_report import create_report
+    return create_report(
+        spec['start_date'],
+        spec['end_date'],
+        user_id=spec.get('username'),
+        allocation_source_name=spec.get('allocation_source_name')
+    )
+
+
+def build_instance_report(spec):
+    from api.v2.views.reporting import build_instance_report
+    return build_instance_report(spec)
+
+
+REPORT_BUILDERS = {
+    ReportJob.ALLOCATION_REPORT: build_allocation_report,
+    ReportJob.INSTANCE_REPORT: build_instance_report,
+}
+
+
+@task(
+    name="build_report",
+    soft_time_limit=settings.REPORT_JOB_TIME_LIMIT,
+    ignore_result=True
+)
+def build_report(report_job_id):
+    """
+    Build the report of a ReportJob and store its rows on the job
+    """
+    job = ReportJob.objects.get(id=report_job_id)
+    job.start()
+    logger.info("Building %s", job)
+    try:
+        rows = REPORT_BUILDERS[job.report_type](job.spec)
+    except SoftTimeLimitExceeded:
+        logger.warn("Timed out building %s", job)
+        job.fail(
+            "The report took longer than %s seconds to build" %
+            settings.REPORT_JOB_TIME_LIMIT
+        )
+        return
+    except Exception as exc:
+        logger.exception("Failed to build %s", job)
+        job.fail(str(exc))
+        return
+    job.complete(rows)
+    logger.info("Built %s: %s rows", job, len(rows))
@@ -0,0 +1,303 @@
+import uuid
+from datetime import timedelta
+
+import mock
+from dateutil.parser import parse
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.factories import (
+    AllocationSourceFactory, InstanceFactory, InstanceHistoryFactory,
+    SizeFactory, UserFactory
+)
+from core.models import (
+    EventTable, InstanceAllocationSourceInterval, InstanceStatus
+)
+from core.models.allocation_source import (
+    total_usage, total_usage_for_source, usage_seconds_for_source
+)
+from service import allocation_logic, allocation_report
+
+REPORT_START = parse('2017-03-01T00:00:00+00:00')
+REPORT_END = parse('2017-04-01T00:00:00+00:00')
+NOW = parse('2017-05-01T00:00:00+00:00')
+
+
+class AllocationReportFixture(object):
+    """
+    Builds users with instances, histories and allocation source events that
+    exercise every branch of the report: events before the report window,
+    events splitting a history, still-running histories and instances that
+    never had an allocation source assigned.
+    """
+
+    def __init__(self):
+        self.sources = [
+            AllocationSourceFactory.create(name='TG-A'),
+            AllocationSourceFactory.create(name='TG-B')
+        ]
+        self.users = []
+        # Provider aliases of the instances left running and active
+        self.running = []
+
+    def status(self, name):
+        return InstanceStatus.objects.get_or_create(name=name)[0]
+
+    def launch(self, user, start_date, timeline, cpu=1):
+        """
+        timeline: list of (offset, status_name), the last one is left open
+        """
+        instance = InstanceFactory.create(
+            provider_alias=str(uuid.uuid4()),
+            created_by=user,
+            start_date=start_date
+        )
+        size = SizeFactory.create(cpu=cpu)
+        for idx, (offset, status_name) in enumerate(timeline):
+            end_date = None
+            if idx + 1 < len(timeline):
+                end_date = start_date + timeline[idx + 1][0]
+            InstanceHistoryFactory.create(
+                instance=instance,
+                size=size,
+                status=self.status(status_name),
+                start_date=start_date + offset,
+                end_date=end_date
+            )
+        return instance
+
+    def assign(self, instance, source, timestamp):
+        return EventTable.objects.create(
+            name='instance_allocation_source_changed',
+            entity_id=instance.created_by.username,
+            payload={
+                'allocation_source_name': source.name,
+                'instance_id': instance.provider_alias
+            },
+            timestamp=timestamp
+        )
+
+    def add_user(self, launched):
+        user = UserFactory.create()
+        self.users.append(user)
+        # Assigned before the report starts, then moved mid-history
+        statuses = [
+            (timedelta(0), 'active'),
+            (timedelta(days=10), 'suspended'),
+            (timedelta(days=12), 'active'),
+        ]
+        first = self.launch(user, launched, statuses, cpu=2)
+        self.assign(first, self.sources[0], launched + timedelta(minutes=5))
+        self.assign(
+            first, self.sources[1], REPORT_START + timedelta(days=4, hours=3)
+        )
+        self.assign(first, self.sources[0], REPORT_START + timedelta(days=20))
+        # Launched inside the window and end-dated inside it
+        second = self.launch(
+            user, REPORT_START + timedelta(days=3), [
+                (timedelta(0), 'active'),
+                (timedelta(days=2), 'shutoff'),
+            ]
+        )
+        self.assign(
+            second, self.sources[1], REPORT_START + timedelta(days=3, hours=1)
+        )
+        # Never assigned an allocation source
+        third = self.launch(
+            user, REPORT_START + timedelta(days=6), [(timedelta(0), 'active')]
+        )
+        self.running.extend([first.provider_alias, third.provider_alias])
+        return user
+
+
+class AllocationReportReplayTest(TestCase):
+    """
+    Rows worked out by hand by replaying the fixture's allocation source
+    events, as the original event-based report did.
+    """
+
+    def setUp(self):
+        self.fixture = AllocationReportFixture()
+        self.user = self.fixture.add_user(REPORT_START - timedelta(days=15))
+        for module in [allocation_logic, allocation_report]:
+            patcher = mock.patch.object(
+                module, '_get_current_date_utc', return_value=NOW
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def expected(self):
+        day = timedelta(days=1)
+        hour = timedelta(hours=1)
+        # The first instance is assigned TG-A before the window, then moved
+        # to TG-B and back; the second has no source until one hour after
+        # launch; the third is never assigned
+        return sorted(
+            [
+                (REPORT_START - 3 * day, 'active', 'TG-A', 356400.0 * 2),
+                (
+                    REPORT_START + 4 * day + 3 * hour, 'active', 'TG-B',
+                    1371600.0 * 2
+                ),
+                (REPORT_START + 20 * day, 'active', 'TG-A', 950400.0 * 2),
+                (REPORT_START + 3 * day, 'active', 'N/A', 3600.0),
+                (REPORT_START + 3 * day + hour, 'active', 'TG-B', 169200.0),
+                (REPORT_START + 5 * day, 'shutoff', 'TG-B', 0),
+                (REPORT_START + 6 * day, 'active', 'N/A', 2160000.0),
+            ]
+        )
+
+    def summarize(self, rows):
+        return sorted(
+            (
+                row['instance_status_start_date'], row['instance_status'],
+                row['allocation_source'], row['applicable_duration']
+            ) for row in rows
+        )
+
+    def test_reports_match_event_replay(self):
+        for module in [allocation_logic, allocation_report]:
+            rows = module.create_report(
+                REPORT_START, REPORT_END, user_id=self.user.username
+            )
+            self.assertEqual(self.summarize(rows), self.expected())
+        rows = allocation_report.create_report_for_users(
+            REPORT_START, REPORT_END, [self.user]
+        )
+        self.assertEqual(self.summarize(rows), self.expected())
+
+    def test_usage_and_burn_rate(self):
+        rows = allocation_report.create_report(
+            REPORT_START, REPORT_END, user_id=self.user.username
+        )
+        visited = []
+        for row in rows:
+            if row['provider_alias'] not in visited:
+                visited.append(row['provider_alias'])
+        # The burn rate is the number of running, active instances visited
+        # up to the instance of the user's last row of the source
+        expected = {}
+        for name, hours in [('TG-A', 726.0), ('TG-B', 809.0)]:
+            last = max(
+                visited.index(row['provider_alias'])
+                for row in rows if row['allocation_source'] == name
+            )
+            running = set(visited[:last + 1]) & set(self.fixture.running)
+            expected[name] = [hours, len(running)]
+        for backend in ['python', 'numpy']:
+            with override_settings(ALLOCATION_USAGE_BACKEND=backend):
+                for source in self.fixture.sources:
+                    usage = total_usage_for_source(
+                        source,
+                        REPORT_START,
+                        end_date=REPORT_END,
+                        users=[self.user]
+                    )
+                    self.assertEqual(
+                        usage[self.user.username], expected[source.name]
+                    )
+
+
+class AllocationReportParityTest(TestCase):
+    """
+    The interval-based report against the original report, which replays
+    allocation source events
+    """
+
+    def setUp(self):
+        self.fixture = AllocationReportFixture()
+        self.fixture.add_user(REPORT_START - timedelta(days=15))
+        self.fixture.add_user(REPORT_START + timedelta(days=1))
+        patch_legacy = mock.patch.object(
+            allocation_logic, '_get_current_date_utc', return_value=NOW
+        )
+        patch_engine = mock.patch.object(
+            allocation_report, '_get_current_date_utc', return_value=NOW
+        )
+        patch_replay = mock.patch.object(
+            allocation_logic, 'get_allocation_source_name_from_event',
+            allocation_logic._legacy_allocation_source_name_from_event
+        )
+        for patcher in [patch_legacy, patch_engine, patch_replay]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def assertParity(self, **kwargs):
+        expected = allocation_logic.create_report(
+            REPORT_START, REPORT_END, **kwargs
+        )
+        actual = allocation_report.create_report(
+            REPORT_START, REPORT_END, **kwargs
+        )
+        self.assertTrue(expected)
+        self.assertEqual(actual, expected)
+
+    def test_all_users(self):
+        self.assertParity()
+
+    def test_single_user(self):
+        for user in self.fixture.users:
+            self.assertParity(user_id=user.username)
+
+    def test_allocation_source_filter(self):
+        for source in self.fixture.sources:
+            self.assertParity(allocation_source_name=source.name)
+            self.assertParity(
+                user_id=self.fixture.users[0].username,
+                allocation_source_name=source.name
+            )
+
+    def test_rebuilt_intervals(self):
+        InstanceAllocationSourceInterval.rebuild()
+        self.assertParity()
+
+    def test_string_dates(self):
+        expected = allocation_logic.create_report(
+            REPORT_START.isoformat(), REPORT_END.isoformat()
+        )
+        actual = allocation_report.create_report(
+            REPORT_START.isoformat(), REPORT_END.isoformat()
+        )
+        self.assertEqual(actual, expected)
+
+    def test_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as before:
+            allocation_report.create_report(REPORT_START, REPORT_END)
+        for _ in range(3):
+            self.fixture.add_user(REPORT_START - timedelta(days=2))
+        with CaptureQueriesContext(connection) as after:
+            allocation_report.create_report(REPORT_START, REPORT_END)
+        self.assertEqual(len(after), len(before))
+
+    def test_total_usage_for_source(self):
+        for source in self.fixture.sources:
+            batch = total_usage_for_source(
+                source,
+                REPORT_START,
+                end_date=REPORT_END,
+                users=self.fixture.users
+            )
+            for user in self.fixture.users:
+                expected = total_usage(
+                    user.username,
+                    REPORT_START,
+                    allocation_source_name=source.name,
+                    end_date=REPORT_END,
+                    burn_rate=True
+                )
+                self.assertEqual(batch[user.username], expected)
+
+    def test_numpy_backend(self):
+        for source in self.fixture.sources:
+            expected = usage_seconds_for_source(
+                source, REPORT_START, REPORT_END, self.fixture.users
+            )
+            with override_settings(ALLOCATION_USAGE_BACKEND='numpy'):
+                actual = usage_seconds_for_source(
+                    source, REPORT_START, REPORT_END, self.fixture.users
+                )
+            self.assertEqual(sorted(actual), sorted(expected))
+            for username, (seconds, burn_rate) in expected.iteritems():
+                self.assertAlmostEqual(actual[username][0], seconds, places=3)
+                self.assertEqual(actual[username][1], burn_rate)
@@ -0,0 +1,175 @@
+import threading
+import time
+import uuid
+
+import mock
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from libcloud.compute.base import NodeSize
+from rtwo.models.provider import OSProvider
+from rtwo.models.size import MockSize, OSSize
+
+from api.tests.factories import (
+    IdentityFactory, InstanceFactory, InstanceStatusFactory,
+    ProviderMachineFactory
+)
+from core.models.instance import convert_esh_instances
+from core.tests.test_convert_esh_instances import FakeEshInstance
+from service import cache
+
+
+class FakeInstance(object):
+    def __init__(self, id):
+        self.id = id
+        self.alias = id
+        self.name = "Instance %s" % id
+        self.extra = {'status': 'active'}
+        self._node = object()
+
+
+class SlowDriver(object):
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def list_sizes(self):
+        return []
+
+    def list_instances(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return [FakeInstance('inst-1'), FakeInstance('inst-2')]
+
+
+@override_settings(CLOUD_CACHE_LOCK_WAIT=5)
+class SingleFlightCacheTest(TestCase):
+    def setUp(self):
+        self.identity = IdentityFactory.create()
+        self.driver = SlowDriver(delay=0.5)
+        patcher = mock.patch.object(
+            cache, '_get_cached_driver', return_value=self.driver
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+        cache.reset_cache_stats()
+
+    def _concurrent_calls(self, count):
+        results = [None] * count
+        start = threading.Event()
+
+        def call(idx):
+            start.wait()
+            results[idx] = cache.get_cached_instances(identity=self.identity)
+
+        threads = [
+            threading.Thread(target=call, args=(idx, )) for idx in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_misses_make_one_driver_call(self):
+        results = self._concurrent_calls(20)
+        self.assertEqual(self.driver.calls, 1)
+        for instances in results:
+            self.assertEqual(
+                [instance.id for instance in instances], ['inst-1', 'inst-2']
+            )
+        stats = cache.cache_stats()['instances']
+        self.assertEqual(stats['miss'], 1)
+        self.assertEqual(stats['wait'], 19)
+
+    def test_cached_entry_drops_references(self):
+        cache.get_cached_instances(identity=self.identity)
+        instances = cache.get_cached_instances(identity=self.identity)
+        self.assertEqual(self.driver.calls, 1)
+        self.assertIsInstance(instances[0], FakeInstance)
+        self.assertIsNone(instances[0]._node)
+        self.assertEqual(instances[0].extra, {'status': 'active'})
+
+    def test_expired_entry_is_served_during_refresh(self):
+        with override_settings(CLOUD_CACHE_TTL={'instances': 0}):
+            cache.get_cached_instances(identity=self.identity)
+            results = self._concurrent_calls(10)
+        self.assertEqual(self.driver.calls, 2)
+        self.assertTrue(all(len(instances) == 2 for instances in results))
+        self.assertEqual(cache.cache_stats()['instances']['stale'], 9)
+
+    def test_invalidate_forces_refresh(self):
+        cache.get_cached_instances(identity=self.identity)
+        cache.invalidate_cached_instances(identity=self.identity)
+        cache.get_cached_instances(identity=self.identity)
+        self.assertEqual(self.driver.calls, 2)
+
+
+class CachedSizesTest(TestCase):
+    def setUp(self):
+        machine = ProviderMachineFactory.create()
+        self.provider = machine.instance_source.provider
+        self.identity = IdentityFactory.create(provider=self.provider)
+        InstanceStatusFactory.create(name='active')
+        os_size = OSSize(
+            NodeSize(
+                id='size-1',
+                name='m1.small',
+                ram=4096,
+                disk=20,
+                bandwidth=None,
+                price=0,
+                driver=None,
+                extra={
+                    'cpu': 2,
+                    'ephemeral': 10
+                }
+            )
+        )
+        mock_size = MockSize('size-2', OSProvider(identifier='test'))
+        self.esh_instances = [
+            FakeEshInstance(
+                InstanceFactory.create(
+                    provider_machine=machine,
+                    provider_alias=str(uuid.uuid4()),
+                    created_by=self.identity.created_by
+                ), size, 'active'
+            ) for size in [os_size, mock_size]
+        ]
+        self.driver = mock.Mock()
+        self.driver.list_instances.return_value = self.esh_instances
+        self.driver.get_size.return_value = None
+        patcher = mock.patch.object(
+            cache, '_get_cached_driver', return_value=self.driver
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+
+    def test_cached_sizes_can_be_converted(self):
+        cache.get_cached_instances(identity=self.identity)
+        cached = cache.get_cached_instances(identity=self.identity)
+        self.assertEqual(self.driver.list_instances.call_count, 1)
+        os_size, mock_size = [instance.size for instance in cached]
+        self.assertIsInstance(os_size, OSSize)
+        self.assertEqual((os_size.cpu, os_size.ephemeral), (2, 10))
+        self.assertIsInstance(mock_size, MockSize)
+        self.assertEqual(mock_size.json()['provider'], 'test')
+        self.assertIn('m1.small', str(os_size))
+
+        core_instances = convert_esh_instances(
+            self.driver, cached, self.provider.uuid, self.identity.uuid,
+            self.identity.created_by
+        )
+        sizes = [
+            instance.get_last_history().size for instance in core_instances
+        ]
+        self.assertEqual(
+            [(size.alias, size.cpu, size.root) for size in sizes],
+            [('size-1', 2, 10), ('size-2', 0, 0)]
+        )
@@ -0,0 +1,84 @@
+import uuid
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.tests.factories import (
+    IdentityFactory, InstanceFactory, InstanceHistoryFactory, SizeFactory
+)
+from core.models import InstanceStatus
+from service.monitoring import _cleanup_missing_instances
+
+
+class CleanupMissingInstancesTest(TestCase):
+    def setUp(self):
+        self.identity = IdentityFactory.create()
+        self.size = SizeFactory.create()
+        self.status = InstanceStatus.objects.get_or_create(name='active')[0]
+        self.start = timezone.now() - timedelta(days=1)
+        self.running = self.instance()
+        self.missing = self.instance()
+        self.ended = self.instance(end_date=self.start + timedelta(hours=1))
+        self.no_history = self.instance(history=False)
+
+    def instance(self, end_date=None, history=True, identity=None):
+        identity = identity or self.identity
+        instance = InstanceFactory.create(
+            provider_alias=str(uuid.uuid4()),
+            created_by=identity.created_by,
+            created_by_identity=identity,
+            start_date=self.start,
+            end_date=end_date
+        )
+        if history:
+            InstanceHistoryFactory.create(
+                instance=instance,
+                status=self.status,
+                size=self.size,
+                start_date=self.start,
+                end_date=end_date
+            )
+        return instance
+
+    def open_history_count(self, instance):
+        return instance.instancestatushistory_set.filter(end_date=None).count()
+
+    def test_missing_instances_are_end_dated(self):
+        other_identity = self.instance(identity=IdentityFactory.create())
+        ended_at = self.ended.end_date
+        self.assertEqual(
+            _cleanup_missing_instances(self.identity, [self.running]),
+            [self.running]
+        )
+        instances = [
+            self.running, self.missing, self.ended, self.no_history,
+            other_identity
+        ]
+        for instance in instances:
+            instance.refresh_from_db()
+        self.assertIsNone(self.running.end_date)
+        self.assertEqual(self.open_history_count(self.running), 1)
+        self.assertIsNotNone(self.missing.end_date)
+        self.assertEqual(self.open_history_count(self.missing), 0)
+        self.assertIsNotNone(self.no_history.end_date)
+        self.assertEqual(self.ended.end_date, ended_at)
+        self.assertIsNone(other_identity.end_date)
+
+    def test_nothing_running_ends_everything(self):
+        _cleanup_missing_instances(self.identity, [])
+        self.running.refresh_from_db()
+        self.assertIsNotNone(self.running.end_date)
+        self.assertEqual(self.open_history_count(self.running), 0)
+
+    def test_query_count_does_not_grow_with_instances(self):
+        with CaptureQueriesContext(connection) as few:
+            _cleanup_missing_instances(self.identity, [self.running])
+        running = [self.running] + [self.instance() for _ in range(10)]
+        for _ in range(10):
+            self.instance()
+        with CaptureQueriesContext(connection) as many:
+            _cleanup_missing_instances(self.identity, running)
+        self.assertEqual(len(many.captured_queries), len(few.captured_queries))
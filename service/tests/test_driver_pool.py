@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import mock
+from django.test import TestCase, override_settings
+
+from api.tests.factories import IdentityFactory
+from core.models import Identity
+from service import cache
+from service.driver_pool import DriverPool, driver_pool
+
+
+class FakeDriver(object):
+    def __init__(self, name, auth_token_expires=None):
+        self.name = name
+        self._connection = mock.Mock()
+        self._connection.connection.auth_token_expires = auth_token_expires
+
+
+@override_settings(DRIVER_POOL_MAX_AGE=600, DRIVER_POOL_MAX_PER_PROVIDER=2)
+class DriverPoolTest(TestCase):
+    def setUp(self):
+        self.pool = DriverPool()
+        self.built = []
+
+    def build(self, name, **kwargs):
+        def build_method():
+            self.built.append(name)
+            return FakeDriver(name, **kwargs)
+
+        return build_method
+
+    def test_driver_is_reused(self):
+        first = self.pool.get('a', self.build('a'), 1)
+        second = self.pool.get('a', self.build('a'), 1)
+        self.assertIs(first, second)
+        self.assertEqual(self.built, ['a'])
+
+    def test_force_rebuilds(self):
+        self.pool.get('a', self.build('a'), 1)
+        self.pool.get('a', self.build('a'), 1, force=True)
+        self.assertEqual(self.built, ['a', 'a'])
+
+    def test_expiring_token_rebuilds(self):
+        expires = datetime.utcnow() + timedelta(minutes=1)
+        self.pool.get('a', self.build('a', auth_token_expires=expires), 1)
+        self.pool.get('a', self.build('a'), 1)
+        self.assertEqual(self.built, ['a', 'a'])
+
+    def test_least_recently_used_is_evicted_per_provider(self):
+        self.pool.get('a', self.build('a'), 1)
+        self.pool.get('b', self.build('b'), 1)
+        self.pool.get('other', self.build('other'), 2)
+        self.pool.get('a', self.build('a'), 1)
+        self.pool.get('c', self.build('c'), 1)
+        self.assertEqual(sorted(self.pool.entries), ['a', 'c', 'other'])
+
+    def test_missing_driver_is_not_pooled(self):
+        self.assertIsNone(self.pool.get('a', lambda: None, 1))
+        self.assertEqual(len(self.pool), 0)
+
+
+class CredentialInvalidationTest(TestCase):
+    def setUp(self):
+        self.identity = IdentityFactory.create()
+        driver_pool.clear()
+        self.addCleanup(driver_pool.clear)
+
+    def test_update_credential_drops_pooled_driver(self):
+        with mock.patch.object(
+            cache, 'get_esh_driver', side_effect=lambda identity: object()
+        ):
+            first = cache.get_cached_driver(identity=self.identity)
+            self.assertIs(
+                cache.get_cached_driver(identity=self.identity), first
+            )
+            Identity.update_credential(
+                self.identity, 'secret', 'rotated', replace=True
+            )
+            self.assertIsNot(
+                cache.get_cached_driver(identity=self.identity), first
+            )
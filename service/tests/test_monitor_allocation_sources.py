@@ -0,0 +1,123 @@
+import mock
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.factories import (
+    AllocationSourceFactory, UserAllocationSourceFactory, UserFactory
+)
+from core.models import AllocationSourceSnapshot, UserAllocationSnapshot
+from service.tasks.monitoring import (
+    _allocation_sources_to_enforce, monitor_allocation_sources
+)
+
+ENFORCEMENT_TASK = 'service.tasks.monitoring.allocation_sources_overage_enforcement_for_user'
+SPECIAL_ALLOCATION_SOURCES = {'TG-SPECIAL': {'compute_allowed': 100}}
+
+
+class MonitorAllocationSourcesTest(TestCase):
+    def setUp(self):
+        self.users = [
+            UserFactory.create(username='user%s' % idx) for idx in range(3)
+        ]
+        self.over = self.source('TG-OVER', compute_used=200)
+        self.under = self.source('TG-UNDER', compute_used=10)
+        self.unlimited = self.source(
+            'TG-UNLIMITED', compute_allowed=-1, compute_used=1000
+        )
+        self.special = self.source('TG-SPECIAL', compute_used=0)
+        UserAllocationSnapshot.objects.create(
+            user=self.users[0],
+            allocation_source=self.special,
+            compute_used=50,
+            burn_rate=0
+        )
+        UserAllocationSnapshot.objects.create(
+            user=self.users[1],
+            allocation_source=self.special,
+            compute_used=150,
+            burn_rate=0
+        )
+
+    def source(self, name, compute_used, compute_allowed=100):
+        allocation_source = AllocationSourceFactory.create(
+            name=name, compute_allowed=compute_allowed
+        )
+        AllocationSourceSnapshot.objects.create(
+            allocation_source=allocation_source,
+            compute_used=compute_used,
+            compute_allowed=compute_allowed,
+            global_burn_rate=0
+        )
+        for user in self.users:
+            UserAllocationSourceFactory.create(
+                user=user, allocation_source=allocation_source
+            )
+        return allocation_source
+
+    def evaluate(self, usernames=()):
+        with override_settings(
+            SPECIAL_ALLOCATION_SOURCES=SPECIAL_ALLOCATION_SOURCES,
+            ALLOCATION_OVERRIDES_NEVER_ENFORCE=[],
+            ALLOCATION_OVERRIDES_ALWAYS_ENFORCE=[]
+        ):
+            return _allocation_sources_to_enforce(usernames)
+
+    def test_matches_time_remaining(self):
+        to_enforce = self.evaluate()
+        sources = [self.over, self.special, self.under, self.unlimited]
+        with override_settings(
+            SPECIAL_ALLOCATION_SOURCES=SPECIAL_ALLOCATION_SOURCES
+        ):
+            expected = {
+                user: [
+                    source
+                    for source in sources if source.is_over_allocation(user)
+                ]
+                for user in self.users
+            }
+        self.assertEqual(
+            dict(to_enforce),
+            {user: sources
+             for user, sources in expected.items() if sources}
+        )
+        # Special sources compare usage per user, and users without a user
+        # snapshot are treated as over allocation
+        self.assertEqual(to_enforce[self.users[0]], [self.over])
+        self.assertEqual(to_enforce[self.users[1]], [self.over, self.special])
+        self.assertEqual(to_enforce[self.users[2]], [self.over, self.special])
+
+    def test_query_count_does_not_grow_with_users(self):
+        with CaptureQueriesContext(connection) as few_users:
+            self.evaluate()
+        for idx in range(3, 10):
+            user = UserFactory.create(username='user%s' % idx)
+            for allocation_source in [self.over, self.under]:
+                UserAllocationSourceFactory.create(
+                    user=user, allocation_source=allocation_source
+                )
+        with CaptureQueriesContext(connection) as more_users:
+            to_enforce = self.evaluate()
+        self.assertEqual(len(to_enforce), 10)
+        self.assertEqual(
+            len(more_users.captured_queries), len(few_users.captured_queries)
+        )
+
+    def test_enforcement_is_queued_once_per_user(self):
+        with mock.patch(ENFORCEMENT_TASK) as enforcement_task:
+            with override_settings(
+                SPECIAL_ALLOCATION_SOURCES={},
+                ALLOCATION_OVERRIDES_NEVER_ENFORCE=[],
+                ALLOCATION_OVERRIDES_ALWAYS_ENFORCE=['TG-UNDER']
+            ):
+                monitor_allocation_sources(usernames=['user0', 'user1'])
+        calls = [
+            call[1]['args']
+            for call in enforcement_task.apply_async.call_args_list
+        ]
+        self.assertEqual(
+            calls, [
+                ([self.over, self.under], self.users[0]),
+                ([self.over, self.under], self.users[1]),
+            ]
+        )
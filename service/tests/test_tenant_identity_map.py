@@ -0,0 +1,56 @@
+from django.test import TestCase
+
+from api.tests.factories import IdentityFactory, ProviderFactory
+from core.models.credential import Credential
+from service.monitoring import (
+    _get_identity_from_tenant_name, tenant_identity_map
+)
+
+
+class TenantIdentityMapTest(TestCase):
+    def setUp(self):
+        self.provider = ProviderFactory.create()
+        self.identities = [
+            self.identity('tenant%s' % idx, self.provider) for idx in range(5)
+        ]
+        self.duplicate = self.identity('tenant0', self.provider)
+        self.identity('tenant0', ProviderFactory.create())
+
+    def identity(self, tenant_name, provider):
+        identity = IdentityFactory.create(provider=provider)
+        Credential.objects.create(
+            identity=identity, key='ex_project_name', value=tenant_name
+        )
+        Credential.objects.create(
+            identity=identity, key='key', value=tenant_name
+        )
+        return identity
+
+    def test_map_matches_single_lookups(self):
+        with self.assertNumQueries(2):
+            identity_map = tenant_identity_map(self.provider)
+            for identity in identity_map.values():
+                identity.get_credential('key')
+                identity.provider
+                identity.created_by
+        self.assertEqual(len(identity_map), 5)
+        for tenant_name in ['tenant%s' % idx for idx in range(5)] + ['none']:
+            self.assertEqual(
+                identity_map.get(tenant_name),
+                _get_identity_from_tenant_name(self.provider, tenant_name)
+            )
+        self.assertEqual(identity_map['tenant0'], self.identities[0])
+
+    def test_lookups_with_a_map_make_no_queries(self):
+        identity_map = tenant_identity_map(self.provider)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                _get_identity_from_tenant_name(
+                    self.provider, 'tenant3', identity_map
+                ), self.identities[3]
+            )
+            self.assertIsNone(
+                _get_identity_from_tenant_name(
+                    self.provider, 'missing', identity_map
+                )
+            )